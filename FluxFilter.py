@@ -118,7 +118,6 @@
 
 # %% id="Ywv5kp0rzanK"
 import logging
-import re
 import sys
 
 from pathlib import Path
@@ -144,20 +143,25 @@ import bglabutils.basic as bg
 from src.colab_routines import colab_no_scroll, colab_enable_custom_widget_manager, colab_add_download_button
 from src.config.ff_config import FFConfig, RepConfig, FFGlobals
 from src.config.config_types import IasExportIntervals, InputFileType # noqa: F401
+from src.data_prepare import normalize_columns, check_data_types, prepare_meteo_columns, filter_co2_strg, calc_nee, \
+    split_pass_through, join_pass_through
 from src.data_quality import try_compare_stats
 from src.ff_logger import init_logging, ff_logger
 from src.helpers.io_helpers import ensure_empty_dir, create_archive
+from src.data_io.utils.table_cache import init_table_cache
 from src.helpers.env_helpers import setup_r_env
 from src.data_io.fat_export import export_fat
 from src.data_io.rep_level3_export import export_rep_level3
+from src.data_io.results_export import apply_filters, export_output_all, export_output_summary
 from src.data_io.data_import import import_data
 from src.data_io.detect_import import try_auto_detect_input_files
 from src.data_io.ias_io import export_ias
 from src.ipynb_routines import setup_plotly, ipython_enable_word_wrap, ipython_edit_function  # noqa: F401
+from src.filter_store import FilterStore
 from src.filters import min_max_filter, qc_filter, std_window_filter, meteorological_rh_filter, \
     meteorological_night_filter, meteorological_day_filter, meteorological_co2ss_filter, meteorological_ch4ss_filter, \
     meteorological_rain_filter, quantile_filter, mad_hampel_filter, manual_filter, winter_filter
-from src.plots import get_column_filter, basic_plot, plot_nice_year_hist_plotly, make_filtered_plot, plot_albedo
+from src.plots import basic_plot, plot_nice_year_hist_plotly, make_filtered_plot, plot_albedo
 
 # cur_dir = %pwd
 # assert cur_dir == '/content'
@@ -168,6 +172,8 @@ colab_no_scroll()
 colab_enable_custom_widget_manager()
 setup_plotly(gl.out_dir)
 init_logging(level=logging.INFO, fpath=gl.out_dir / 'log.log', to_stdout=True)
+# unchanged input files are not parsed again on re-run, init_table_cache(None) to bypass
+init_table_cache(gl.out_dir / 'cache')
 
 # Cells can be executed separately via import * and mocking global vars import global as gl
 # To tweak filters directly in Colab: 1) run all the cells above 2) run in a new cell the line below 3) #comment the line 
@@ -486,33 +492,13 @@ data, time_col, meteo_cols, data_freq, config.calc.has_meteo = import_data(confi
 gl.points_per_day = int(pd.Timedelta('24h') / data_freq)
 
 # %% id="C8lLDYOWzH2d"
-data.columns = data.columns.str.lower()
-if not config.calc.has_meteo:
-    data["rh_1_1_1"] = data['rh']
-    # TODO QOA 1 different units? Elg biomet kPa, but mean 8.6 ?  
-    data["vpd_1_1_1"] = data['vpd']
+data = normalize_columns(data, config.calc.has_meteo)
 
 # %% [markdown] id="ipknrLaeByCT"
 # Проверка на корректность типа данных (пример: наличие текста там, где должны быть числа):
 
 # %% id="8LawdKUbB1_m"
-cols_2_check = ['ppfd_in_1_1_1', 'u_star', 'swin_1_1_1', 'co2_signal_strength',
-                'rh_1_1_1', 'vpd_1_1_1', 'rg_1_1_1', 'p_rain_1_1_1',
-                'co2_signal_strength_7500_mean', 'CO2SS'.lower(), 'co2_signal_strength',
-                'ch4_signal_strength_7500_mean', 'ch4SS'.lower(), 'ch4_signal_strength',
-                'p_1_1_1', 'ta_1_1_1', 'co2_strg', 'le', 'h']
-
-data_type_error_flag = False
-for col in cols_2_check:
-    if col not in data.columns:
-        continue
-    error_positions = data[col].fillna(0).apply(pd.to_numeric, errors='coerce').isna()
-    if error_positions.any():
-        ff_logger.error(
-            f"""Check input files for {col} column near:\n {error_positions[error_positions == True].index.strftime('%d-%m-%Y %H:%M').values} in {'biomet' if len(meteo_cols) > 0 and col in meteo_cols else 'data'} file"""
-        )
-        data_type_error_flag = True
-if data_type_error_flag:
+if check_data_types(data, meteo_cols):
     print("Data have some errors! Please check log file!")
     raise KeyboardInterrupt
 
@@ -524,128 +510,12 @@ if data_type_error_flag:
 #
 
 # %% id="mAdYXJFdSRbJ"
-have_rh_flag = False
-have_vpd_flag = False
-have_par_flag = False
-have_swin_flag = False
-have_rg_flag = False
-have_p_flag = False
-have_pr_flag = False
-have_ppfd_flag = False
-
-for col in data.columns:
-    # Eddypro renames
-    if col == 'u*':
-        print(f"renaming {col} to u_star")
-        data = data.rename(columns={col: 'u_star'})
-    if 'co2_signal_strength' in col:
-        print(f"renaming {col} to co2_signal_strength")
-        data = data.rename(columns={col: 'co2_signal_strength'})
-    if col in ['co2_signal_strength_7500_mean', 'CO2SS'.lower()] or 'co2_signal_strength' in col:
-        print(f"renaming {col} to co2_signal_strength")
-        data = data.rename(columns={col: 'co2_signal_strength'})
-    if col in ['ch4_signal_strength_7700_mean', 'CH4SS'.lower()] or 'ch4_signal_strength' in col:
-        print(f"renaming {col} to ch4_signal_strength")
-        data = data.rename(columns={col: 'ch4_signal_strength'})
-    
-    # Biomet renames
-    if col == 'ppfd_in_1_1_1':
-        print(f"renaming {col} to ppfd_1_1_1")
-        data = data.rename(columns={col: 'ppfd_1_1_1'})
-    if col == 'sw_in_1_1_1':
-        print(f"renaming {col} to swin_1_1_1")
-        data = data.rename(columns={col: 'swin_1_1_1'})
-    
-    if col == "rh_1_1_1":
-        have_rh_flag = True
-    if col == "vpd_1_1_1":
-        have_vpd_flag = True
-    if col in ['swin_1_1_1', 'sw_in_1_1_1']:
-        have_swin_flag = True
-    if col == 'par':
-        have_par_flag = True
-    if col == 'rg_1_1_1':
-        have_rg_flag = True
-    if col == 'p_1_1_1':
-        have_p_flag = True
-    if col == 'p_rain_1_1_1':
-        have_pr_flag = True
-    if col == 'ppfd_1_1_1':
-        have_ppfd_flag = True
-
-if not (have_ppfd_flag or have_swin_flag):
-    print("NO PPFD and SWin")
-else:
-    if not have_ppfd_flag:
-        data['ppfd_1_1_1'] = data['swin_1_1_1'] / 0.46
-    if not have_swin_flag:
-        data['swin_1_1_1'] = 0.46 * data['ppfd_1_1_1']
-    have_ppfd_flag = True
-    have_swin_flag = True
-
-if not (have_rg_flag or have_swin_flag):
-    print("NO RG AND SWIN")
-else:
-    print("Checking RG-SWIN pair")
-    if not have_rg_flag:
-        data['rg_1_1_1'] = data['swin_1_1_1']
-    if not have_swin_flag:
-        data['swin_1_1_1'] = data['rg_1_1_1']
-        have_swin_flag = True
-
-if not (have_p_flag or have_pr_flag):
-    print("NO P and P_RAIN")
-else:
-    print("Checking P <-> P_rain pair")
-    if not have_p_flag:
-        data['p_1_1_1'] = data['p_rain_1_1_1']
-    if not have_pr_flag:
-        data['p_rain_1_1_1'] = data['p_1_1_1']
-
-if not (have_vpd_flag or have_rh_flag):
-    print("NO RH AND VPD")
-else:
-    if 'ta_1_1_1' in data.columns:
-        temp_k = (data['ta_1_1_1'] + 273.15)
-    else:
-        temp_k = data['air_temperature']
-    logE = 23.5518 - (2937.4 / temp_k) - 4.9283 * np.log10(temp_k)
-    ehpa = np.power(10, logE)
-    if not have_vpd_flag:
-        print("calculating vpd_1_1_1 from rh_1_1_1 and air temperature")
-        data['vpd_1_1_1'] = ehpa - (ehpa * data['rh_1_1_1'] / 100)
-    if not have_rh_flag:
-        # TODO QOA 1 possibly an error
-        # OA: check tg for the formula
-        print("estimating rh_1_1_1 from air temperature")
-        data['rh_1_1_1'] = ehpa
-
-if not (have_par_flag or have_swin_flag):
-    print("NO PAR and SWin")
-else:
-    if not have_par_flag:
-        data['par'] = data['swin_1_1_1'] / 0.47  # SWin=PAR*0.47
-    if not have_swin_flag:
-        data['swin_1_1_1'] = 0.47 * data['par']
-
-for col in ['co2_signal_strength_7500_mean', 'CO2SS'.lower()]:
-    # print(data.columns.to_list())
-    if col in data.columns.to_list():
-        print(f"renaming {col} to co2_signal_strength")
-        data = data.rename(columns={col: 'co2_signal_strength'})
-
-for col in ['ch4_signal_strength_7700_mean', 'CH4SS'.lower()]:
-    # print(data.columns.to_list())
-    if col in data.columns.to_list():
-        print(f"renaming {col} to ch4_signal_strength")
-        data = data.rename(columns={col: 'ch4_signal_strength'})
-
-if not config.calc.has_meteo or 'ta_1_1_1' not in data.columns:
-    data['ta_1_1_1'] = data['air_temperature'] - 273.15
-    ff_logger.info("No Ta_1_1_1 column found, replaced by 'air_temperature'")
+data = prepare_meteo_columns(data, config.calc.has_meteo)
 
-df_ias_export = data.copy()
 try_compare_stats(data, repo_dir / 'misc/expected_stats.xlsx')
+# columns unused by filters and plots are kept aside until IAS and output_all exports
+data, pass_through = split_pass_through(data, time_col, config.filters, extra_cols=cols_to_investigate)
+df_ias_export = data.copy()
 
 # %% [markdown] id="soyyX-MCbaXt"
 # ## Получение NEE из потока CO2 и накопления
@@ -659,21 +529,8 @@ try_compare_stats(data, repo_dir / 'misc/expected_stats.xlsx')
 # %% id="cjt05XXtbr69"
 # Пробелы длиной 3 и меньше заполняются линейно
 if config.calc.calc_nee and 'co2_strg' in data.columns:
-    tmp_data = data.copy()
-    tmp_data['co2_strg_tmp'] = tmp_data['co2_strg'].copy()
-    tmp_filter_db = {'co2_strg_tmp': []}
-    if 'co2_strg' in config.filters.quantile.keys():
-        tmp_q_config = {'co2_strg_tmp': config.filters.quantile['co2_strg']}
-    else:
-        tmp_q_config = {}
-    tmp_filter_db = {'co2_strg_tmp': []}
-    tmp_data, tmp_filter_db = quantile_filter(tmp_data, tmp_filter_db, tmp_q_config)
-    tmp_data.loc[~get_column_filter(tmp_data, tmp_filter_db, 'co2_strg_tmp').astype(bool), 'co2_strg_tmp'] = np.nan
-    # tmp_data['co2_strg_tmp'] = tmp_data['co2_strg_tmp'].interpolate(limit=3)
-    # tmp_data['co2_strg_tmp'].fillna(bg.calc_rolling(tmp_data['co2_strg_tmp'], rolling_window=10 , step=gl.points_per_day, min_periods=4))
+    tmp_data, tmp_filter_db = filter_co2_strg(data, config.filters.quantile)
     basic_plot(tmp_data, ['co2_strg_tmp'], config.metadata.site_name, tmp_filter_db, steps_per_day=gl.points_per_day)
-    if 'co2_strg_tmp_quantilefilter' in tmp_data:
-        print(tmp_q_config, tmp_filter_db, tmp_data['co2_strg_tmp_quantilefilter'].value_counts())
 
 # %% id="2IQ7W6pslYF-"
 # Решаем, суммировать ли исходный co2_flux и co2_strg_filtered_filled для получения NEE
@@ -684,10 +541,7 @@ ff_logger.info(f"config.calc.calc_with_strg is set to {config.calc.calc_with_str
 
 # %% id="ueuvsNxYdtgs"
 if config.calc.calc_nee and 'co2_strg' in data.columns:
-    if config.calc.calc_with_strg:
-        data['nee'] = (tmp_data['co2_flux'] + tmp_data['co2_strg_tmp']).copy()
-    else:
-        data['nee'] = data['co2_flux'].copy()
+    data = calc_nee(data, tmp_data, config.calc.calc_with_strg)
     del tmp_data
     if 'nee' not in cols_to_investigate:
         cols_to_investigate.append('nee')
@@ -726,7 +580,7 @@ data[cols_to_investigate].describe()
 
 # %% id="apGNk8eBxgBv"
 plot_data = data.copy()
-filters_db = {col: [] for col in plot_data.columns.to_list()}
+filters_db = FilterStore(plot_data.index, plot_data.columns)
 print(plot_data.columns.to_list())
 
 # %% [markdown] id="BL_6XxGGsCBK"
@@ -822,7 +676,7 @@ plot_data, filters_db = std_window_filter(plot_data, filters_db, config.filters.
 
 # %% id="gl9cImVr2MO3"
 unroll_filters_db = filters_db.copy()
-plot_data, tmp_filter = mad_hampel_filter(plot_data, filters_db, config.filters.madhampel)
+plot_data, filters_db = mad_hampel_filter(plot_data, filters_db, config.filters.madhampel)
 
 # %% [markdown] id="iu8MLKyh1AFk"
 # ## Ручная фильтрация
@@ -838,7 +692,7 @@ if not config.from_file:
         # ['25.8.2023 12:00', '25.8.2023 12:00'],
     ]
 for man_range in config.filters.man_ranges:
-    plot_data, tmp_filter = manual_filter(plot_data, filters_db, col_name="nee", man_range=man_range, value=0,
+    plot_data, filters_db = manual_filter(plot_data, filters_db, col_name="nee", man_range=man_range, value=0,
                                           manual_config=man_range)
 
 # %% [markdown] id="quGbtDaJ_gID"
@@ -848,20 +702,21 @@ for man_range in config.filters.man_ranges:
 all_filters = {}
 for key, filters in filters_db.items():
     if len(filters) > 0:
-        pl_data = plot_data.copy()
+        # rows passed all the previous filters of the column
+        pl_rows = np.ones(len(plot_data.index), dtype=bool)
         for filter_name in filters:
+            filter = filters_db.get_mask(key, filter_name)
             all_filters[filter_name] = []
-            all_filters[filter_name].append(len(pl_data.index))
-            filtered_amount = len(pl_data.query(f"{filter_name}==0").index)
+            all_filters[filter_name].append(int(pl_rows.sum()))
+            filtered_amount = int((pl_rows & (filter == 0)).sum())
             all_filters[filter_name].append(filtered_amount)
-            # old_val =  len(pl_data.index)
-            pl_data = pl_data.query(f"{filter_name}==1")
-            # print(filter_name, filtered_amount, len(pl_data.index) - old_val)
+            pl_rows = pl_rows & (filter == 1)
 fdf_df = pd.DataFrame(all_filters)
 
 ff_logger.info("Какая часть данных от общего количества (в %) была отфильтрована:")
 df_stats = fdf_df.iloc[1] / len(plot_data) * 100
 ff_logger.info('\n' + df_stats.to_string())
+ff_logger.debug(f"Combined filters cache: {filters_db.cache_info()}")
 
 # %% [markdown] id="gA_IPavss0bq"
 # # Отрисовка рядов
@@ -944,10 +799,7 @@ output_template = {
     'Rg': ['Wm-2'], 'Tair': ['degC'], 'Tsoil': ['degC'], 'rH': ['%'], 'VPD': ['hPa'], 'Ustar': ['ms-1'],
     'CH4flux': ['umol_m-2_s-1']
 }
-rep_df = plot_data.copy()
-for column, filter in filters_db.items():
-    filter = get_column_filter(rep_df, filters_db, column)
-    rep_df.loc[~filter.astype(bool), column] = np.nan
+rep_df = apply_filters(plot_data, filters_db)
 
 gl.rep_level3_fpath = gl.out_dir / f"REddyProc_{config.metadata.site_name}_{int(plot_data[time_col].dt.year.median())}.txt"
 export_rep_level3(gl.rep_level3_fpath, rep_df, time_col, output_template, config, gl.points_per_day)
@@ -965,7 +817,7 @@ if not config.from_file:
 if config.calc.has_meteo:
     swin_vals = data['swin_1_1_1'] if 'swin_1_1_1' in data.columns else None 
     export_ias(gl.out_dir, config.metadata.site_name, config.data_export.ias.out_fname_ver_suffix, config.data_export.ias.split_intervals,
-               df_ias_export, time_col=time_col, swin_vals=swin_vals)
+               join_pass_through(df_ias_export, pass_through), time_col=time_col, swin_vals=swin_vals)
 
 # %% [markdown] id="Pm8hiMrb_wRW"
 # ## Файл для FAT
@@ -982,10 +834,7 @@ if config.calc.has_meteo:
         'Ta_gapfilling': ['oC'], 'VPD_gapfilling': ['kPa'], 'period': ['--']
     }
     
-    fat_df = plot_data.copy()
-    for column, filter in filters_db.items():
-        filter = get_column_filter(fat_df, filters_db, column)
-        fat_df.loc[~filter.astype(bool), column] = np.nan
+    fat_df = apply_filters(plot_data, filters_db)
     
     export_fat(fat_df, fat_output_template, time_col, gl, config)
     del fat_df
@@ -995,95 +844,16 @@ if config.calc.has_meteo:
 # Файл содержит исходные переменные (потоки, метеорологические переменные). Колонка "tmp_datetime" - результат формирования единой даты-времени из двух колонок файла full output - date, time. Колонка datetime - результат работы коррекции даты-времени для столбца tmp_datetime. datetime_meteo - результат работы коррекции даты-времени для столбца timestamp_1. Далее файл содержит записи о применении каждого фильтра к каждой переменной (потоки, метеорология) в бинарном формате: 1 – фильтр не применен, 0 – применен.
 
 # %% id="pk1lGANovC5U"
-full_column_list = [c for c in plot_data.columns]
-full_column_list = full_column_list.insert(0, full_column_list.pop(full_column_list.index(time_col)))
-if 'date' in plot_data.columns:
-    plot_data.loc[plot_data['date'].isna(), 'date'] = plot_data[time_col].dt.date
-if 'time' in plot_data.columns:
-    plot_data.loc[plot_data['time'].isna(), 'time'] = plot_data[time_col].dt.time
-
 all_fpath = gl.out_dir / 'output_all.csv'
-plot_data.fillna(-9999).to_csv(all_fpath, index=None, columns=full_column_list)
-ff_logger.info(f"Basic file saved to {all_fpath}")
+export_output_all(all_fpath, join_pass_through(plot_data, pass_through), filters_db, time_col)
 
 # %% [markdown] id="-MSrgUD0-19l"
 # ## Файл-резюме результатов фильтрации
 # Краткий выходной файл после фильтраций. Содержит исходные основные переменные (метео и потоки), отфильтрованные основные переменные (индекс _filtered), интегральный флаг для каждой переменной, средние суточные ходы в окне 30 и 10 дней для отфильтрованных переменных.
 
 # %% id="22dPWc2u-6IG"
-columns_to_save = ['Date', 'Time', 'DoY', 'ta', 'rh', 'vpd', 'swin', 'ppfd', 'p', 'h', 'le', 'co2_flux', 'co2_strg',
-                   'ch4_flux', 'u_star']
-
-basic_df = plot_data.copy()
-
-basic_df['Date'] = basic_df[time_col].dt.date
-basic_df['Time'] = basic_df[time_col].dt.time
-basic_df['DoY'] = np.round(
-    basic_df[time_col].dt.dayofyear + basic_df[time_col].dt.hour / 24. + basic_df[time_col].dt.minute / 24. / 60.,
-    decimals=3)
-
-if not config.calc.has_meteo:
-    basic_df['ta_1_1_1'] = basic_df['air_temperature'] - 273.15
-# метео
-for col in ['ta', 'rh', 'vpd', 'swin', 'ppfd', 'p']:
-    # print(f"{col}(_[1-9]){{1,4}})")
-    col_pos = [bool(re.fullmatch(f"{col}(_[1-9]){{1,4}}", col_in)) for col_in in basic_df.columns]
-    if not any(col_pos):
-        continue
-    else:
-        real_col = basic_df.columns[np.argmax(col_pos)]
-        basic_df[col] = basic_df[real_col]
-
-# Фильтрованные потоки
-for col in ['nee', 'h', 'le', 'co2_strg', 'ch4_flux']:
-    if col not in basic_df.columns:
-        continue
-    basic_df[f"{col}_filtered"] = basic_df[col]
-    filter = get_column_filter(basic_df, filters_db, col)
-    basic_df.loc[~filter.astype(bool), f"{col}_filtered"] = np.nan
-    columns_to_save.append(f"{col}_filtered")
-
-# Фильтрованные метео
-for col in ['ta', 'rh', 'vpd', 'swin', 'ppfd', 'p']:
-    if col not in basic_df.columns:
-        continue
-    basic_df[f"{col}_filtered"] = basic_df[col]
-    filter = get_column_filter(basic_df, filters_db, col)
-    basic_df.loc[~filter.astype(bool), f"{col}_filtered"] = np.nan
-    columns_to_save.append(f"{col}_filtered")
-
-# флаги
-for col in ['ta', 'rh', 'vpd', 'swin', 'ppfd', 'p', 'h', 'le', 'co2_flux', 'co2_strg', 'nee',
-            'ch4_flux']:  # ['nee', 'ch4', 'le', 'h']:
-    if col not in basic_df.columns:
-        continue
-    basic_df[f"{col}_integral_flag"] = get_column_filter(basic_df, filters_db, col)
-    columns_to_save.append(f"{col}_integral_flag")
-
-# for key, item in filters_db.items():
-#   columns_to_save = columns_to_save + item
-
-
-for col in ['h', 'le', 'nee', 'rg', 'ppfd', 'ta', 'rh', 'vpd', 'ch4_flux']:
-    if f"{col}_filtered" not in basic_df.columns:
-        print(f"No {col}_filtered in file")
-        continue
-    col_out = col
-    if col == "ppfd":
-        col_out = "rg"
-    basic_df[f'{col_out}_10d'] = bg.calc_rolling(basic_df[f"{col}_filtered"], rolling_window=10, step=gl.points_per_day,
-                                                 min_periods=7)
-    basic_df[f'{col_out}_30d'] = bg.calc_rolling(basic_df[f"{col}_filtered"], rolling_window=30, step=gl.points_per_day,
-                                                 min_periods=7)
-    columns_to_save.append(f'{col_out}_10d')
-    columns_to_save.append(f'{col_out}_30d')
-
-basic_df = basic_df[[col for col in columns_to_save if col in basic_df.columns]]
-basic_df = basic_df.fillna(-9999)
-
 summary_fpath = gl.out_dir / 'output_summary.csv'
-basic_df.to_csv(summary_fpath, index=None)
-ff_logger.info(f"New basic file saved to {summary_fpath}")
+export_output_summary(summary_fpath, plot_data, filters_db, time_col, gl.points_per_day, config.calc.has_meteo)
 # %% [markdown] id="775a473e"
 # # Обработка инструментом REddyProc
 # В этом блоке выполняется 1) фильтрация по порогу динамической скорости ветра (u* threshold), 2) заполнение пропусков в метеорологических переменных и 30-минутных потоках, 3) разделение NEE на валовую первичную продукцию (GPP) и экосистемное дыхание (Reco), 4) вычисление суточных, месячных, годовых средних и среднего суточного хода по месяцам.
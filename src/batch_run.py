@@ -0,0 +1,104 @@
+"""
+Processes many sites in parallel, each site in its own process with its own output folder:
+    python -m src.batch_run sites_dir --out-dir batch_output --workers 4
+sites_dir must contain a folder per site with the input files and optionally one *config*.yaml
+(default config with auto detection otherwise).
+Outputs of a site are in out_dir/<site folder>, per site wall time and status are in out_dir/batch_summary.csv
+"""
+
+import argparse
+import logging
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from src.config.config_io import CONFIG_GLOB
+from src.data_io.utils.table_cache import init_table_cache
+from src.ff_logger import init_logging, ff_logger
+from src.helpers.io_helpers import ensure_empty_dir, find_unique_file
+
+SUMMARY_FNAME = 'batch_summary.csv'
+
+
+def find_sites(sites_dir: Path) -> list[Path]:
+    return sorted(dpath for dpath in Path(sites_dir).iterdir() if dpath.is_dir())
+
+
+def run_site_job(site_dir: Path, out_dir: Path, with_reddyproc: bool, with_cache: bool) -> SimpleNamespace:
+    """ Runs in a separate process, so logging, prints and the rest of the globals belong to this site only """
+    start = time.perf_counter()
+    ensure_empty_dir(out_dir)
+    init_logging(level=logging.INFO, fpath=out_dir / 'log.log', to_stdout=False)
+    init_table_cache(out_dir / 'cache' if with_cache else None)
+
+    status, error = 'ok', ''
+    with open(out_dir / 'stdout.txt', 'w') as stdout, redirect_stdout(stdout):
+        try:
+            # imported here: spawned process does not need to import anything before logging is ready
+            from src.site_run import run_site
+            run_site(site_dir, out_dir, config_fpath=find_unique_file(site_dir, CONFIG_GLOB),
+                     with_reddyproc=with_reddyproc)
+        except Exception as e:
+            ff_logger.exception(f'Site {site_dir.name} failed.')
+            status, error = 'failed', f'{type(e).__name__}: {e}'
+
+    return SimpleNamespace(site=site_dir.name, status=status, wall_time=time.perf_counter() - start,
+                           error=error, out_dir=str(out_dir))
+
+
+def run_batch(sites_dir: Path, out_dir: Path, max_workers: int = None, with_reddyproc=True,
+              with_cache=True) -> pd.DataFrame:
+    sites_dir, out_dir = Path(sites_dir), Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    site_dirs = find_sites(sites_dir)
+    ff_logger.info(f'Batch of {len(site_dirs)} sites: {[d.name for d in site_dirs]}')
+
+    results = []
+    # spawn and a fresh process per site: no state (logging, R session, module globals) is shared between sites
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                             max_tasks_per_child=1) as executor:
+        futures = {executor.submit(run_site_job, site_dir, out_dir / site_dir.name, with_reddyproc, with_cache): site_dir
+                   for site_dir in site_dirs}
+        for future in as_completed(futures):
+            site_dir = futures[future]
+            try:
+                res = future.result()
+            except Exception as e:
+                # worker process died, site had no chance to report
+                res = SimpleNamespace(site=site_dir.name, status='crashed', wall_time=np.nan,
+                                      error=f'{type(e).__name__}: {e}', out_dir=str(out_dir / site_dir.name))
+            ff_logger.info(f'Site {res.site}: {res.status}, {res.wall_time:.1f} s')
+            results += [vars(res)]
+
+    summary = pd.DataFrame(results, columns=['site', 'status', 'wall_time', 'error', 'out_dir'])
+    summary = summary.sort_values('site', ignore_index=True)
+    summary.to_csv(out_dir / SUMMARY_FNAME, index=False)
+    ff_logger.info(f'Batch summary saved to {out_dir / SUMMARY_FNAME}: \n{summary.to_string()}')
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sites_dir', type=Path)
+    parser.add_argument('--out-dir', type=Path, default=Path('batch_output'))
+    parser.add_argument('--workers', type=int, default=None, help='default is the number of CPUs')
+    parser.add_argument('--no-reddyproc', action='store_true')
+    parser.add_argument('--no-cache', action='store_true', help='parse input files even if site cache has them')
+    args = parser.parse_args()
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    init_logging(level=logging.INFO, fpath=args.out_dir / 'batch_log.log', to_stdout=True)
+    summary = run_batch(args.sites_dir, args.out_dir, args.workers, with_reddyproc=not args.no_reddyproc,
+                        with_cache=not args.no_cache)
+    sys.exit(0 if (summary['status'] == 'ok').all() else 1)
+
+
+if __name__ == '__main__':
+    main()
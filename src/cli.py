@@ -0,0 +1,52 @@
+"""
+Headless FluxFilter.py run from FFConfig yaml for servers and cron:
+    python -m src.cli config.yaml --input-dir site_files --out-dir output
+Without config argument, *config*.yaml of the input dir or the default config is used.
+Interactive plots are skipped, plotly, matplotlib, IPython and ipywidgets are not imported unless --plots.
+Exit code is 0 on success and 1 on any error, details are in out_dir/log.log
+"""
+
+import argparse
+import logging
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+
+from src.config.config_io import CONFIG_GLOB
+from src.data_io.utils.table_cache import init_table_cache
+from src.ff_logger import init_logging, ff_logger
+from src.helpers.io_helpers import ensure_empty_dir, find_unique_file
+from src.site_run import run_site
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('config', type=Path, nargs='?', default=None)
+    parser.add_argument('--input-dir', type=Path, default=Path('.'))
+    parser.add_argument('--out-dir', type=Path, default=Path('output'))
+    parser.add_argument('--no-reddyproc', action='store_true')
+    parser.add_argument('--workers', type=int, default=1, help='processes for the per column filters')
+    parser.add_argument('--plots', action='store_true', help='save filtered plots to out_dir/local/plots')
+    parser.add_argument('--quiet', action='store_true', help='log only to out_dir/log.log')
+    parser.add_argument('--no-cache', action='store_true', help='parse input files even if out_dir/cache has them')
+    args = parser.parse_args(argv)
+
+    ensure_empty_dir(args.out_dir)
+    init_logging(level=logging.INFO, fpath=args.out_dir / 'log.log', to_stdout=not args.quiet)
+    init_table_cache(None if args.no_cache else args.out_dir / 'cache')
+    try:
+        config_fpath = args.config or find_unique_file(args.input_dir, CONFIG_GLOB)
+        executor = ProcessPoolExecutor(args.workers) if args.workers > 1 else nullcontext()
+        with executor:
+            run_site(args.input_dir, args.out_dir, config_fpath, with_reddyproc=not args.no_reddyproc,
+                     executor=executor if args.workers > 1 else None, plots=args.plots)
+    except Exception:
+        ff_logger.exception('FluxFilter run failed.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -115,6 +115,8 @@ class ImportConfig(BaseConfig):
     
     import_mode: Annotated[ImportMode | None, gen_enum_info(ImportMode)] = None
     time_col: str = None
+    """ None: eddypro files are loaded whole, N: csv files are read by N rows chunks to reduce peak memory """
+    stream_chunk_rows: int | None = None
 
 
 class CalcConfig(BaseConfig):
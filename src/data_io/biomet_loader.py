@@ -1,15 +1,25 @@
+from typing import Callable
+
+import pandas as pd
 from bglabutils import basic as bg
 from src.config.ff_config import MergedDateTimeFileConfig
+from src.data_io.stream_loader import can_stream, datetime_chunk_parser, stream_time_series
+from src.data_io.utils.table_cache import table_cache
 from src.data_io.utils.time_series_utils import datetime_parser
 from src.ff_logger import ff_logger
 
 
-def load_biomet(config_meteo, data_freq):
+def load_biomet(config_meteo, data_freq, cache_params: dict, stream_meteo: Callable[[], pd.DataFrame] = None):
     print("Проверяем корректность временных меток. Убираем повторы, дополняем пропуски. "
           "На случай загрузки нескольких файлов. При загрузке одного делается автоматически.")
     
-    data_meteo, time_meteo = bg.load_df(config_meteo)
-    data_meteo = data_meteo[next(iter(data_meteo))]  # т.к. изначально у нас словарь
+    def load_meteo():
+        if stream_meteo:
+            return stream_meteo()
+        dfs, _ = bg.load_df(config_meteo)
+        return dfs[next(iter(dfs))]  # т.к. изначально у нас словарь
+    
+    data_meteo = table_cache.cached(config_meteo['path'], cache_params, load_meteo)
     
     meteo_freq = data_meteo.index.freq
     print("Диапазон времени метео: ", data_meteo.index[[0, -1]])
@@ -24,7 +34,7 @@ def load_biomet(config_meteo, data_freq):
     return data_meteo
 
 
-def load_biomets(bm_paths, tgt_time_col, data_freq, c_bm: MergedDateTimeFileConfig):
+def load_biomets(bm_paths, tgt_time_col, data_freq, c_bm: MergedDateTimeFileConfig, stream_chunk_rows: int = None):
     if len(bm_paths) == 0:
         return None, False
     
@@ -39,7 +49,16 @@ def load_biomets(bm_paths, tgt_time_col, data_freq, c_bm: MergedDateTimeFileConf
         },
         'repair_time': c_bm.repair_time,
     }
-    dfs = load_biomet(bg_bm_config, data_freq)
+    stream_meteo = None
+    if stream_chunk_rows and can_stream(bm_paths):
+        def stream_meteo():
+            parse_time = datetime_chunk_parser(c_bm.datetime_col, c_bm.try_datetime_formats)
+            return stream_time_series(bm_paths, tgt_time_col, [c_bm.datetime_col], parse_time, c_bm.repair_time,
+                                      [-9999] if -9999 in c_bm.missing_data_codes else [], stream_chunk_rows)
+    
+    cache_params = {'loader': 'eddypro_biomet', 'time_col': tgt_time_col, 'biomet': c_bm.model_dump(mode='json'),
+                    'stream': stream_meteo is not None}
+    dfs = load_biomet(bg_bm_config, data_freq, cache_params, stream_meteo)
     ff_logger.info('Колонки в метео \n'
                    f'{dfs.columns.values}')
             
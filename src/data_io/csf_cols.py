@@ -50,3 +50,8 @@ COLS_CSF_IMPORT_MAP = COLS_CSF_UNUSED_NORENAME_IMPORT_DICT | COLS_CSF_TO_SCRIPT_
 COLS_CSF_KNOWN = list(COLS_CSF_IMPORT_MAP.keys()) + COLS_CSF_TIME + COLS_CSF_IGNORED
 
 CSF_HEADER_DETECTION_COLS = COLS_CSF_KNOWN
+
+# parsed directly as float64 on import; time, text, qc flags and counts are left to dtype inference
+COLS_CSF_FLOAT = [col for col in COLS_CSF_KNOWN
+                  if col not in COLS_CSF_TIME + COLS_CSF_IGNORED + ['FTPRNT_EQUATION', 'daytime']
+                  and not col.endswith(('_QC', '_samples'))]
@@ -6,6 +6,7 @@ import pandas as pd
 from src.config.config_types import InputFileType
 from src.data_io.biomet_loader import load_biomets
 from src.data_io.biomet_cols import BIOMET_HEADER_DETECTION_COLS_LOWER
+from src.data_io.utils.table_loader import map_files
 from src.data_io.utils.time_series_utils import merge_time_series
 from src.data_io.time_series_loader import preload_time_series, repair_time, merge_time_series_biomet
 from src.config.ff_config import FFConfig
@@ -70,15 +71,15 @@ def regex_fix_col_names(df: pd.DataFrame, regex_map: dict[str, str]):
 def import_csf(config: FFConfig):
     # TODO 1 finish transfer to abstract loader
 
-    dfs_csf = {fpath.name: preload_time_series(fpath, ftype, config)
-               for fpath, ftype in config.data_import.input_files.items() if ftype == InputFileType.CSF}
-
-    for fpath, df in dfs_csf.items():
+    def import_csf_file(fpath):
+        df = preload_time_series(fpath, InputFileType.CSF, config)
         df = regex_fix_col_names(df, COLS_CSF_TO_SCRIPT_U_REGEX_RENAMES)
         check_csf_col_names(df)        
         df = import_rename_csf_cols(df, config.data_import.time_col)
-        df = repair_time(df, config.data_import.time_col, fill_gaps=False)
-        dfs_csf[fpath] = df
+        return repair_time(df, config.data_import.time_col, fill_gaps=False)
+    
+    fpaths = [fpath for fpath, ftype in config.data_import.input_files.items() if ftype == InputFileType.CSF]
+    dfs_csf = {fpath.name: df for fpath, df in zip(fpaths, map_files(import_csf_file, fpaths, 'Imported'))}
        
     if len(dfs_csf) > 1:
         ff_logger.info('Merging data from files...')
@@ -1,5 +1,6 @@
 import pprint
 from pathlib import Path
+from types import SimpleNamespace
 
 from src.data_io.csf_cols import CSF_HEADER_DETECTION_COLS
 from src.config.config_types import InputFileType, ImportMode
@@ -7,11 +8,12 @@ from src.data_io.eddypro_cols import EDDYPRO_HEADER_DETECTION_COLS
 from src.data_io.biomet_cols import BIOMET_HEADER_DETECTION_COLS
 from src.data_io.ias_cols import IAS_HEADER_DETECTION_COLS
 from src.data_io.parse_fnames import try_parse_eddypro_fname, try_parse_ias_fname, try_parse_csf_fname
-from src.data_io.utils.table_loader import load_table_from_file
+from src.data_io.utils.table_loader import load_table_from_file, sniff_csv, map_files
 from src.ff_logger import ff_logger
 from src.config.ff_config import FFConfig, FFGlobals
 from src.helpers.io_helpers import ensure_path
 from src.helpers.py_collections import ensure_list, format_dict
+from src.helpers.py_helpers import is_number
 
 SUPPORTED_FILE_EXTS_LOWER = ['.csv', '.xlsx', '.xls']
 
@@ -20,8 +22,18 @@ class AutoImportException(Exception):
     pass
 
 
-def detect_file_type(fpath: Path, nrows=4) -> InputFileType:
+def read_header_rows(fpath: Path, nrows) -> list[list]:
+    """ First rows without empty cells """
+    if fpath.suffix.lower() == '.csv':
+        # same file start is reused by the loader
+        return [[el for el in row if el != ''] for row in sniff_csv(fpath).rows[:nrows]]
     df = load_table_from_file(fpath, nrows=nrows, header_row=None)
+    return [row.dropna().to_list() for _, row in df.iterrows()]
+
+
+def detect_file_header(fpath: Path, nrows=4) -> SimpleNamespace:
+    """ ftype, header_row: index of the matched row, units_rows: non-numeric rows right after the header """
+    rows = read_header_rows(Path(fpath), nrows)
     
     biomest_cs = set(BIOMET_HEADER_DETECTION_COLS)
     ias_cs = set(IAS_HEADER_DETECTION_COLS) - biomest_cs
@@ -46,8 +58,7 @@ def detect_file_type(fpath: Path, nrows=4) -> InputFileType:
     
     # upper/lower case is yet skipped intentionally
     header_matches = []
-    for i, row in df.iterrows():
-        fixed_row = row.dropna()
+    for i, fixed_row in enumerate(rows):
         if len(fixed_row) == 0:
             continue
         
@@ -58,15 +69,24 @@ def detect_file_type(fpath: Path, nrows=4) -> InputFileType:
     positive_matches = [m for m in header_matches if m[2] > 0.5]
     
     if len(positive_matches) == 1:
-        _, ftype, _ = positive_matches[0]
+        header_row, ftype, _ = positive_matches[0]
         # ff_log.info(f'Detected file {fpath} as {ftype}') # duplicates
-        return ftype
+        units_rows = []
+        for i in range(header_row + 1, len(rows)):
+            if any(is_number(el) for el in rows[i]):
+                break
+            units_rows += [i]
+        return SimpleNamespace(ftype=ftype, header_row=header_row, units_rows=units_rows)
     else:
         guesses = '\n'.join([f'row: {i} match: {mr:0.2f} {ftype}' for i, ftype, mr in header_matches])
         ff_logger.warning(f'Cannot detect file type {fpath}, row guesses are: \n'
                           f'{guesses} \n'
                           f'Consider specifying file types manually according to import cell description.')
-        return InputFileType.UNKNOWN
+        return SimpleNamespace(ftype=InputFileType.UNKNOWN, header_row=None, units_rows=[])
+
+
+def detect_file_type(fpath: Path, nrows=4) -> InputFileType:
+    return detect_file_header(fpath, nrows).ftype
 
 
 def detect_known_files(input_dir=None, from_list: list[Path] = None) -> dict[Path, InputFileType]:
@@ -75,7 +95,7 @@ def detect_known_files(input_dir=None, from_list: list[Path] = None) -> dict[Pat
         input_files = [f for f in root_files if f.suffix.lower() in SUPPORTED_FILE_EXTS_LOWER]
     else:
         input_files = from_list
-    input_file_types = {f: detect_file_type(f) for f in input_files}
+    input_file_types = dict(zip(input_files, map_files(detect_file_type, input_files, 'Detected type of')))
     
     valid_ftypes = set(InputFileType) - {InputFileType.UNKNOWN}
     valid_ftype_names = [enum.value for enum in valid_ftypes]
@@ -1,7 +1,9 @@
 import bglabutils.basic as bg
 from src.data_io.biomet_loader import load_biomets
+from src.data_io.stream_loader import can_stream, date_time_chunk_parser, stream_time_series
 from src.data_io.time_series_loader import merge_time_series_biomet
-from src.data_io.utils.time_series_utils import date_time_parser
+from src.data_io.utils.table_cache import table_cache
+from src.data_io.utils.time_series_utils import date_time_parser, repair_time
 from src.ff_logger import ff_logger
 from src.config.config_types import InputFileType, DEBUG_NROWS
 from src.config.ff_config import FFConfig
@@ -36,8 +38,22 @@ def load_eddypro(config: FFConfig):
         },
         'repair_time': c_fo.repair_time,
     }
-    df_fo, time_col = bg.load_df(bg_fo_config)
-    df_fo = df_fo[next(iter(df_fo))]  # т.к. изначально у нас словарь
+    
+    chunk_rows = config.data_import.stream_chunk_rows
+    is_stream = bool(chunk_rows) and can_stream(fo_paths)
+    
+    def load_fo():
+        if is_stream:
+            parse_time = date_time_chunk_parser(c_fo.time_col, c_fo.try_time_formats, c_fo.date_col, c_fo.try_date_formats)
+            return stream_time_series(fo_paths, config.data_import.time_col, [c_fo.date_col, c_fo.time_col], parse_time,
+                                      c_fo.repair_time, [-9999] if -9999 in c_fo.missing_data_codes else [], chunk_rows)
+        dfs, _ = bg.load_df(bg_fo_config)
+        return dfs[next(iter(dfs))]  # т.к. изначально у нас словарь
+    
+    params = {'loader': 'eddypro_fo', 'time_col': config.data_import.time_col, 'fo': c_fo.model_dump(mode='json'),
+              'stream': is_stream}
+    df_fo = table_cache.cached(fo_paths, params, load_fo)
+    time_col = config.data_import.time_col
     data_freq = df_fo.index.freq
     
     print('Диапазон времени full_output: ', df_fo.index[[0, -1]])
@@ -46,12 +62,13 @@ def load_eddypro(config: FFConfig):
                    f'{df_fo.columns.values}')
 
     bm_paths = [str(fpath) for fpath, ftype in config.data_import.input_files.items() if ftype == InputFileType.EDDYPRO_BIOMET]
-    df_bm, has_meteo = load_biomets(bm_paths, config.data_import.time_col, data_freq, config.data_import.eddypro_biomet)
+    df_bm, has_meteo = load_biomets(bm_paths, config.data_import.time_col, data_freq, config.data_import.eddypro_biomet,
+                                   chunk_rows)
       
     if has_meteo:
         df = df_fo.join(df_bm, how='outer', rsuffix='_meteo')
         df[time_col] = df.index
-        df = bg.repair_time(df, time_col)
+        df = repair_time(df, time_col, fill_gaps=True)
         if df[df_bm.columns[-1]].isna().sum() == len(df.index):
             ff_logger.info('Bad meteo df_fo range, overriding option has_meteo to False')
             has_meteo = False
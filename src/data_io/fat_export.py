@@ -3,13 +3,20 @@ import pandas as pd
 
 from bglabutils import basic as bg
 from src.config.ff_config import FFConfig, FFGlobals
+from src.data_io.utils.time_features import doy_fraction, time_features
 from src.ff_logger import ff_logger
 
+FAT_OUTPUT_TEMPLATE = {
+    'DoY': ['--'], r'u*': ['m s-1'], 'H': ['W m-2'], 'lE': ['-'], 'NEE': ['umol m-2 s-1'],
+    'PPFD': ['umol m-2 s-1'], 'Ta': ['oC'], 'VPD': ['kPa'], 'PPFD_gapfilling': ['umol m-2 s-1'],
+    'Ta_gapfilling': ['oC'], 'VPD_gapfilling': ['kPa'], 'period': ['--']
+}
+# df columns read by export_fat to fill the template
+FAT_SOURCE_COLS = ['u_star', 'h', 'le', 'nee', 'ppfd_1_1_1', 'air_temperature', 'ta_1_1_1', 'vpd_1_1_1']
+
 
 def export_fat(df: pd.DataFrame, fat_output_template, time_col, gl: FFGlobals, config: FFConfig):
-    df['DoY'] = np.round(
-        df[time_col].dt.dayofyear + df[time_col].dt.hour / 24. + df[time_col].dt.minute / 24. / 60.,
-        decimals=3)
+    df['DoY'] = doy_fraction(df[time_col])
     df[r'u*'] = df['u_star'].fillna(-99999)
     df['H'] = df['h'].fillna(-99999)
     df['lE'] = df['le'].fillna(-99999)
@@ -46,7 +53,9 @@ def export_fat(df: pd.DataFrame, fat_output_template, time_col, gl: FFGlobals, c
         fat_filename = f"FAT_{config.metadata.site_name}_{year}.csv"
         fat_fpath = gl.out_dir / fat_filename
         pd.DataFrame(fat_output_template).to_csv(fat_fpath, index=False)
-        save_data = df.loc[df[time_col].dt.year == year]
+        # NaT times are not in any year
+        is_year = pd.array(time_features(df[time_col]).year == year).to_numpy(dtype=bool, na_value=False)
+        save_data = df.loc[is_year]
         if len(save_data.index) >= 5:
             save_data.to_csv(fat_fpath, index=False, header=False,
                              columns=[i for i in fat_output_template.keys()], mode='a')  # , sep=' ')
@@ -142,3 +142,6 @@ COLS_IAS_TIME = ['TIMESTAMP_START', 'TIMESTAMP_END', 'DTime']
 
 COLS_IAS_KNOWN = list(COLS_IAS_IMPORT_MAP.keys()) + list(COLS_IAS_CONVERSION_IMPORT.keys()) + COLS_IAS_TIME
 IAS_HEADER_DETECTION_COLS = COLS_IAS_KNOWN
+
+# parsed directly as float64 on import; time and qc flags are left to dtype inference
+COLS_IAS_FLOAT = [col for col in COLS_IAS_KNOWN if col not in COLS_IAS_TIME and '_SSITC_TEST' not in col]
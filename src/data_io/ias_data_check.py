@@ -11,15 +11,18 @@ from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from pandas.api.types import is_datetime64_any_dtype as is_datetime
+from pandas.api.types import is_datetime64_any_dtype as is_datetime, is_numeric_dtype
 
 from src.data_io.ias_cols import COLS_IAS_KNOWN
 from src.data_io.utils.table_loader import load_table_logged
+from src.data_io.utils.time_series_utils import infer_freq
 
 # np.set_printoptions(threshold=sys.maxsize)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+TIMESTAMP_FORMAT = '%Y%m%d%H%M'
+
 # TODO 1 QOA: (meeting) add option which disables ias check; ckeck line below
 # DONE: allows -9999 in any cols, is this better?
 # DONE merge into src.data_io.table_loader -> load_table_from_file
@@ -65,19 +68,9 @@ dupe_defs_check = {re.sub(r'_\d_\d_\d', '', col) for col in COLS_IAS_KNOWN} - {'
 assert set(known_columns) == dupe_defs_check
 
 
-def get_freq(df, time):
-    try_max = 100
-    try_ind = 0
-    t_shift = 5
-    start = 1
-    deltas = df[time] - df[time].shift(1)
-    while try_ind < try_max:
-        del_arr = deltas.iloc[start + try_ind * t_shift: start + try_ind * t_shift + t_shift].values
-        if not np.all(del_arr == del_arr[0]) and del_arr[0] is not None:
-            try_ind = try_ind + 1
-            continue
-        else:
-            return del_arr[0]
+def lines_extra(lines) -> dict:
+    """ Log record extra: file lines (header is line 1) of the reported values for machine readable reports """
+    return {'lines': [int(line) for line in lines]}
 
 
 def column_checker(col_list):
@@ -123,14 +116,16 @@ def column_checker(col_list):
         logger.error(
             _("Columns naming problem, columns {} do not have correct suffix structure.").format(no_index_cols))
     
-    unique_cols = list(set([f[:-6] for f in re_check]))
-    for col in unique_cols:
+    cols_with_inds = {}
+    for f in re_check:
+        cols_with_inds.setdefault(f[:-6], []).append(f)
+    unique_cols = list(cols_with_inds.keys())
+    for col, col_with_inds in cols_with_inds.items():
         
         if col not in known_columns:
             logger.warning(
                 _("The column {} is not in the known columns list, please double-check the name!").format(col))
         
-        col_with_inds = [f for f in re_check if re.fullmatch(f"{col}_[0-9]_[0-9]_[0-9]", f)]
         if len(col_with_inds) == 1:
             if col_with_inds[0][-5:] != '1_1_1':
                 logger.error(_("Suffix problem for {}, 1_1_1 should be used in case of a single variable.").format(
@@ -174,50 +169,52 @@ def column_checker(col_list):
 
 
 def check_time(data, time_in, check_year=True):
-    data_in = data.copy()
-    data_in['default_index'] = data.index + 2
-    data_in.index = data_in[time_in]
+    times = data[time_in]
+    lines = data.index.to_numpy() + 2
     outflag = 0
     
     logger.info(_("Checking time column for {}").format(time_in))
-    correct_column_type = is_datetime(data_in[time_in])
+    correct_column_type = is_datetime(times)
     if not correct_column_type:
         logger.info(_("{} is not of correct type.").format(time_in))
         outflag = 1
     
-    missed_values = data_in[time_in].isna()
+    missed_values = times.isna().to_numpy()
     if missed_values.any():
-        logger.error(_("Can't read timestamp. Please check entries near lines \n {}").format(
-            data_in.loc[missed_values, 'default_index'].to_numpy()))
+        logger.error(_("Can't read timestamp. Please check entries near lines \n {}").format(lines[missed_values]),
+                     extra=lines_extra(lines[missed_values]))
         outflag = 1
     
-    data_in_dup = data_in.drop(data_in[missed_values].index, axis=0)
+    valid_times = pd.DatetimeIndex(times[~missed_values])
+    valid_lines = lines[~missed_values]
     
-    if check_year and (
-            not (data_in_dup[time_in].dt.year.to_numpy()[0] == data_in_dup[time_in].dt.year.to_numpy()[:-1]).all()):
-        years = data_in_dup[time_in].dt.year.unique()
-        examples = [int(data_in_dup.query(f'{time_in}.dt.year=={f}')['default_index'].to_numpy()[0]) for f in years]
+    years = valid_times.year.to_numpy()
+    if check_year and len(years) > 0 and not (years[0] == years[:-1]).all():
+        unique_years, first_pos = np.unique(years, return_index=True)
+        order = np.argsort(first_pos)
+        examples = [int(line) for line in valid_lines[first_pos[order]]]
         logger.error(
-            _("There should be only one year presented in file, got {}, i.e. lines {}!").format(years, examples))
+            _("There should be only one year presented in file, got {}, i.e. lines {}!").format(unique_years[order], examples),
+            extra=lines_extra(examples))
         outflag = 1
     
-    if data_in_dup.index.duplicated(keep='first').any():
-        logger.error(_("Duplicated timestamps! check lines:{}").format(
-            data_in_dup.loc[data_in_dup.index.duplicated(), 'default_index'].to_numpy()))
+    duplicated = valid_times.duplicated(keep='first')
+    if duplicated.any():
+        logger.error(_("Duplicated timestamps! check lines:{}").format(valid_lines[duplicated]),
+                     extra=lines_extra(valid_lines[duplicated]))
         outflag = 1
     
     return outflag
 
 
 def final_time_check(data, time_in):
-    data_in = data.copy()
-    data_in['default_index'] = data.index + 2
-    data_in.index = data_in[time_in]
+    times = pd.DatetimeIndex(data[time_in], name=None)
+    lines = pd.Series(data.index.to_numpy() + 2, index=times)
     outflag = 0
     
-    data_freq = pd.to_timedelta(get_freq(data_in, time_in))
+    data_freq = infer_freq(data[time_in]).freq
     
-    year = data_in.index.year.to_numpy()[0]
+    year = times.year.to_numpy()[0]
     if "TIMESTAMP_START" in time_in:
         start = f"{year}.01.01 00:00"
         end = f"{year}.12.31 23:30"
@@ -231,15 +228,16 @@ def final_time_check(data, time_in):
     correct_index = pd.date_range(start=pd.to_datetime(start, format="%Y.%m.%d %H:%M"),
                                   end=pd.to_datetime(end, format="%Y.%m.%d %H:%M"),
                                   freq=pd.to_timedelta(data_freq))
-    extra_index = data_in.index.difference(correct_index)
-    missing_index = correct_index.difference(data_in.index)
+    extra_index = times.difference(correct_index)
+    missing_index = correct_index.difference(times)
     if len(missing_index) > 0:
         outflag = 1
         logger.error(_("Missing values: {}").format(missing_index.astype(str)))
     if len(extra_index) > 0:
         outflag = 1
-        logger.error(_("Extra values: {}, lines: {}").format(extra_index.astype(str),
-                                                             data_in.loc[extra_index, 'default_index'].to_numpy()))
+        extra_lines = lines.loc[extra_index].to_numpy()
+        logger.error(_("Extra values: {}, lines: {}").format(extra_index.astype(str), extra_lines),
+                     extra=lines_extra(extra_lines))
     
     logger.info("\n")
     
@@ -251,19 +249,100 @@ class IasCheckMode(Enum):
     IMPORT = 'IMPORT'
 
 
+def check_values(data: pd.DataFrame, mode: IasCheckMode) -> int:
+    """ 
+    Empty, -9999 only, inf, and non numeric values checks of each column.
+    Numeric columns are converted to a single 2D float array and checked by column reductions, 
+    only other (text) columns are converted one by one. Same messages and error count as per column checks.
+    """
+    num_cols = [col for col in data.columns if is_numeric_dtype(data[col]) and not is_datetime(data[col])]
+    values = np.empty((len(data), len(data.columns)))
+    raw_nan = np.empty(values.shape, dtype=bool)
+    raw_inf = np.empty(values.shape, dtype=bool)
+    raw_std_na = np.empty(values.shape, dtype=bool)
+    
+    num_pos = [data.columns.get_loc(col) for col in num_cols]
+    values[:, num_pos] = data[num_cols].to_numpy(dtype=float, na_value=np.nan)
+    raw_nan[:, num_pos] = np.isnan(values[:, num_pos])
+    raw_inf[:, num_pos] = np.isinf(values[:, num_pos])
+    raw_std_na[:, num_pos] = values[:, num_pos] == -9999
+    for pos, col in enumerate(data.columns):
+        if col in num_cols:
+            continue
+        raw_col = data[col]
+        raw_nan[:, pos] = raw_col.isna().to_numpy()
+        raw_inf[:, pos] = np.logical_or(raw_col == np.inf, raw_col == -np.inf).to_numpy()
+        raw_std_na[:, pos] = raw_col.eq(-9999).to_numpy()
+        values[:, pos] = pd.to_numeric(raw_col, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    
+    num_nan = np.isnan(values)
+    num_inf = np.isinf(values)
+    is_empty = raw_nan.all(axis=0)
+    is_std_na = raw_std_na.all(axis=0)
+    has_raw_inf = raw_inf.any(axis=0)
+    has_num_inf = num_inf.any(axis=0)
+    has_num_nan = num_nan.any(axis=0)
+    rows = data.index.to_numpy()
+    
+    col_errors = 0
+    for pos, col in enumerate(data.columns):
+        if is_empty[pos]:
+            col_errors += 1
+            logger.error(_("The column {} is empty.").format(col))
+            continue
+        
+        if is_std_na[pos]:
+            msg = _("The column {} has only -9999 values.").format(col)
+            if mode == IasCheckMode.STRICT:
+                col_errors += 1
+                logger.error(msg)
+            else:
+                logger.warning(msg)
+            continue
+        
+        # both raw and numeric values are checked: text may contain inf too
+        if has_raw_inf[pos]:
+            logger.error(_("INF val in {} at the position {}").format(col, rows[raw_inf[:, pos]]),
+                         extra=lines_extra(rows[raw_inf[:, pos]] + 2))
+            col_errors += 1
+        
+        if has_num_inf[pos]:
+            logger.error(_("INF val in {} at the position {}").format(col, rows[num_inf[:, pos]]),
+                         extra=lines_extra(rows[num_inf[:, pos]] + 2))
+            col_errors += 1
+        
+        if has_num_nan[pos]:
+            col_errors += 1
+            logger.error(_("Non numerical values in {} at lines {}").format(col, rows[num_nan[:, pos]] + 2),
+                         extra=lines_extra(rows[num_nan[:, pos]] + 2))
+    
+    return col_errors
+
+
 def check_ias_file(fpath, mode: IasCheckMode):
     # TODO 3 possibly extract later to abstract time series converter/repairer routines which are format independent? E: ok
     # eddypro may have similar flaws
     
     # data = load_ias(fpath)
     data = load_table_logged(fpath)
+    errors, _ = check_ias_data(data, mode)
+    return errors
+
+
+def check_ias_data(data: pd.DataFrame, mode: IasCheckMode) -> tuple[int, dict[str, pd.Series]]:
+    """ 
+    data: loaded ias table as is, without replacing missing data codes, not modified
+    returns errors count and parsed (coerced) TIMESTAMP_START, TIMESTAMP_END columns
+    """
+    data = data.copy(deep=False)
+    timestamps = {}
     
     total_errors = 0
     columns = list(copy(data.columns))
     if len(columns) < 3:
         logger.error(
             _("Not enough columns, please check your file. If you are using csv - make sure that it uses comma as a separator."))
-        return 0
+        return 0, timestamps
     
     check_column = column_checker(columns)
     total_errors += check_column
@@ -277,7 +356,8 @@ def check_ias_file(fpath, mode: IasCheckMode):
             logger.error(_('No column {} in the file!').format(col))
             continue
         
-        data[f'{col}_datetime'] = pd.to_datetime(data[col].fillna(0).astype(int), format="%Y%m%d%H%M", errors='coerce')
+        timestamps[col] = pd.to_datetime(data[col].fillna(0).astype(int), format=TIMESTAMP_FORMAT, errors='coerce')
+        data[f'{col}_datetime'] = timestamps[col]
         time_checks.append(check_time(data, f"{col}_datetime"))
         if not time_checks[-1]:
             final_time_checks.append(final_time_check(data, f"{col}_datetime"))
@@ -287,50 +367,13 @@ def check_ias_file(fpath, mode: IasCheckMode):
                 _("No  final timestamp checks for {}, please fix all errors to complete this step.").format(col))
     
     total_errors += np.sum(time_checks) + np.sum(final_time_checks)
-    col_errors = 0
-    
-    for col in columns:
-        if col in ['TIMESTAMP_START', 'TIMESTAMP_END'] or col not in data.columns:
-            continue
-        
-        na_test = data[col].isna().all()
-        if na_test:
-            col_errors += 1
-            logger.error(_("The column {} is empty.").format(col))
-            continue
-        
-        all_std_na = data[col].eq(-9999).all()
-        if all_std_na:
-            msg = _("The column {} has only -9999 values.").format(col)
-            if mode == IasCheckMode.STRICT:
-                col_errors += 1
-                logger.error(msg)
-            else:
-                logger.warning(msg)
-            continue
-        
-        inf_vals = data.loc[np.logical_or(data[col] == np.inf, data[col] == -np.inf)].index.to_numpy()
-        if len(inf_vals) > 0:
-            logger.error(_("INF val in {} at the position {}").format(col, inf_vals))
-            col_errors += 1
-        
-        # check_col = pd.to_numeric(data[col].fillna(-9999), errors='coerce')
-        check_col = pd.to_numeric(data[col], errors='coerce')
-        
-        inf_vals = check_col.loc[np.logical_or(check_col == np.inf, check_col == -np.inf)].index.to_numpy()
-        if len(inf_vals) > 0:
-            logger.error(_("INF val in {} at the position {}").format(col, inf_vals))
-            col_errors += 1
-        
-        wrong_vals = check_col.loc[check_col.isna()].index + 2
-        if len(wrong_vals) > 0:
-            col_errors += 1
-            logger.error(_("Non numerical values in {} at lines {}").format(col, wrong_vals.to_numpy()))
+    value_cols = [col for col in columns if col not in ['TIMESTAMP_START', 'TIMESTAMP_END'] and col in data.columns]
+    col_errors = check_values(data[value_cols], mode)
     
     total_errors += col_errors
     logger.info(_("{} errors in total, check logs!").format(total_errors))
     
-    return total_errors
+    return total_errors, timestamps
 
 
 ''' possibly make auto count later instead of col_errors += 1
@@ -346,10 +389,13 @@ class ErrorFlagHandler(logging.Handler):
 
 
 # TODO 1 test logs ias 1.0.0 vs cur
-def check_ias(fpath):
+def check_ias(fpath, data: pd.DataFrame = None) -> dict[str, pd.Series]:
+    """ data: already loaded fpath to skip the load, returns parsed TIMESTAMP_START, TIMESTAMP_END """
     logger.info("Checking IAS file...")
     
-    errors = check_ias_file(fpath, mode=IasCheckMode.IMPORT)
+    if data is None:
+        data = load_table_logged(fpath)
+    errors, timestamps = check_ias_data(data, mode=IasCheckMode.IMPORT)
     
     if errors > 0:
         msg = f"Input file {fpath} cannot be used yet. Please fix errors."
@@ -359,6 +405,7 @@ def check_ias(fpath):
         # raise SystemExit(msg)
         
         raise Exception(msg)
+    return timestamps
 
 
 # TODO E 3 ff uses its own logs handler, move to ias tool
@@ -9,14 +9,16 @@ from src.config.config_types import DEBUG_NROWS, IasExportIntervals
 from src.data_io.biomet_cols import BIOMET_HEADER_DETECTION_COLS
 from src.data_io.ias_cols import COLS_IAS_EXPORT_MAP, COLS_IAS_IMPORT_MAP, \
     COLS_IAS_KNOWN, COLS_IAS_TIME, COLS_IAS_UNUSED_NORENAME_IMPORT, COLS_IAS_CONVERSION_IMPORT, \
-    COLS_IAS_CONVERSION_EXPORT
-from src.data_io.ias_data_check import set_lang, check_ias
-from src.data_io.utils.table_loader import load_table_logged
+    COLS_IAS_CONVERSION_EXPORT, COLS_IAS_FLOAT
+from src.data_io.ias_data_check import set_lang, check_ias, TIMESTAMP_FORMAT
+from src.data_io.utils.table_cache import table_cache
+from src.data_io.utils.table_loader import load_table_logged, map_files
+from src.data_io.utils.time_features import time_features
 from src.data_io.time_series_loader import repair_time, cleanup_df
-from src.data_io.utils.time_series_utils import merge_time_series, detect_datetime_format, format_year_interval
+from src.data_io.utils.time_series_utils import merge_time_series, parse_datetime, format_year_interval
 from src.config.ff_config import FFConfig, IASImportConfig
-from src.helpers.pd_helpers import df_ensure_cols_case
-from src.helpers.py_collections import sort_fixed, intersect_list
+from src.helpers.pd_helpers import df_ensure_cols_case, format_csv, write_csv
+from src.helpers.py_collections import sort_fixed, intersect_list, ensure_list
 from src.ff_logger import ff_logger
 
 IAS_EXPORT_MIN_ROWS = 5
@@ -114,19 +116,32 @@ def import_ias_process_cols(df: pd.DataFrame, time_col):
 
 def import_ias(fpath: Path, out_datetime_col: str, ias: IASImportConfig, skip_validation: bool, debug: bool):
     ff_logger.info('\n' f'Loading {fpath}')
+    # validation is cached too: file was already validated if cache is hit
+    params = {'loader': 'ias', 'out_datetime_col': out_datetime_col, 'ias': ias.model_dump(mode='json'),
+              'skip_validation': skip_validation, 'debug': debug}
+    return table_cache.cached([fpath], params,
+                              lambda: load_ias(fpath, out_datetime_col, ias, skip_validation, debug))
+
+
+def load_ias(fpath: Path, out_datetime_col: str, ias: IASImportConfig, skip_validation: bool, debug: bool):
+    nrows = None if not debug else DEBUG_NROWS
+    # validation requires missing data codes as is, they are replaced later by cleanup_df
+    df = load_table_logged(fpath, nrows=nrows, float_cols=COLS_IAS_FLOAT)
     
+    timestamps = {}
     if skip_validation:
         ff_logger.warning('IAS validation is skipped due to user option.')
     elif not debug:
-        check_ias(fpath)
-
-    nrows = None if not debug else DEBUG_NROWS
-    df = load_table_logged(fpath, nrows=nrows)
+        timestamps = check_ias(fpath, df)
     
     assert out_datetime_col not in COLS_IAS_TIME
     assert out_datetime_col not in df.columns
-    dt_fmt = detect_datetime_format(df[ias.datetime_col], ias.try_datetime_formats)
-    df[out_datetime_col] = pd.to_datetime(df[ias.datetime_col], format=dt_fmt)
+    if ias.datetime_col in timestamps and ensure_list(ias.try_datetime_formats) == [TIMESTAMP_FORMAT]:
+        # validation passed: no unparsed values
+        ff_logger.info(f'Using datetime format {TIMESTAMP_FORMAT}')
+        df[out_datetime_col] = timestamps[ias.datetime_col]
+    else:
+        df[out_datetime_col], _ = parse_datetime(df[ias.datetime_col], ias.try_datetime_formats)
     df = df.drop(COLS_IAS_TIME, axis='columns')
     
     # TODO 2 ias: abstract better: time gaps should be filled after merge of multiple files, but index should be done before? 
@@ -150,8 +165,11 @@ def import_iases(config: FFConfig):
     # afaik это основной метод мультилокальности в питоне, но переделывать под него все потребует усилий.
     set_lang('ru')
     
-    dfs = {fpath.name: import_ias(fpath, config.data_import.time_col, config.data_import.ias, config.data_import.ias.skip_validation, config.debug)
-           for fpath, _ in config.data_import.input_files.items()}
+    fpaths = list(config.data_import.input_files.keys())
+    dfs = map_files(lambda fpath: import_ias(fpath, config.data_import.time_col, config.data_import.ias,
+                                             config.data_import.ias.skip_validation, config.debug),
+                    fpaths, 'Imported')
+    dfs = {fpath.name: df for fpath, df in zip(fpaths, dfs)}
  
     if len(dfs) > 1:
         ff_logger.info('Merging data from files...')
@@ -234,15 +252,16 @@ def prepare_time_intervals(df: pd.DataFrame, time_col, min_rows, export_interval
 def export_ias_prepare_time_cols(df: pd.DataFrame, time_col):
     # possibly will be applied later to each year separately
     
-    df['TIMESTAMP_START'] = df[time_col].dt.strftime('%Y%m%d%H%M')
+    df['TIMESTAMP_START'] = time_features(df[time_col]).timestamp
     time_end = df[time_col] + pd.Timedelta(0.5, 'h')
-    df['TIMESTAMP_END'] = time_end.dt.strftime('%Y%m%d%H%M')
+    tf_end = time_features(time_end)
+    df['TIMESTAMP_END'] = tf_end.timestamp
     
     # 1 365, 366, 1 or 1 365, 366, 367 ?
     # V: not a big deal, but better 1.021 and 367 (by TIMESTAMP_END) 
     # TODO 3 QV ias: from file start or from year start?
-    day_part = (time_end.dt.hour * 60 * 60 + time_end.dt.minute * 60 + time_end.dt.second) / (24.0 * 60 * 60)
-    df['DTime'] = time_end.dt.dayofyear + np.round(day_part, decimals=3)
+    day_part = (tf_end.hour * 60 * 60 + tf_end.minute * 60 + tf_end.second) / (24.0 * 60 * 60)
+    df['DTime'] = tf_end.doy + np.round(day_part, decimals=3)
     
     # original floating point routine had %
     # s_in_day = pd.Timedelta(days=1).total_seconds()
@@ -252,6 +271,39 @@ def export_ias_prepare_time_cols(df: pd.DataFrame, time_col):
     return df
 
 
+def ias_export_files_rows(df: pd.DataFrame, time_col: str, site_name, ias_out_version,
+                          ias_export_intervals: IasExportIntervals) -> dict[str, np.ndarray]:
+    """ File name: row positions of each export interval, intervals are found in one pass over time column """
+    if ias_export_intervals == IasExportIntervals.ALL:
+        years = df.index.year.unique()
+        str_years_range = format_year_interval(years.min(), years.max())
+        return {f'{site_name}_{str_years_range}_{ias_out_version}.csv': np.arange(len(df.index))}
+    
+    tf = time_features(df[time_col])
+    if ias_export_intervals == IasExportIntervals.YEAR:
+        keys = np.asarray(tf.year)
+    elif ias_export_intervals == IasExportIntervals.MONTH:
+        keys = np.asarray(tf.year * 100 + tf.month)
+    else:
+        return {}
+    
+    # rows of an interval keep their order, sorting is no op for the usual time indexed df
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    interval_keys = pd.unique(keys)
+    starts = np.searchsorted(sorted_keys, interval_keys, side='left')
+    stops = np.searchsorted(sorted_keys, interval_keys, side='right')
+    
+    files_rows = {}
+    for key, start, stop in zip(interval_keys, starts, stops):
+        if ias_export_intervals == IasExportIntervals.YEAR:
+            fname = f'{site_name}_{key}_{ias_out_version}.csv'
+        else:
+            fname = f'{site_name}_{key % 100:02d}.{key // 100}_{ias_out_version}.csv'
+        files_rows[fname] = order[start: stop]
+    return files_rows
+
+
 def export_ias(out_dir: Path, site_name, ias_out_version, ias_export_intervals: IasExportIntervals,
                df: pd.DataFrame, time_col: str, swin_vals):
     # TODO 1 ff: data vs df_ias_export
@@ -297,50 +349,33 @@ def export_ias(out_dir: Path, site_name, ias_out_version, ias_export_intervals:
     else:
         ff_logger.critical('SW_IN_1_1_1 отсутствует в данных, ИАС экспортируется без SW_IN_1_1_1')
 
-    # must be done after all cols added or modified
-    df = df.fillna(-9999)
-
     col_list_ias = COLS_IAS_TIME + var_cols + [time_col]
     print(col_list_ias)
     df = df[col_list_ias]
     
-    export_files = {}
-    
-    if ias_export_intervals == IasExportIntervals.ALL:
-        years = df.index.year.unique()
-        str_years_range = format_year_interval(years.min(), years.max())        
-        fname = f'{site_name}_{str_years_range}_{ias_out_version}.csv'
-        
-        index_rng = df.index
-        export_files[fname] = index_rng
-    elif ias_export_intervals == IasExportIntervals.YEAR:
-        for year in df.index.year.unique():
-            fname = f'{site_name}_{year}_{ias_out_version}.csv'
-            
-            index_rng = df[time_col].dt.year == year
-            export_files[fname] = index_rng
-    elif ias_export_intervals == IasExportIntervals.MONTH:
-        for year in df.index.year.unique():
-            for month in df.loc[df.index.year == year].index.month.unique():
-                fname = f'{site_name}_{month:02d}.{year}_{ias_out_version}.csv'
-                
-                index_rng = (df[time_col].dt.year == year) & (df[time_col].dt.month == month)
-                export_files[fname] = index_rng
-
-    for fname, index_rng in export_files.items():
-        fpath = out_dir / fname
+    export_files = {out_dir / fname: rows for fname, rows in 
+                    ias_export_files_rows(df, time_col, site_name, ias_out_version, ias_export_intervals).items()}
+    for fpath in export_files:
         fpath.unlink(missing_ok=True)
-        
-        if len(index_rng) < IAS_EXPORT_MIN_ROWS:
-            # TODO 3 QOA logs: is it ok to simply put in logs most of the script outputs? (removing many dupe prints will be ok)
-            # print(f'not enough data for {year}')
-            cur_interval_name = ias_export_intervals.value.lower()
-            ff_logger.info(f'{cur_interval_name}: {fname} not saved, not enough data!')
-            continue
-        
-        save_data = df.loc[index_rng]
-        save_data = save_data.drop(time_col, axis=1)
-        
-        save_data.to_csv(fpath, index=False)
-        ff_logger.info(f'IAS file saved to {fpath}')
+    
+    # TODO 3 min rows are checked for the whole df, not for the file interval (i.e. 1 row file of the next year is saved)
+    if len(df.index) < IAS_EXPORT_MIN_ROWS:
+        # TODO 3 QOA logs: is it ok to simply put in logs most of the script outputs? (removing many dupe prints will be ok)
+        cur_interval_name = ias_export_intervals.value.lower()
+        for fpath in export_files:
+            ff_logger.info(f'{cur_interval_name}: {fpath.name} not saved, not enough data!')
+        return
+    
+    # missing values are filled only in the exported cols, after all cols added or modified
+    save_data = df.drop(time_col, axis=1).fillna(-9999)
+    # values are formatted once for all the files
+    csv = format_csv(save_data)
+    
+    def save_file(fpath: Path):
+        if csv is None:
+            save_data.iloc[export_files[fpath]].to_csv(fpath, index=False)
+        else:
+            write_csv(fpath, csv, export_files[fpath])
+    
+    map_files(save_file, list(export_files), 'IAS file saved to')
             
\ No newline at end of file
@@ -1,13 +1,26 @@
 from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
+from src.data_io.utils.time_features import time_features, hour_fraction
 from src.ff_logger import ff_logger
 
+REP_LEVEL3_OUTPUT_TEMPLATE = {
+    'Year': ['-'], 'DoY': ['-'], 'Hour': ['-'], 'NEE': ['umol_m-2_s-1'], 'LE': ['Wm-2'], 'H': ['Wm-2'],
+    'Rg': ['Wm-2'], 'Tair': ['degC'], 'Tsoil': ['degC'], 'rH': ['%'], 'VPD': ['hPa'], 'Ustar': ['ms-1'],
+    'CH4flux': ['umol_m-2_s-1']
+}
+# df columns read by export_rep_level3 to fill the template
+REP_LEVEL3_SOURCE_COLS = ['nee', 'le', 'h', 'swin_1_1_1', 'ta_1_1_1', 'rh_1_1_1', 'vpd_1_1_1', 'air_temperature', 'rh',
+                          'vpd', 'ts_1_1_1', 'u_star', 'ch4_flux']
+
 
 def export_rep_level3(fpath: Path, df: pd.DataFrame, time_col: str, output_template, config, points_per_day):
-    df['Year'] = df[time_col].dt.year
-    df['DoY'] = df[time_col].dt.dayofyear
-    df['Hour'] = df[time_col].dt.hour + df[time_col].dt.minute / 60
+    tf = time_features(df[time_col])
+    df['Year'] = tf.year
+    df['DoY'] = tf.doy
+    df['Hour'] = hour_fraction(df[time_col])
     
     df['NEE'] = df['nee'].fillna(-9999)
     df['LE'] = df['le'].fillna(-9999)
@@ -43,9 +56,8 @@ def export_rep_level3(fpath: Path, df: pd.DataFrame, time_col: str, output_templ
     if 'ch4_flux' in df.columns:
         df['CH4flux'] = df['ch4_flux'].fillna(-9999)
     
-    i = 0
-    while df.iloc[i]['Hour'] != 0.5:
-        i += 1
+    # file starts from the first 00:30, IndexError if there is none
+    i = np.flatnonzero(df['Hour'].to_numpy() == 0.5)[0]
     df = df.iloc[i:]
     
     if len(df.index) < 90 * points_per_day:
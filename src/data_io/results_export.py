@@ -0,0 +1,100 @@
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bglabutils import basic as bg
+from src.data_io.utils.time_features import doy_fraction
+from src.filter_store import FilterStore, get_column_filter
+from src.ff_logger import ff_logger
+
+SUMMARY_BASE_COLS = ['Date', 'Time', 'DoY', 'ta', 'rh', 'vpd', 'swin', 'ppfd', 'p', 'h', 'le', 'co2_flux', 'co2_strg',
+                     'ch4_flux', 'u_star']
+SUMMARY_METEO_COLS = ['ta', 'rh', 'vpd', 'swin', 'ppfd', 'p']
+# plot_data columns read by export_output_summary, meteo columns are picked by pattern
+SUMMARY_SOURCE_COLS = ['air_temperature', 'ta_1_1_1', 'nee', 'h', 'le', 'co2_flux', 'co2_strg', 'ch4_flux', 'u_star']
+SUMMARY_SOURCE_COLS_REGEX = f"({'|'.join(SUMMARY_METEO_COLS)})(_[1-9]){{1,4}}"
+
+
+def apply_filters(df: pd.DataFrame, filters_db: FilterStore) -> pd.DataFrame:
+    """ Copy of df with filtered out values replaced by nans """
+    df = df.copy()
+    for column, filter in filters_db.items():
+        filter = get_column_filter(df, filters_db, column)
+        df.loc[~filter.astype(bool), column] = np.nan
+    return df
+
+
+def export_output_all(fpath: Path, plot_data: pd.DataFrame, filters_db: FilterStore, time_col: str):
+    """ Source columns and all the filters (1 - passed, 0 - filtered), fills plot_data date and time gaps """
+    if 'date' in plot_data.columns:
+        plot_data.loc[plot_data['date'].isna(), 'date'] = plot_data[time_col].dt.date
+    if 'time' in plot_data.columns:
+        plot_data.loc[plot_data['time'].isna(), 'time'] = plot_data[time_col].dt.time
+
+    # filter columns are not stored in plot_data anymore, but still are part of the output_all
+    all_df = plot_data.join(filters_db.to_frame())
+    all_df.fillna(-9999).to_csv(fpath, index=None)
+    del all_df
+    ff_logger.info(f"Basic file saved to {fpath}")
+
+
+def export_output_summary(fpath: Path, plot_data: pd.DataFrame, filters_db: FilterStore, time_col: str,
+                          points_per_day: int, has_meteo: bool):
+    """ Main source and filtered columns, integral flags, 10 and 30 days mean diurnal cycles """
+    columns_to_save = SUMMARY_BASE_COLS.copy()
+
+    basic_df = plot_data.copy()
+
+    basic_df['Date'] = basic_df[time_col].dt.date
+    basic_df['Time'] = basic_df[time_col].dt.time
+    basic_df['DoY'] = doy_fraction(basic_df[time_col])
+
+    if not has_meteo:
+        basic_df['ta_1_1_1'] = basic_df['air_temperature'] - 273.15
+    # метео
+    for col in SUMMARY_METEO_COLS:
+        col_pos = [bool(re.fullmatch(f"{col}(_[1-9]){{1,4}}", col_in)) for col_in in basic_df.columns]
+        if not any(col_pos):
+            continue
+        else:
+            real_col = basic_df.columns[np.argmax(col_pos)]
+            basic_df[col] = basic_df[real_col]
+
+    # Фильтрованные потоки и метео
+    for col in ['nee', 'h', 'le', 'co2_strg', 'ch4_flux'] + ['ta', 'rh', 'vpd', 'swin', 'ppfd', 'p']:
+        if col not in basic_df.columns:
+            continue
+        basic_df[f"{col}_filtered"] = basic_df[col]
+        filter = get_column_filter(basic_df, filters_db, col)
+        basic_df.loc[~filter.astype(bool), f"{col}_filtered"] = np.nan
+        columns_to_save.append(f"{col}_filtered")
+
+    # флаги
+    for col in ['ta', 'rh', 'vpd', 'swin', 'ppfd', 'p', 'h', 'le', 'co2_flux', 'co2_strg', 'nee',
+                'ch4_flux']:  # ['nee', 'ch4', 'le', 'h']:
+        if col not in basic_df.columns:
+            continue
+        basic_df[f"{col}_integral_flag"] = get_column_filter(basic_df, filters_db, col)
+        columns_to_save.append(f"{col}_integral_flag")
+
+    for col in ['h', 'le', 'nee', 'rg', 'ppfd', 'ta', 'rh', 'vpd', 'ch4_flux']:
+        if f"{col}_filtered" not in basic_df.columns:
+            print(f"No {col}_filtered in file")
+            continue
+        col_out = col
+        if col == "ppfd":
+            col_out = "rg"
+        basic_df[f'{col_out}_10d'] = bg.calc_rolling(basic_df[f"{col}_filtered"], rolling_window=10,
+                                                     step=points_per_day, min_periods=7)
+        basic_df[f'{col_out}_30d'] = bg.calc_rolling(basic_df[f"{col}_filtered"], rolling_window=30,
+                                                     step=points_per_day, min_periods=7)
+        columns_to_save.append(f'{col_out}_10d')
+        columns_to_save.append(f'{col_out}_30d')
+
+    basic_df = basic_df[[col for col in columns_to_save if col in basic_df.columns]]
+    basic_df = basic_df.fillna(-9999)
+
+    basic_df.to_csv(fpath, index=None)
+    ff_logger.info(f"New basic file saved to {fpath}")
@@ -0,0 +1,176 @@
+"""
+Streaming import of large csv time series (i.e. multi-year eddypro full output):
+files are read by chunks twice, first only time columns to build the time grid (with repair_time checks),
+then all columns which are written straight into preallocated per column arrays at their grid positions.
+Peak memory is about the final frame plus one chunk instead of full files + concat + reindex copies.
+"""
+
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from src.data_io.detect_import import detect_file_header
+from src.data_io.utils.table_loader import sniff_csv
+from src.data_io.utils.time_series_utils import repair_time, parse_datetime, combine_date_time
+from src.ff_logger import ff_logger
+
+STREAM_CHUNK_ROWS = 50_000
+# source row of each grid slot, temporary column for repair_time
+SOURCE_ROW_COL = '_source_row'
+
+
+def can_stream(fpaths: list[Path]) -> bool:
+    return len(fpaths) > 0 and all(Path(fpath).suffix.lower() == '.csv' for fpath in fpaths)
+
+
+def count_lines(fpath: Path, block_bytes=1024 ** 2) -> int:
+    lines = 0
+    last_byte = b'\n'
+    with open(fpath, 'rb') as f:
+        while block := f.read(block_bytes):
+            lines += block.count(b'\n')
+            last_byte = block[-1:]
+    return lines + (last_byte != b'\n')
+
+
+def iter_csv_chunks(fpath: Path, chunk_rows: int, usecols: list[str] = None) -> Iterator[pd.DataFrame]:
+    """ Same table as load_table_from_file with detected header_row and units rows, but by chunks """
+    header = detect_file_header(fpath)
+    if header.header_row is None:
+        raise Exception(f'Cannot detect header row of {fpath}')
+    skiprows = list(range(header.header_row)) + header.units_rows
+    io_kwargs = {} if sniff_csv(fpath).encoding else {'encoding': 'utf8', 'encoding_errors': 'backslashreplace'}
+
+    with pd.read_csv(fpath, skiprows=skiprows, usecols=usecols, chunksize=chunk_rows, **io_kwargs) as reader:
+        yield from reader
+
+
+def read_times(fpaths: list[Path], time_cols: list[str], parse_time: Callable[[pd.DataFrame], pd.Series],
+               chunk_rows: int) -> np.ndarray:
+    """ First pass: only time columns are read, result is int64 ns per each row of all files """
+    n_max = sum(count_lines(fpath) for fpath in fpaths)
+    times = np.empty(n_max, dtype=np.int64)
+    n = 0
+    for fpath in fpaths:
+        for chunk in iter_csv_chunks(fpath, chunk_rows, usecols=time_cols):
+            chunk_times = pd.DatetimeIndex(parse_time(chunk)).as_unit('ns').asi8
+            times[n: n + len(chunk_times)] = chunk_times
+            n += len(chunk_times)
+    return times[:n]
+
+
+def plan_grid(times: np.ndarray, time_col: str, repair: bool) -> tuple[pd.DatetimeIndex, np.ndarray]:
+    """ Grid index and target position of each source row in it (-1: row is dropped) """
+    if not repair:
+        return pd.DatetimeIndex(times, freq='infer'), np.arange(times.size)
+
+    df_times = pd.DataFrame({time_col: pd.DatetimeIndex(times), SOURCE_ROW_COL: np.arange(times.size)})
+    df_grid = repair_time(df_times, time_col, fill_gaps=True)
+
+    source_rows = df_grid[SOURCE_ROW_COL].to_numpy()
+    has_row = ~np.isnan(source_rows)
+    target_pos = np.full(times.size, -1)
+    target_pos[source_rows[has_row].astype(np.int64)] = np.flatnonzero(has_row)
+    return df_grid.index, target_pos
+
+
+def new_store_column(values: np.ndarray, size: int, has_gaps: bool) -> np.ndarray:
+    """ Same dtypes as after full read and reindex: int and bool are kept only without gaps """
+    if values.dtype.kind in 'iub' and not has_gaps:
+        return np.empty(size, dtype=values.dtype)
+    elif values.dtype.kind in 'iuf':
+        return np.full(size, np.nan)
+    else:
+        return np.full(size, np.nan, dtype=object)
+
+
+def fit_store_column(store_col: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """ Promotes column if the chunk has values not fitting its dtype (nan in ints, strings in floats) """
+    if np.can_cast(values.dtype, store_col.dtype, casting='same_kind'):
+        return store_col
+    promoted = np.float64 if store_col.dtype.kind in 'iu' and values.dtype.kind in 'iuf' else object
+    ff_logger.debug(f'Streamed column is promoted from {store_col.dtype} to {np.dtype(promoted)}')
+    return store_col.astype(promoted)
+
+
+def fill_unwritten(store_col: np.ndarray, is_written: np.ndarray) -> np.ndarray:
+    """ Rows of files without the column are nan, same as after concat: ints become float, bools object """
+    if is_written.all():
+        return store_col
+    if store_col.dtype.kind in 'iu':
+        store_col = store_col.astype(np.float64)
+    elif store_col.dtype.kind == 'b':
+        store_col = store_col.astype(object)
+    store_col[~is_written] = np.nan
+    return store_col
+
+
+def datetime_chunk_parser(datetime_col: str, guesses: str | list[str]) -> Callable[[pd.DataFrame], pd.Series]:
+    """ Format is detected on the first chunk and reused for the next ones """
+    fmts = {datetime_col: guesses}
+    
+    def parse(chunk: pd.DataFrame) -> pd.Series:
+        res, fmts[datetime_col] = parse_datetime(chunk[datetime_col], fmts[datetime_col])
+        return res
+    return parse
+
+
+def date_time_chunk_parser(time_col: str, time_guesses: str | list[str],
+                           date_col: str, date_guesses: str | list[str]) -> Callable[[pd.DataFrame], pd.Series]:
+    """ Same as date_time_parser, formats are detected on the first chunk and reused for the next ones """
+    fmts = {time_col: time_guesses, date_col: date_guesses}
+    
+    def parse(chunk: pd.DataFrame) -> pd.Series:
+        date, fmts[date_col] = parse_datetime(chunk[date_col].astype(str), fmts[date_col])
+        time, fmts[time_col] = parse_datetime(chunk[time_col].astype(str), fmts[time_col])
+        return combine_date_time(date, time)
+    return parse
+
+
+def stream_time_series(fpaths: list[Path], out_time_col: str, time_cols: list[str],
+                       parse_time: Callable[[pd.DataFrame], pd.Series], repair: bool, missing_data_codes: list,
+                       chunk_rows=STREAM_CHUNK_ROWS, usecols: list[str] = None) -> pd.DataFrame:
+    """
+    Loads and concatenates csv files in a time indexed df, same as full read, cleanup, and repair_time.
+    parse_time: chunk -> datetime series, chunks contain only time_cols on the first pass
+    usecols: None to keep all columns
+    Columns of mixed types are promoted to object when met, not parsed as strings from the start as on full read.
+    """
+    fpaths = [Path(fpath) for fpath in fpaths]
+    times = read_times(fpaths, time_cols, parse_time, chunk_rows)
+    index, target_pos = plan_grid(times, out_time_col, repair)
+    has_gaps = (target_pos >= 0).sum() < len(index)
+
+    store = {}
+    # int and bool columns are allocated uninitialized, rows of files without the column must be set to nan
+    is_written = {}
+    row = 0
+    for fpath in fpaths:
+        for chunk in iter_csv_chunks(fpath, chunk_rows, usecols):
+            if missing_data_codes:
+                chunk.replace(to_replace=missing_data_codes, value=np.nan, inplace=True)
+            chunk_pos = target_pos[row: row + len(chunk)]
+            is_used = chunk_pos >= 0
+            row += len(chunk)
+
+            for col in chunk.columns:
+                values = chunk[col].to_numpy()
+                if col not in store:
+                    # columns missing in the previous files are nan there
+                    store[col] = new_store_column(values, len(index), has_gaps or row > len(chunk))
+                    if store[col].dtype.kind in 'iub':
+                        is_written[col] = np.zeros(len(index), dtype=bool)
+                store[col] = fit_store_column(store[col], values)
+                store[col][chunk_pos[is_used]] = values[is_used]
+                if col in is_written:
+                    is_written[col][chunk_pos[is_used]] = True
+        ff_logger.info(f'File {fpath} loaded by chunks of {chunk_rows} rows.')
+
+    for col, col_is_written in is_written.items():
+        store[col] = fill_unwritten(store[col], col_is_written)
+
+    df = pd.DataFrame(store, index=index, copy=False)
+    df[out_time_col] = df.index
+    return df
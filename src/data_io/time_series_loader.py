@@ -9,16 +9,17 @@ import numpy as np
 import pandas as pd
 
 from src.config.config_types import InputFileType
+from src.data_io.csf_cols import COLS_CSF_FLOAT
+from src.data_io.utils.table_cache import table_cache
 from src.data_io.utils.table_loader import load_table_logged
-from src.data_io.utils.time_series_utils import repair_time, detect_datetime_format
+from src.data_io.utils.time_series_utils import repair_time, parse_datetime
 from src.ff_logger import ff_logger
 from src.config.ff_config import FFConfig
 
 
 def preprocess_time_csf(df: pd.DataFrame, src_time_col, try_fmts, tgt_time_col):
     """ Only init time column, no checks or repairs """
-    fmt = detect_datetime_format(df[src_time_col], try_fmts)
-    df[tgt_time_col] = pd.to_datetime(df[src_time_col], format=fmt)
+    df[tgt_time_col], _ = parse_datetime(df[src_time_col], try_fmts)
     
     df.rename(columns={src_time_col: src_time_col + '_STR'}, inplace=True)
     return df
@@ -38,16 +39,26 @@ def cleanup_df(df: pd.DataFrame, missing_data_codes):
 
 
 def preload_time_series(fpath: Path, ftype: InputFileType, config: FFConfig) -> pd.DataFrame:
+    params = {'loader': 'time_series', 'ftype': ftype, 'time_col': config.data_import.time_col}
+    if ftype == InputFileType.EDDYPRO_BIOMET:
+        params['biomet'] = config.data_import.eddypro_biomet.model_dump(mode='json')
+    else:
+        params['csf'] = config.data_import.csf.model_dump(mode='json')
+    return table_cache.cached([fpath], params, lambda: load_time_series(fpath, ftype, config))
+
+
+def load_time_series(fpath: Path, ftype: InputFileType, config: FFConfig) -> pd.DataFrame:
     # TODO 3 # if 'debug' in d_config.keys()
     if ftype == InputFileType.CSF:
-        df = load_table_logged(fpath, header_row=1, skiprows=[2, 3])
+        df = load_table_logged(fpath, header_row=1, skiprows=[2, 3], float_cols=COLS_CSF_FLOAT,
+                               missing_data_codes=config.data_import.csf.missing_data_codes)
         df = preprocess_time_csf(df, config.data_import.csf.datetime_col, config.data_import.csf.try_datetime_formats, config.data_import.time_col)
         df = cleanup_df(df, config.data_import.csf.missing_data_codes)
     elif ftype == InputFileType.EDDYPRO_BIOMET:
         # Not switched to use this yet
         df = load_table_logged(fpath, header_row=1)
         df = preprocess_time_biomet(df, ftype, config.data_import.time_col)
-        df = cleanup_df(df, config.biomet.missing_data_codes)
+        df = cleanup_df(df, config.data_import.eddypro_biomet.missing_data_codes)
     else:
         raise Exception('Unexpected file type')
     
@@ -0,0 +1,141 @@
+"""
+Cache of parsed input tables: unchanged input files with unchanged import options are loaded
+from parquet instead of being parsed again (csv/xlsx read, datetime detection, missing codes cleanup).
+Key is a hash of the file contents and of the import options, so renamed or touched files still hit the cache.
+Disabled until init_table_cache(cache_dir) is called (FluxFilter.py uses gl.out_dir / 'cache').
+Requires pyarrow, without it every load is a miss.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from src.ff_logger import ff_logger
+
+# change on any change of loaders output (columns, dtypes, index), old cache files are never hit after
+CACHE_VERSION = 2
+CACHE_FREQ_KEY = b'ff_index_freq'
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+def file_digest(fpath: Path) -> str:
+    with open(fpath, 'rb') as f:
+        return hashlib.file_digest(f, 'blake2b').hexdigest()
+
+
+class TableCache:
+    def __init__(self, cache_dir: Path = None, max_bytes=DEFAULT_MAX_BYTES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        """ cache_dir=None disables the cache, max_bytes or max_age_days=None disables that eviction """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.evict_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache_dir is not None
+
+    def key(self, fpaths: list[Path], params: dict) -> str:
+        """ params: everything except file contents which changes the loaded table """
+        h = hashlib.blake2b(digest_size=20)
+        h.update(json.dumps([CACHE_VERSION, params], sort_keys=True, default=str).encode())
+        for fpath in fpaths:
+            h.update(file_digest(fpath).encode())
+        return h.hexdigest()
+
+    def fpath(self, key: str) -> Path:
+        return self.cache_dir / f'{key}.parquet'
+
+    def load(self, key: str) -> pd.DataFrame | None:
+        fpath = self.fpath(key)
+        if not fpath.exists():
+            return None
+        import pyarrow.parquet as pq
+        try:
+            table = pq.read_table(fpath)
+            df = table.to_pandas()
+            freq = (table.schema.metadata or {}).get(CACHE_FREQ_KEY)
+            if freq:
+                df.index.freq = freq.decode()
+        except Exception as e:
+            ff_logger.warning(f'Cannot read cache file {fpath}, ignoring it: {e}')
+            fpath.unlink(missing_ok=True)
+            return None
+        # mtime is the last use for eviction
+        os.utime(fpath)
+        return df
+
+    def save(self, key: str, df: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        try:
+            table = pa.Table.from_pandas(df)
+        except (pa.ArrowException, TypeError, ValueError) as e:
+            # i.e. mixed types in object columns
+            ff_logger.debug(f'Table is not cached: {e}')
+            return
+        freq = getattr(df.index, 'freqstr', None)
+        if freq:
+            table = table.replace_schema_metadata({**table.schema.metadata, CACHE_FREQ_KEY: freq.encode()})
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fpath = self.fpath(key)
+        # other processes and threads may read the same cache dir
+        tmp_fpath = fpath.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        pq.write_table(table, tmp_fpath)
+        tmp_fpath.replace(fpath)
+        with self.evict_lock:
+            self.evict()
+
+    def evict(self):
+        """ Removes files older than max_age_days, then least recently used files over max_bytes """
+        fpaths = sorted(self.cache_dir.glob('*.parquet'), key=lambda fpath: fpath.stat().st_mtime, reverse=True)
+        if self.max_age_days is not None:
+            min_mtime = time.time() - self.max_age_days * 24 * 60 * 60
+            for fpath in [fpath for fpath in fpaths if fpath.stat().st_mtime < min_mtime]:
+                fpath.unlink(missing_ok=True)
+                fpaths.remove(fpath)
+        if self.max_bytes is not None:
+            total_bytes = 0
+            for fpath in fpaths:
+                total_bytes += fpath.stat().st_size
+                if total_bytes > self.max_bytes:
+                    fpath.unlink(missing_ok=True)
+
+    def cached(self, fpaths: list[Path], params: dict, load_func: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """ load_func() result from cache if fpaths contents and params are same as on some previous call """
+        if not self.enabled:
+            return load_func()
+
+        key = self.key(fpaths, params)
+        df = self.load(key)
+        if df is not None:
+            ff_logger.info(f'Files {[str(fpath) for fpath in fpaths]} are unchanged, loaded from cache {key}.')
+            return df
+
+        df = load_func()
+        self.save(key, df)
+        return df
+
+
+table_cache = TableCache()
+
+
+def init_table_cache(cache_dir: Path | None, max_bytes=DEFAULT_MAX_BYTES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+    """ cache_dir=None to bypass the cache """
+    table_cache.cache_dir = Path(cache_dir) if cache_dir else None
+    table_cache.max_bytes = max_bytes
+    table_cache.max_age_days = max_age_days
+    if table_cache.enabled:
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            ff_logger.warning('pyarrow is not installed, input tables cache is disabled.')
+            table_cache.cache_dir = None
@@ -3,26 +3,81 @@ This file is an attempt to handle table load as an abstract initial part of data
 and to separate operations like time series repair or merge years from specific file format (if this is possible at all)
 """
 
+import codecs
+import csv
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from importlib.util import find_spec
 from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable
+
 import pandas as pd
 import numpy as np
 from gettext import gettext as _
 
+from src.data_io.utils.table_cache import table_cache
 from src.helpers.pd_helpers import find_changed_el
 from src.ff_logger import ff_logger
 
 
-def guess_inconsistent_csv_table_start(fpath: Path, lookup_rows=10, **pd_io_kwargs):
-    """ a workaround for some (incorrect) csv with multiple header columns with different width """
+# rust reader, several times faster than default openpyxl
+XLS_FAST_ENGINE = 'calamine' if find_spec('python_calamine') else None
+SNIFF_BYTES = 64 * 1024
+SNIFF_ROWS = 10
+# input files are detected and loaded on threads: parsing in pandas/pyarrow and disk reads release GIL
+IO_MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+
+@lru_cache(maxsize=256)
+def _sniff_csv(fpath: str, mtime_ns: int, size: int) -> SimpleNamespace:
+    with open(fpath, 'rb') as f:
+        sample = f.read(SNIFF_BYTES)
     
-    rows = [pd.read_csv(fpath, skiprows=i, nrows=1, header=None, **pd_io_kwargs) for i in range(lookup_rows)]
-    row_l = np.array([len(row.columns) for row in rows])
-    equal_rows_start_at = find_changed_el(row_l, from_end=True) + 1
+    # last bytes may be a cut multibyte char
+    try:
+        text = codecs.getincrementaldecoder('utf-8-sig')().decode(sample, final=len(sample) == size)
+        encoding = 'utf-8'
+    except UnicodeDecodeError:
+        text = sample.decode('utf8', errors='backslashreplace')
+        encoding = None
     
-    if equal_rows_start_at == lookup_rows:
-        raise Exception(f'Cannot guess start of csv table in {fpath}')
+    lines = text.splitlines()
+    if len(sample) < size:
+        # last line may be cut
+        lines = lines[:-1]
+    # line numbers in the file of the non-empty lines, skiprows counts blank lines too
+    line_nums = [i for i, line in enumerate(lines) if line.strip()][:SNIFF_ROWS]
+    lines = [lines[i] for i in line_nums]
+    try:
+        delimiter = csv.Sniffer().sniff('\n'.join(lines), delimiters=',;\t').delimiter
+    except csv.Error:
+        delimiter = ','
     
-    return equal_rows_start_at
+    # read as pandas does, always with ',' at the moment
+    rows = list(csv.reader(lines))
+    widths = np.array([len(row) for row in rows])
+    start_row = find_changed_el(widths, from_end=True) + 1 if len(rows) > 0 else None
+    # the last sniffed row is different from the previous: table does not start within the sniffed rows
+    if start_row is None or (len(rows) > 1 and start_row >= len(rows) - 1):
+        table_start = None
+    else:
+        table_start = line_nums[start_row]
+    return SimpleNamespace(encoding=encoding, delimiter=delimiter, rows=rows, widths=widths, table_start=table_start)
+
+
+def sniff_csv(fpath: Path) -> SimpleNamespace:
+    """
+    Reads only the file start, once while the file is unchanged, for both file type detection and load:
+    encoding: 'utf-8' or None if the start is not utf-8,
+    rows: first SNIFF_ROWS non-empty rows as lists of str, widths: their lengths,
+    table_start: file line number of the first row of the ending block of rows with the same width
+    (a workaround for multiple headers), None if it cannot be guessed
+    """
+    stat = Path(fpath).stat()
+    return _sniff_csv(str(fpath), stat.st_mtime_ns, stat.st_size)
 
 
 def load_csv(fpath: Path, max_header_rows=4, **pd_read_kwargs):
@@ -39,45 +94,126 @@ def load_csv(fpath: Path, max_header_rows=4, **pd_read_kwargs):
     '''
     
     fallback_io_kwargs = {'encoding': 'utf8', 'encoding_errors': 'backslashreplace'}
+    sniff = sniff_csv(fpath)
+    if sniff.delimiter != ',':
+        ff_logger.warning(f'{fpath} seems to use "{sniff.delimiter}" separator, only "," is supported.')
     
-    try:
-        df = pd.read_csv(fpath, **pd_read_kwargs)
-    except FileNotFoundError:
-        raise
-    except Exception as e:
-        # TODO 2 change any to UnicodeDecodeError, <header err name>?
-        ff_logger.debug(f'When reading {fpath}: {e}, attempting other import mode.')
-        
-        if pd_read_kwargs['skiprows'] is None:
-            pd_read_kwargs['skiprows'] = guess_inconsistent_csv_table_start(fpath, **fallback_io_kwargs)
-        
-        df = pd.read_csv(fpath, **fallback_io_kwargs, **pd_read_kwargs)
+    # default read fails if the first row is shorter than the next ones
+    ragged_header = (pd_read_kwargs['header'] in [0, None] and pd_read_kwargs['skiprows'] is None
+                     and len(sniff.widths) > 0 and sniff.widths[0] < sniff.widths.max())
+    if sniff.encoding and not ragged_header:
+        try:
+            return pd.read_csv(fpath, **pd_read_kwargs)
+        except Exception as e:
+            # TODO 2 change any to UnicodeDecodeError, <header err name>?
+            ff_logger.debug(f'When reading {fpath}: {e}, attempting other import mode.')
+    else:
+        ff_logger.debug(f'{fpath} is not utf-8 or has header rows of different width, using other import mode.')
+    
+    if pd_read_kwargs['skiprows'] is None:
+        if sniff.table_start is None:
+            raise Exception(f'Cannot guess start of csv table in {fpath}')
+        pd_read_kwargs['skiprows'] = sniff.table_start
     
     # TODO 2 Excel sometimes saves empty columns into csv: ,,,,,,,; remove them verbose/silent
-    return df
+    return pd.read_csv(fpath, **fallback_io_kwargs, **pd_read_kwargs)
+
+
+def arrow_na_values(missing_data_codes: list) -> list[str]:
+    """ -9999 -> '-9999', '-9999.0'; 'NAN' is written by Campbell loggers """
+    import pyarrow.csv as pa_csv
+    
+    codes = [str(code) for code in missing_data_codes]
+    codes += [str(float(code)) for code in missing_data_codes if isinstance(code, (int, float))]
+    return pa_csv.ConvertOptions().null_values + ['NAN'] + codes
+
+
+def load_csv_arrow(fpath: Path, header_row=0, skiprows=None, float_cols=(), missing_data_codes=()) -> pd.DataFrame | None:
+    """
+    Fast csv read: float_cols are parsed directly to float64, missing_data_codes are nan already on parse.
+    Returns None if the file is unsupported (layout, encoding, text in float_cols), pandas reader is expected then.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        return None
+    
+    # only rows right after the header can be skipped, i.e. units rows of csf
+    skip_after = sorted(skiprows or [])
+    if header_row is None or skip_after != list(range(header_row + 1, header_row + 1 + len(skip_after))):
+        return None
+    
+    read_options = pa_csv.ReadOptions(skip_rows=header_row, skip_rows_after_names=len(skip_after))
+    # pandas keeps dates and times as strings, script detects their format later
+    convert_options = pa_csv.ConvertOptions(null_values=arrow_na_values(missing_data_codes), strings_can_be_null=True,
+                                            timestamp_parsers=['\x00'])
+    try:
+        with pa_csv.open_csv(fpath, read_options=read_options, convert_options=convert_options) as reader:
+            schema = reader.schema
+        if len(set(schema.names)) != len(schema.names):
+            return None
+        float_cols = {col.lower() for col in float_cols}
+        convert_options.column_types = {
+            field.name: pa.float64() if field.name.lower() in float_cols else pa.string()
+            for field in schema if field.name.lower() in float_cols or pa.types.is_temporal(field.type)
+        }
+        table = pa_csv.read_csv(fpath, read_options=read_options, convert_options=convert_options)
+    except (pa.ArrowInvalid, UnicodeDecodeError) as e:
+        ff_logger.debug(f'When reading {fpath} with pyarrow: {e}, attempting pandas reader.')
+        return None
+    # all empty columns: float nans like pandas reader, not None objects
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    return table.to_pandas()
+
+
+def read_excel(fpath, **pd_read_kwargs) -> pd.DataFrame:
+    if XLS_FAST_ENGINE:
+        try:
+            return pd.read_excel(fpath, engine=XLS_FAST_ENGINE, **pd_read_kwargs)
+        except Exception as e:
+            ff_logger.debug(f'When reading {fpath} with {XLS_FAST_ENGINE}: {e}, attempting default engine.')
+    return pd.read_excel(fpath, **pd_read_kwargs)
 
 
 def load_xls(fpath, **pd_read_kwargs):
-    # TODO 3 https://stackoverflow.com/questions/50695778/how-to-increase-process-speed-using-read-excel-in-pandas
-    data = pd.read_excel(fpath, **pd_read_kwargs)
-    if isinstance(data, dict):
-        if len(data.values()) > 1:
-            ff_logger.error(_("Several lists in data file!"))
-            assert False
-        else:
-            data = next(iter(data.values()))
-    return data
+    def load():
+        data = read_excel(fpath, **pd_read_kwargs)
+        if isinstance(data, dict):
+            if len(data.values()) > 1:
+                ff_logger.error(_("Several lists in data file!"))
+                assert False
+            else:
+                data = next(iter(data.values()))
+        return data
+    
+    # detection reads only a few rows: not worth hashing the whole file
+    if pd_read_kwargs.get('nrows') is not None:
+        return load()
+    # xlsx parse is slow even with calamine: sheet is converted once, re-runs and checks read the parquet
+    return table_cache.cached([fpath], {'loader': 'xls', **pd_read_kwargs}, load)
 
 
-def load_table_from_file(fpath, skiprows=None, nrows=None, header_row=0) -> pd.DataFrame:
-    """	nrows: read only first n rows """
+def load_table_from_file(fpath, skiprows=None, nrows=None, header_row=0,
+                         float_cols: list[str] = None, missing_data_codes: list = None) -> pd.DataFrame:
+    """
+    nrows: read only first n rows
+    float_cols: csv is read by pyarrow with these columns as float64 (case insensitive) if possible
+    missing_data_codes: nan already on the pyarrow read, pandas reader ignores them
+    """
     # probably extract to load table? can all repairs be generalised operations on tables?
     
     pd_read_kwargs = {'nrows': nrows, 'header': header_row, 'skiprows': skiprows}
     
     suffix = Path(fpath).suffix.lower()
     if suffix == '.csv':
-        df = load_csv(fpath, **pd_read_kwargs)
+        df = None
+        if float_cols is not None and nrows is None:
+            df = load_csv_arrow(fpath, header_row, skiprows, float_cols, missing_data_codes or [])
+        if df is None:
+            df = load_csv(fpath, **pd_read_kwargs)
     elif suffix in ['.xls', '.xlsx']:
         df = load_xls(fpath, **pd_read_kwargs)
     else:
@@ -85,7 +221,8 @@ def load_table_from_file(fpath, skiprows=None, nrows=None, header_row=0) -> pd.D
     return df
 
 
-def load_table_logged(fpath, skiprows=None, nrows=None, header_row=0) -> pd.DataFrame:  
+def load_table_logged(fpath, skiprows=None, nrows=None, header_row=0,
+                      float_cols: list[str] = None, missing_data_codes: list = None) -> pd.DataFrame:
     # TODO 2 possibly this fixed csv (or other) bugs, merge into table loader routine?
     # TODO 2 Excel 2016 saved files seems were impossible to open without specyfying engine, why ?    
     '''
@@ -112,7 +249,7 @@ def load_table_logged(fpath, skiprows=None, nrows=None, header_row=0) -> pd.Data
     
     # with log_exception(...) instead
     try:
-        data = load_table_from_file(fpath, skiprows, nrows, header_row)
+        data = load_table_from_file(fpath, skiprows, nrows, header_row, float_cols, missing_data_codes)
     except Exception as e:
         ff_logger.exception(e)
         # raise SystemExit vs
@@ -124,3 +261,17 @@ def load_table_logged(fpath, skiprows=None, nrows=None, header_row=0) -> pd.Data
     # TODO 3 df.index.freq and df.name: unconventional attrs required for script, probably subclass to solve this    
     
     return data
+
+
+def map_files(func: Callable[[Path], object], fpaths: list[Path], action: str, max_workers=IO_MAX_WORKERS) -> list:
+    """ Same as [func(fpath) for fpath in fpaths] on a thread pool, results are in fpaths order, each call is timed """
+    def timed_func(fpath):
+        start = time.perf_counter()
+        res = func(fpath)
+        ff_logger.info(f'{action} {fpath} in {time.perf_counter() - start:.2f} s')
+        return res
+    
+    if max_workers <= 1 or len(fpaths) <= 1:
+        return [timed_func(fpath) for fpath in fpaths]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(fpaths))) as executor:
+        return list(executor.map(timed_func, fpaths))
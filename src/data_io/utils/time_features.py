@@ -0,0 +1,82 @@
+"""
+Calendar features of time columns for exporters (IAS TIMESTAMP_START/END and DTime, REddyProc Year/DoY/Hour,
+FAT and summary DoY) by integer arithmetic on int64 ns timestamps instead of .dt accessors and strftime.
+Features are cached by the time values, so exporters of the same run compute them only once.
+"""
+
+import hashlib
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+NS_IN_SECOND = 10 ** 9
+SECONDS_IN_DAY = 24 * 60 * 60
+# exporters use start and end times of a couple of frames
+FEATURES_CACHE_SIZE = 4
+
+_features_cache: dict[str, SimpleNamespace] = {}
+
+
+def calc_time_features(ns: np.ndarray) -> SimpleNamespace:
+    """ ns: int64 wall time, NaT must be already replaced """
+    days = ns // (SECONDS_IN_DAY * NS_IN_SECOND)
+    seconds = (ns - days * SECONDS_IN_DAY * NS_IN_SECOND) // NS_IN_SECOND
+
+    days64 = days.astype('datetime64[D]')
+    years64 = days64.astype('datetime64[Y]')
+    months64 = days64.astype('datetime64[M]')
+    year = years64.astype(np.int64) + 1970
+    month = months64.astype(np.int64) % 12 + 1
+    day = (days64 - months64.astype('datetime64[D]')).astype(np.int64) + 1
+    doy = (days64 - years64.astype('datetime64[D]')).astype(np.int64) + 1
+    hour, minute, second = seconds // 3600, seconds % 3600 // 60, seconds % 60
+
+    # same as strftime('%Y%m%d%H%M')
+    timestamp = (((year * 100 + month) * 100 + day) * 100 + hour) * 100 + minute
+    return SimpleNamespace(year=year, month=month, day=day, doy=doy, hour=hour, minute=minute, second=second,
+                           timestamp=timestamp)
+
+
+def time_features(times: pd.Series | pd.DatetimeIndex) -> SimpleNamespace:
+    """
+    SimpleNamespace(year, month, day, doy, hour, minute, second, timestamp: YYYYMMDDHHMM) of arrays, same as .dt values.
+    Features are int64 numpy arrays, or nullable Int64 arrays (NA at NaT) if times have NaT.
+    Result is shared between calls, arrays are read-only.
+    """
+    times = pd.DatetimeIndex(times)
+    if times.tz is not None:
+        # .dt features are of the local time
+        times = times.tz_localize(None)
+    ns = times.as_unit('ns').asi8
+
+    key = hashlib.blake2b(ns.tobytes(), digest_size=20).hexdigest()
+    if key in _features_cache:
+        return _features_cache[key]
+
+    is_nat = ns == pd.NaT.value
+    features = calc_time_features(np.where(is_nat, 0, ns))
+    for name, values in vars(features).items():
+        # shared by all callers: pandas copies read-only arrays on the first edit of a column
+        values.flags.writeable = False
+        if is_nat.any():
+            mask = is_nat.copy()
+            mask.flags.writeable = False
+            setattr(features, name, pd.arrays.IntegerArray(values, mask))
+
+    if len(_features_cache) >= FEATURES_CACHE_SIZE:
+        _features_cache.pop(next(iter(_features_cache)))
+    _features_cache[key] = features
+    return features
+
+
+def doy_fraction(times: pd.Series | pd.DatetimeIndex, decimals=3) -> np.ndarray:
+    """ Day of year with time of day by hours and minutes: 1.0 at 00:00 of Jan 1, 1.021 at 00:30 """
+    tf = time_features(times)
+    return np.round(tf.doy + tf.hour / 24. + tf.minute / 24. / 60., decimals=decimals)
+
+
+def hour_fraction(times: pd.Series | pd.DatetimeIndex) -> np.ndarray:
+    """ Hour of day with minutes: 13.5 at 13:30 """
+    tf = time_features(times)
+    return tf.hour + tf.minute / 60
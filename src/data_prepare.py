@@ -0,0 +1,232 @@
+"""
+Column preparation steps between import and filters,
+shared by FluxFilter.py cells and headless runs (src.site_run).
+"""
+
+import re
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from src.config.ff_config import FiltersConfig
+from src.data_io.fat_export import FAT_SOURCE_COLS
+from src.data_io.rep_level3_export import REP_LEVEL3_SOURCE_COLS
+from src.data_io.results_export import SUMMARY_SOURCE_COLS, SUMMARY_SOURCE_COLS_REGEX
+from src.ff_logger import ff_logger
+from src.filter_store import FilterStore, get_column_filter
+from src.filters import quantile_filter, FILTERS_SOURCE_COLS
+
+COLS_TO_CHECK_TYPES = ['ppfd_in_1_1_1', 'u_star', 'swin_1_1_1', 'co2_signal_strength',
+                       'rh_1_1_1', 'vpd_1_1_1', 'rg_1_1_1', 'p_rain_1_1_1',
+                       'co2_signal_strength_7500_mean', 'CO2SS'.lower(), 'co2_signal_strength',
+                       'ch4_signal_strength_7500_mean', 'ch4SS'.lower(), 'ch4_signal_strength',
+                       'p_1_1_1', 'ta_1_1_1', 'co2_strg', 'le', 'h']
+
+# read after prepare_meteo_columns by nee calc and plots; filters and exports declare their own source columns,
+# IAS and output_all exports get the pass through columns back
+COLS_PIPELINE_USED = ['co2_flux', 'co2_strg', 'swin_1_1_1', 'swout_1_1_1', 'alb_1_1_1', 'albedo']
+COLS_PIPELINE_USED += FILTERS_SOURCE_COLS + FAT_SOURCE_COLS + REP_LEVEL3_SOURCE_COLS + SUMMARY_SOURCE_COLS
+
+
+def normalize_columns(data: pd.DataFrame, has_meteo: bool) -> pd.DataFrame:
+    data.columns = data.columns.str.lower()
+    if not has_meteo:
+        data["rh_1_1_1"] = data['rh']
+        # TODO QOA 1 different units? Elg biomet kPa, but mean 8.6 ?
+        data["vpd_1_1_1"] = data['vpd']
+    return data
+
+
+def check_data_types(data: pd.DataFrame, meteo_cols) -> bool:
+    """ Logs positions of text in numeric columns, returns True if any """
+    data_type_error_flag = False
+    for col in COLS_TO_CHECK_TYPES:
+        if col not in data.columns:
+            continue
+        error_positions = data[col].fillna(0).apply(pd.to_numeric, errors='coerce').isna()
+        if error_positions.any():
+            ff_logger.error(
+                f"""Check input files for {col} column near:\n {error_positions[error_positions == True].index.strftime('%d-%m-%Y %H:%M').values} in {'biomet' if len(meteo_cols) > 0 and col in meteo_cols else 'data'} file"""
+            )
+            data_type_error_flag = True
+    return data_type_error_flag
+
+
+def prepare_meteo_columns(data: pd.DataFrame, has_meteo: bool) -> pd.DataFrame:
+    """ Renames columns to the single format, calculates VPD <-> RH, SWIN <-> RG and PAR <-> SWIN if missing """
+    have_rh_flag = False
+    have_vpd_flag = False
+    have_par_flag = False
+    have_swin_flag = False
+    have_rg_flag = False
+    have_p_flag = False
+    have_pr_flag = False
+    have_ppfd_flag = False
+
+    for col in data.columns:
+        # Eddypro renames
+        if col == 'u*':
+            print(f"renaming {col} to u_star")
+            data = data.rename(columns={col: 'u_star'})
+        if 'co2_signal_strength' in col:
+            print(f"renaming {col} to co2_signal_strength")
+            data = data.rename(columns={col: 'co2_signal_strength'})
+        if col in ['co2_signal_strength_7500_mean', 'CO2SS'.lower()] or 'co2_signal_strength' in col:
+            print(f"renaming {col} to co2_signal_strength")
+            data = data.rename(columns={col: 'co2_signal_strength'})
+        if col in ['ch4_signal_strength_7700_mean', 'CH4SS'.lower()] or 'ch4_signal_strength' in col:
+            print(f"renaming {col} to ch4_signal_strength")
+            data = data.rename(columns={col: 'ch4_signal_strength'})
+
+        # Biomet renames
+        if col == 'ppfd_in_1_1_1':
+            print(f"renaming {col} to ppfd_1_1_1")
+            data = data.rename(columns={col: 'ppfd_1_1_1'})
+        if col == 'sw_in_1_1_1':
+            print(f"renaming {col} to swin_1_1_1")
+            data = data.rename(columns={col: 'swin_1_1_1'})
+
+        if col == "rh_1_1_1":
+            have_rh_flag = True
+        if col == "vpd_1_1_1":
+            have_vpd_flag = True
+        if col in ['swin_1_1_1', 'sw_in_1_1_1']:
+            have_swin_flag = True
+        if col == 'par':
+            have_par_flag = True
+        if col == 'rg_1_1_1':
+            have_rg_flag = True
+        if col == 'p_1_1_1':
+            have_p_flag = True
+        if col == 'p_rain_1_1_1':
+            have_pr_flag = True
+        if col == 'ppfd_1_1_1':
+            have_ppfd_flag = True
+
+    if not (have_ppfd_flag or have_swin_flag):
+        print("NO PPFD and SWin")
+    else:
+        if not have_ppfd_flag:
+            data['ppfd_1_1_1'] = data['swin_1_1_1'] / 0.46
+        if not have_swin_flag:
+            data['swin_1_1_1'] = 0.46 * data['ppfd_1_1_1']
+        have_ppfd_flag = True
+        have_swin_flag = True
+
+    if not (have_rg_flag or have_swin_flag):
+        print("NO RG AND SWIN")
+    else:
+        print("Checking RG-SWIN pair")
+        if not have_rg_flag:
+            data['rg_1_1_1'] = data['swin_1_1_1']
+        if not have_swin_flag:
+            data['swin_1_1_1'] = data['rg_1_1_1']
+            have_swin_flag = True
+
+    if not (have_p_flag or have_pr_flag):
+        print("NO P and P_RAIN")
+    else:
+        print("Checking P <-> P_rain pair")
+        if not have_p_flag:
+            data['p_1_1_1'] = data['p_rain_1_1_1']
+        if not have_pr_flag:
+            data['p_rain_1_1_1'] = data['p_1_1_1']
+
+    if not (have_vpd_flag or have_rh_flag):
+        print("NO RH AND VPD")
+    else:
+        if 'ta_1_1_1' in data.columns:
+            temp_k = (data['ta_1_1_1'] + 273.15)
+        else:
+            temp_k = data['air_temperature']
+        logE = 23.5518 - (2937.4 / temp_k) - 4.9283 * np.log10(temp_k)
+        ehpa = np.power(10, logE)
+        if not have_vpd_flag:
+            print("calculating vpd_1_1_1 from rh_1_1_1 and air temperature")
+            data['vpd_1_1_1'] = ehpa - (ehpa * data['rh_1_1_1'] / 100)
+        if not have_rh_flag:
+            # TODO QOA 1 possibly an error
+            # OA: check tg for the formula
+            print("estimating rh_1_1_1 from air temperature")
+            data['rh_1_1_1'] = ehpa
+
+    if not (have_par_flag or have_swin_flag):
+        print("NO PAR and SWin")
+    else:
+        if not have_par_flag:
+            data['par'] = data['swin_1_1_1'] / 0.47  # SWin=PAR*0.47
+        if not have_swin_flag:
+            data['swin_1_1_1'] = 0.47 * data['par']
+
+    for col in ['co2_signal_strength_7500_mean', 'CO2SS'.lower()]:
+        # print(data.columns.to_list())
+        if col in data.columns.to_list():
+            print(f"renaming {col} to co2_signal_strength")
+            data = data.rename(columns={col: 'co2_signal_strength'})
+
+    for col in ['ch4_signal_strength_7700_mean', 'CH4SS'.lower()]:
+        # print(data.columns.to_list())
+        if col in data.columns.to_list():
+            print(f"renaming {col} to ch4_signal_strength")
+            data = data.rename(columns={col: 'ch4_signal_strength'})
+
+    if not has_meteo or 'ta_1_1_1' not in data.columns:
+        data['ta_1_1_1'] = data['air_temperature'] - 273.15
+        ff_logger.info("No Ta_1_1_1 column found, replaced by 'air_temperature'")
+    return data
+
+
+def filter_co2_strg(data: pd.DataFrame, quantile_config: dict) -> tuple[pd.DataFrame, FilterStore]:
+    """ Copy of data with co2_strg_tmp column: co2_strg with nans outside of the quantile filter limits """
+    tmp_data = data.copy()
+    tmp_data['co2_strg_tmp'] = tmp_data['co2_strg'].copy()
+    if 'co2_strg' in quantile_config.keys():
+        tmp_q_config = {'co2_strg_tmp': quantile_config['co2_strg']}
+    else:
+        tmp_q_config = {}
+    tmp_filter_db = FilterStore(tmp_data.index, ['co2_strg_tmp'])
+    tmp_data, tmp_filter_db = quantile_filter(tmp_data, tmp_filter_db, tmp_q_config)
+    tmp_data.loc[~get_column_filter(tmp_data, tmp_filter_db, 'co2_strg_tmp').astype(bool), 'co2_strg_tmp'] = np.nan
+    # tmp_data['co2_strg_tmp'] = tmp_data['co2_strg_tmp'].interpolate(limit=3)
+    # tmp_data['co2_strg_tmp'].fillna(bg.calc_rolling(tmp_data['co2_strg_tmp'], rolling_window=10 , step=gl.points_per_day, min_periods=4))
+    if 'co2_strg_tmp_quantilefilter' in tmp_filter_db['co2_strg_tmp']:
+        print(tmp_q_config, dict(tmp_filter_db), tmp_filter_db.to_frame()['co2_strg_tmp_quantilefilter'].value_counts())
+    return tmp_data, tmp_filter_db
+
+
+def calc_nee(data: pd.DataFrame, tmp_data: pd.DataFrame, calc_with_strg: bool) -> pd.DataFrame:
+    if calc_with_strg:
+        data['nee'] = (tmp_data['co2_flux'] + tmp_data['co2_strg_tmp']).copy()
+    else:
+        data['nee'] = data['co2_flux'].copy()
+    return data
+
+
+def pipeline_columns(columns, time_col: str, filters: FiltersConfig, extra_cols=()) -> list[str]:
+    """ Columns which are required after prepare_meteo_columns, the rest are only saved to IAS and output_all """
+    config_cols = set(extra_cols)
+    for cfg in [filters.qc, filters.meteo, filters.min_max, filters.window, filters.quantile, filters.madhampel]:
+        config_cols |= set(cfg.keys())
+    used_cols = set(COLS_PIPELINE_USED) | config_cols | {time_col}
+    return [col for col in columns if col in used_cols or col.startswith('qc_')
+            or re.fullmatch(SUMMARY_SOURCE_COLS_REGEX, col)]
+
+
+def split_pass_through(data: pd.DataFrame, time_col: str, filters: FiltersConfig,
+                       extra_cols=()) -> tuple[pd.DataFrame, SimpleNamespace]:
+    """
+    Moves columns unused by the pipeline out of data (smaller copies on each filter),
+    join_pass_through puts them back for the exports in the original order
+    """
+    used_cols = pipeline_columns(data.columns, time_col, filters, extra_cols)
+    pass_through = SimpleNamespace(df=data.drop(columns=used_cols), columns=data.columns.to_list())
+    ff_logger.info(f'{len(pass_through.df.columns)} of {len(data.columns)} columns are only passed to the exports.')
+    return data[used_cols], pass_through
+
+
+def join_pass_through(df: pd.DataFrame, pass_through: SimpleNamespace) -> pd.DataFrame:
+    """ New df with pass through columns, original columns go first in the import order, then the new ones """
+    df = df.join(pass_through.df)
+    new_cols = [col for col in df.columns if col not in pass_through.columns]
+    return df[[col for col in pass_through.columns if col in df.columns] + new_cols]
@@ -0,0 +1,97 @@
+"""
+Filters chain built from FiltersConfig in the same order as FluxFilter.py cells.
+Used to run the filtering without the notebook:
+    plot_data, filters_db = FilterPipeline.from_config(config.filters, has_meteo=config.calc.has_meteo)(data)
+Per column stages (min_max, quantile, window, madhampel) can run on concurrent.futures executor:
+    with ProcessPoolExecutor() as executor:
+        plot_data, filters_db = FilterPipeline.from_config(config.filters, executor=executor)(data)
+"""
+
+import time
+
+import pandas as pd
+
+from src.config.ff_config import FiltersConfig
+from src.ff_logger import ff_logger
+from src.filter_store import FilterStore
+from src.filters import min_max_filter, qc_filter, std_window_filter, meteorological_rh_filter, \
+    meteorological_night_filter, meteorological_day_filter, meteorological_co2ss_filter, meteorological_ch4ss_filter, \
+    meteorological_rain_filter, quantile_filter, mad_hampel_filter, manual_filter, winter_filter
+
+
+class FilterStage:
+    def __init__(self, name: str, cfg, func, executor=None):
+        """ func(data, filters_db, cfg, inplace) like any of src.filters, func(..., executor) if executor is set """
+        self.name = name
+        self.cfg = cfg
+        self.func = func
+        self.executor = executor
+
+    @property
+    def is_empty(self):
+        return len(self.cfg) == 0
+
+    def __call__(self, data, filters_db):
+        if self.executor is not None:
+            return self.func(data, filters_db, self.cfg, inplace=True, executor=self.executor)
+        return self.func(data, filters_db, self.cfg, inplace=True)
+
+
+class FilterPipeline:
+    def __init__(self, stages: list[FilterStage]):
+        self.stages = stages
+        # stage name -> seconds of the last run, skipped stages are not listed
+        self.timings: dict[str, float] = {}
+
+    @classmethod
+    def from_config(cls, cfg: FiltersConfig, has_meteo=True, executor=None) -> 'FilterPipeline':
+        def winter(data, filters_db, cfg_meteo, inplace):
+            return winter_filter(data, filters_db, cfg_meteo, cfg.winter_date_ranges, inplace=inplace)
+
+        def manual(data, filters_db, man_range, inplace):
+            return manual_filter(data, filters_db, col_name="nee", man_range=man_range, value=0,
+                                 manual_config=man_range, inplace=inplace)
+
+        stages = [
+            FilterStage('qc', cfg.qc, qc_filter),
+            FilterStage('co2ss', cfg.meteo, meteorological_co2ss_filter),
+            FilterStage('ch4ss', cfg.meteo, meteorological_ch4ss_filter),
+            FilterStage('rh', cfg.meteo, meteorological_rh_filter),
+        ]
+        if has_meteo:
+            stages += [
+                FilterStage('rain', cfg.meteo, meteorological_rain_filter),
+                FilterStage('night', cfg.meteo, meteorological_night_filter),
+                FilterStage('day', cfg.meteo, meteorological_day_filter),
+                FilterStage('winter', cfg.meteo, winter),
+            ]
+        stages += [
+            FilterStage('min_max', cfg.min_max, min_max_filter, executor),
+            FilterStage('quantile', cfg.quantile, quantile_filter, executor),
+            FilterStage('window', cfg.window, std_window_filter, executor),
+            FilterStage('madhampel', cfg.madhampel, mad_hampel_filter, executor),
+        ]
+        stages += [FilterStage(f'manual_{i}', man_range, manual) for i, man_range in enumerate(cfg.man_ranges)]
+        return cls(stages)
+
+    def __call__(self, data: pd.DataFrame, filters_db: FilterStore = None,
+                 inplace=False) -> tuple[pd.DataFrame, FilterStore]:
+        """ Stages are applied inplace to a single copy of data and filters_db (no copy at all if inplace) """
+        if not inplace:
+            data = data.copy()
+            filters_db = filters_db.copy() if filters_db is not None else None
+        if filters_db is None:
+            filters_db = FilterStore(data.index, data.columns)
+
+        self.timings = {}
+        for stage in self.stages:
+            if stage.is_empty:
+                ff_logger.info(f'Filter stage {stage.name} skipped, config is empty.')
+                continue
+            start = time.perf_counter()
+            data, filters_db = stage(data, filters_db)
+            self.timings[stage.name] = time.perf_counter() - start
+
+        timings_str = '\n'.join(f'{name}: {seconds:.3f} s' for name, seconds in self.timings.items())
+        ff_logger.info(f'Filter stages timings: \n{timings_str} \n')
+        return data, filters_db
@@ -0,0 +1,145 @@
+"""
+Storage of filter masks apart from the data table.
+
+Previously each filter was a full int column like co2_flux_qcfilter in the main df
+and filters_db was {col: [filter names]}. Now each filter is a row of packed bits (1 - good, 0 - filtered),
+while FilterStore still reads like the old filters_db dict: filters_db[col], filters_db.items(), etc.
+Legacy *filter columns are generated only on export with to_frame().
+
+Combined mask of each column is cached: new filter is joined into the cached mask with a single AND,
+and the cache of the column is dropped only if one of its filters is overwritten.
+"""
+
+from collections.abc import Mapping
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+
+class FilterStore(Mapping):
+    def __init__(self, index: pd.Index, columns=()):
+        self.index = index
+        # col -> filter names, rows of self._bits[col] are in the same order
+        self._names: dict[str, list[str]] = {col: [] for col in columns}
+        # col -> uint8 array of shape (n_filters, ceil(n_rows / 8))
+        self._bits: dict[str, np.ndarray] = {}
+        # (col, filter name) in order of creation, same as legacy column order in the data
+        self._order: list[tuple[str, str]] = []
+        # col -> packed AND of all the column filters
+        self._combined: dict[str, np.ndarray] = {}
+        # shared by copies, since each filter works on a copy of the store
+        self._cache_stats = SimpleNamespace(hits=0, misses=0)
+
+    def __getitem__(self, col) -> tuple[str, ...]:
+        # tuple: filters must be added only with set_mask, not with append
+        return tuple(self._names[col])
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.index)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bits.nbytes for bits in self._bits.values())
+
+    def _unpack(self, packed_row: np.ndarray) -> np.ndarray:
+        return np.unpackbits(packed_row, count=self.n_rows).astype(int)
+
+    def set_mask(self, col: str, filter_name: str, mask) -> bool:
+        """ Adds or replaces filter, returns True if filter already existed and was overwritten """
+        mask = np.asarray(mask)
+        if mask.shape != (self.n_rows,):
+            raise ValueError(f'Filter {filter_name} size {mask.shape} does not match data size {self.n_rows}.')
+        packed_row = np.packbits(mask.astype(bool))
+
+        names = self._names.setdefault(col, [])
+        if filter_name in names:
+            self._bits[col][names.index(filter_name)] = packed_row
+            self._combined.pop(col, None)
+            return True
+
+        names.append(filter_name)
+        self._order.append((col, filter_name))
+        bits = self._bits.get(col)
+        self._bits[col] = packed_row[np.newaxis] if bits is None else np.vstack([bits, packed_row])
+        if col in self._combined:
+            self._combined[col] = self._combined[col] & packed_row
+        return False
+
+    def get_mask(self, col: str, filter_name: str) -> np.ndarray:
+        return self._unpack(self._bits[col][self._names[col].index(filter_name)])
+
+    def combined(self, col: str) -> np.ndarray:
+        """ All filters of the column joined by AND, ones if column has no filters """
+        bits = self._bits.get(col)
+        if bits is None:
+            return np.ones(self.n_rows, dtype=int)
+        if col in self._combined:
+            self._cache_stats.hits += 1
+        else:
+            self._cache_stats.misses += 1
+            self._combined[col] = np.bitwise_and.reduce(bits, axis=0)
+        return self._unpack(self._combined[col])
+
+    def cache_info(self) -> SimpleNamespace:
+        """ Combined mask cache hits and misses of this store and all of its copies """
+        return SimpleNamespace(hits=self._cache_stats.hits, misses=self._cache_stats.misses,
+                               cached=len(self._combined))
+
+    def to_frame(self, columns=None) -> pd.DataFrame:
+        """ Legacy int filter columns like co2_flux_qcfilter, optionally only for filters of the listed columns """
+        masks = {filter_name: self.get_mask(col, filter_name) for col, filter_name in self._order
+                 if columns is None or col in columns}
+        return pd.DataFrame(masks, index=self.index)
+
+    def copy(self) -> 'FilterStore':
+        res = FilterStore(self.index)
+        res._names = {col: list(names) for col, names in self._names.items()}
+        res._bits = {col: bits.copy() for col, bits in self._bits.items()}
+        res._order = list(self._order)
+        # cached arrays are never changed in place, so they can be shared
+        res._combined = dict(self._combined)
+        res._cache_stats = self._cache_stats
+        return res
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, filters_db: dict[str, list[str]]) -> 'FilterStore':
+        """ Converts legacy filter columns in the data and {col: [filter names]} dict """
+        res = cls(data.index, filters_db.keys())
+        for col, filter_names in filters_db.items():
+            for filter_name in filter_names:
+                res.set_mask(col, filter_name, data[filter_name].to_numpy())
+        return res
+
+
+def _colapse_column_filters(data, filters):
+    return data[filters[0]].astype(int) if len(filters) == 1 else np.logical_and.reduce(
+        (data[filters].astype(int)), axis=1).astype(int)
+
+
+def colapse_filters(data, filters_db_in):
+    out_filter = {}
+    for feature, filters in filters_db_in.items():
+        if len(filters) > 0:
+            out_filter[feature] = _colapse_column_filters(data, filters)
+    return out_filter
+
+
+def get_column_filter(data, filters_db_in, column_name):
+    if isinstance(filters_db_in, FilterStore):
+        # cached, recalculated only when column filters change
+        return filters_db_in.combined(column_name)
+    
+    if column_name not in filters_db_in.keys():
+        return np.array([1] * len(data.index))
+    if len(filters_db_in[column_name]) > 0:
+        return _colapse_column_filters(data, filters_db_in[column_name])
+    else:
+        return np.array([1] * len(data.index))
@@ -3,214 +3,242 @@ import pandas as pd
 
 from bglabutils import basic as bg, filters as bf
 from src.ff_logger import ff_logger
-from src.plots import get_column_filter
+from src.filter_store import get_column_filter
+from src.helpers.rolling_helpers import rolling_std
 
+# columns read by the filters besides the filter config keys and qc_* flags
+FILTERS_SOURCE_COLS = ['co2_flux', 'nee', 'h', 'le', 'ch4_flux', 'co2_signal_strength', 'ch4_signal_strength',
+                       'p_rain_1_1_1', 'rh_1_1_1', 'swin_1_1_1']
 
-def min_max_filter(data_in, filters_db_in, config):
+
+def _copy_inputs(data_in, filters_db_in, inplace):
+    """ inplace=True skips copies: data_in and filters_db_in are changed and returned back """
+    if inplace:
+        return data_in, filters_db_in
+    return data_in.copy(), filters_db_in.copy()
+
+
+def _start_filter(data, filters_db, col) -> pd.Series:
+    """ New filter starts from all the previous filters of the column """
+    return pd.Series(get_column_filter(data, filters_db, col), index=data.index)
+
+
+def _save_filter(filters_db, col, filter_name, filter):
+    if filters_db.set_mask(col, filter_name, filter):
+        print("filter already exist but will be overwritten")
+
+
+def _map_jobs(executor, func, *jobs_args) -> list:
+    """ Same as list(map(func, *jobs_args)), but on concurrent.futures executor if it is not None """
+    if executor is None:
+        return list(map(func, *jobs_args))
+    return list(executor.map(func, *jobs_args))
+
+
+def _split_col_groups(col_groups: dict, executor) -> list[tuple]:
+    """ Columns with the same settings are processed as one array, but with executor each column is a separate job """
+    if executor is None:
+        return list(col_groups.items())
+    return [(key, [col]) for key, cols in col_groups.items() for col in cols]
+
+
+def _index_positions(index: pd.Index, labels) -> np.ndarray:
+    """ Same as data.loc[labels], raises KeyError if any label is missing """
+    positions = index.get_indexer(labels)
+    if (positions < 0).any():
+        raise KeyError(f"{labels[positions < 0]} not in index")
+    return positions
+
+
+def _min_max_job(values, limits, check_lower) -> np.ndarray:
+    if check_lower:
+        return (values < limits[0]) | (values > limits[1])
+    return values > limits[1]
+
+
+def min_max_filter(data_in, filters_db_in, config, inplace=False, executor=None):
     # #@unroll_filters_db
     
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
+    cols = []
     for col, limits in config.items():
         if col not in data.columns:
             print(f"No column with name {col}, skipping...")
             continue
-        filter = get_column_filter(data, filters_db, col)
-        
-        if len(filter) == 0:
-            filter = [1] * len(data.index)
-        
-        data[f"{col}_minmaxfilter"] = filter
-        
-        if col not in ['rh_1_1_1', 'swin_1_1_1', 'ppfd_1_1_1', 'swin_1_1_1']:
-            data.loc[data.query(f"{col}<{limits[0]}|{col}>{limits[1]}").index, f"{col}_minmaxfilter"] = 0
-        else:
-            if col == 'rh_1_1_1':
-                data[col] = data[col].clip(upper=limits[1])
-                data.loc[data.query(f"{col}<{limits[0]}|{col}>{limits[1]}").index, f"{col}_minmaxfilter"] = 0
-            else:
-                data[col] = data[col].clip(lower=limits[0])
-                if col not in ['swin_1_1_1']:
-                    data.loc[data.query(f"{col}<{limits[0]}|{col}>{limits[1]}").index, f"{col}_minmaxfilter"] = 0
-                else:
-                    data.loc[data.query(f"{col}>{limits[1]}").index, f"{col}_minmaxfilter"] = 0
-        
-        if f"{col}_minmaxfilter" not in filters_db[col]:
-            filters_db[col].append(f"{col}_minmaxfilter")
-        else:
-            print("filter already exist but will be overwritten")
+        cols.append(col)
+        
+        if col == 'rh_1_1_1':
+            data[col] = data[col].clip(upper=limits[1])
+        elif col in ['swin_1_1_1', 'ppfd_1_1_1']:
+            data[col] = data[col].clip(lower=limits[0])
+    
+    is_out = _map_jobs(executor, _min_max_job, [data[col].to_numpy() for col in cols], [config[col] for col in cols],
+                       [col != 'swin_1_1_1' for col in cols])
+    for col, col_is_out in zip(cols, is_out):
+        filter = _start_filter(data, filters_db, col)
+        filter.loc[col_is_out] = 0
+        _save_filter(filters_db, col, f"{col}_minmaxfilter", filter)
     ff_logger.info(f"min_max_filter applied with the next config: \n {config}  \n")
     return data, filters_db
 
 
-def qc_filter(data_in, filters_db_in, cfg_qc):
+def qc_filter(data_in, filters_db_in, cfg_qc, inplace=False):
     # #@unroll_filters_db
     
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
     
     for col, limits in cfg_qc.items():
         if col not in data.columns:
             print(f"No column with name {col}, skipping...")
             continue
         
-        filter = get_column_filter(data, filters_db, col)
-        if len(filter) == 0:
-            filter = [1] * len(data.index)
-        
-        data[f"{col}_qcfilter"] = filter
+        filter = _start_filter(data, filters_db, col)
         if f"qc_{col}" not in data.columns and col != 'nee':
             print(f"No qc_{col} in data")
             continue
         if col != 'nee':
-            data.loc[data[f"qc_{col}"] > cfg_qc[col], f"{col}_qcfilter"] = 0
-        else:
-            data.loc[data[f"qc_co2_flux"] > cfg_qc['co2_flux'], f"nee_qcfilter"] = 0
-        
-        if f"{col}_qcfilter" not in filters_db[col]:
-            filters_db[col].append(f"{col}_qcfilter")
+            filter.loc[data[f"qc_{col}"] > cfg_qc[col]] = 0
         else:
-            print("filter already exist but will be overwritten")
+            filter.loc[data[f"qc_co2_flux"] > cfg_qc['co2_flux']] = 0
+
+        _save_filter(filters_db, col, f"{col}_qcfilter", filter)
     ff_logger.info(f"qc_filter applied with the next config: \n {cfg_qc}  \n")
     return data, filters_db
 
 
-def std_window_filter(data_in, filters_db_in, config):
+def _calc_rolling(values: np.ndarray, index: pd.DatetimeIndex, window_size, min_periods, points_per_day) -> np.ndarray:
+    """ bg.calc_rolling of each column """
+    return np.column_stack([
+        bg.calc_rolling(pd.Series(values[:, i], index=index), rolling_window=window_size, step=points_per_day,
+                        min_periods=min_periods).to_numpy(dtype=float)
+        for i in range(values.shape[1])
+    ])
+
+
+def _std_window_job(values, is_good, index, window_size, min_periods, points_per_day, sigmas) -> np.ndarray:
+    """ Returns is_good without the points outside of rolling mean +- sigmas * rolling std, columns are independent """
+    tmp_values = np.where(is_good, values, np.nan)
+    rolling_mean = _calc_rolling(tmp_values, index, window_size, min_periods, points_per_day)
+    rolling_sigma = rolling_std(tmp_values - rolling_mean, window=window_size * points_per_day, closed='both',
+                                min_periods=window_size * points_per_day // 2)
+    upper_bound = rolling_mean + rolling_sigma * sigmas
+    lower_bound = rolling_mean - rolling_sigma * sigmas
+    return is_good & ~((upper_bound < values) | (lower_bound > values))
+
+
+def std_window_filter(data_in, filters_db_in, config, inplace=False, executor=None):
     # #@unroll_filters_db
     
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
+    # columns with the same window are processed at once
+    col_groups = {}
     for col, lconfig in config.items():
-        sigmas = lconfig['sigmas']
-        window_size = lconfig['window']
-        min_periods = lconfig['min_periods']  # (window_size//2-1)
-        points_per_day = int(pd.Timedelta('24h') / data_in.index.freq)  # lconfig['points_per_day']
         if col not in data.columns:
             print(f"No column with name {col}, skipping...")
             continue
-        filter = get_column_filter(data, filters_db, col)
-        if len(filter) == 0:
-            filter = [1] * len(data.index)
-        
-        data[f"{col}_stdwindowfilter"] = filter
-        data['tmp_col'] = data[col]
-        data.loc[~filter.astype(bool), 'tmp_col'] = np.nan
-        rolling_mean = bg.calc_rolling(data['tmp_col'], rolling_window=window_size, step=points_per_day,
-                                       min_periods=min_periods)
-        residuals = data['tmp_col'] - rolling_mean
-        rolling_sigma = residuals.rolling(window=window_size * points_per_day, center=True, closed='both',
-                                          min_periods=window_size * points_per_day // 2).std()
-        data = data.drop(columns='tmp_col')
-        # print(rolling_sigma, rolling_mean)
-        upper_bound = rolling_mean + rolling_sigma * sigmas
-        lower_bound = rolling_mean - rolling_sigma * sigmas
-        upper_inds = upper_bound[upper_bound < data[col]].index
-        lower_inds = lower_bound[lower_bound > data[col]].index
-        data.loc[upper_inds, f"{col}_stdwindowfilter"] = 0
-        data.loc[lower_inds, f"{col}_stdwindowfilter"] = 0
-        # # print(len(lower_inds), len(upper_inds))
-        # plt.plot(rolling_mean)
-        # plt.title(col)
-        # plt.show()
-        
-        if f"{col}_stdwindowfilter" not in filters_db[col]:
-            filters_db[col].append(f"{col}_stdwindowfilter")
-        else:
-            print("filter already exist but will be overwritten")
+        col_groups.setdefault((lconfig['window'], lconfig['min_periods']), []).append(col)
+    
+    jobs = _split_col_groups(col_groups, executor)
+    # no jobs: empty config or all the columns are missing
+    points_per_day = int(pd.Timedelta('24h') / data_in.index.freq) if len(jobs) > 0 else None
+    jobs_is_good = _map_jobs(
+        executor, _std_window_job,
+        [data[cols].to_numpy(dtype=float) for _, cols in jobs],
+        [np.column_stack([_start_filter(data, filters_db, col).to_numpy() == 1 for col in cols]) for _, cols in jobs],
+        [data.index] * len(jobs),
+        [window_size for (window_size, _), _ in jobs], [min_periods for (_, min_periods), _ in jobs],
+        [points_per_day] * len(jobs), [np.array([config[col]['sigmas'] for col in cols]) for _, cols in jobs]
+    )
+    
+    filters = {}
+    for (_, cols), is_good in zip(jobs, jobs_is_good):
+        for i, col in enumerate(cols):
+            filters[col] = pd.Series(is_good[:, i].astype(int), index=data.index)
+    
+    for col in config:
+        if col in filters:
+            _save_filter(filters_db, col, f"{col}_stdwindowfilter", filters[col])
     ff_logger.info(f"std_window_filter applied with the next config: \n {config}  \n")
     return data, filters_db
 
 
 def meteorological_filter(
-        data_in, filters_db_in, config
+        data_in, filters_db_in, config, inplace=False
         # , file_freq='30T'):#,rain_forward_flag=3, p_rain_limit=.1,  filter_css=True):
 ):
     file_freq = data_in.index.freq
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
     
+    filters = {}
     for col in ["co2_flux", 'h', 'le', 'ch4_flux']:
-        
-        filter = get_column_filter(data, filters_db, col)
-        if len(filter) == 0:
-            filter = [1] * len(data.index)
-        
-        if f"{col}_physFilter" not in filters_db[col]:
-            filters_db[col].append(f"{col}_physFilter")
-        else:
-            print("filter already exist but will be overwritten")
-        
-        data[f"{col}_physFilter"] = filter
+        filters[col] = _start_filter(data, filters_db, col)
     
     if 'co2_signal_strength' in data.columns and 'CO2SS_min' in config.keys():
-        data.loc[data['co2_signal_strength'] < config['CO2SS_min'], 'co2_flux_physFilter'] = 0
+        filters['co2_flux'].loc[data['co2_signal_strength'] < config['CO2SS_min']] = 0
     else:
         print("No co2_signal_strength found")
     
     if 'ch4_signal_strength' in data.columns and 'CH4SS_min' in config.keys():
-        data.loc[data['ch4_signal_strength'] < config['CH4SS_min'], 'ch4_flux_physFilter'] = 0
+        filters['ch4_flux'].loc[data['ch4_signal_strength'] < config['CH4SS_min']] = 0
     else:
         print("No ch4_signal_strength found")
     
     if 'p_rain_limit' in config.keys():
-        data.loc[data['p_rain_1_1_1'] > config['p_rain_limit'], 'co2_flux_physFilter'] = 0
-        data.loc[data['p_rain_1_1_1'] > config['p_rain_limit'], 'h_physFilter'] = 0
-        data.loc[data['p_rain_1_1_1'] > config['p_rain_limit'], 'le_physFilter'] = 0
+        filters['co2_flux'].loc[data['p_rain_1_1_1'] > config['p_rain_limit']] = 0
+        filters['h'].loc[data['p_rain_1_1_1'] > config['p_rain_limit']] = 0
+        filters['le'].loc[data['p_rain_1_1_1'] > config['p_rain_limit']] = 0
         if 'rain_forward_flag' in config:
             rain_forward_flag = config['rain_forward_flag']
             for i in range(rain_forward_flag):
                 ind = data.loc[data['p_rain_1_1_1'] > config['p_rain_limit']].index.shift(i, freq=file_freq)
-                data.loc[ind, 'co2_flux_physFilter'] = 0
-                data.loc[ind, 'h_physFilter'] = 0
-                data.loc[ind, 'le_physFilter'] = 0
+                ind = ind.intersection(data.index)
+                filters['co2_flux'].loc[ind] = 0
+                filters['h'].loc[ind] = 0
+                filters['le'].loc[ind] = 0
     
     if 'RH_max' in config.keys():
         RH_max = config['RH_max']
-        data.loc[data['rh_1_1_1'] > RH_max, 'co2_flux_physFilter'] = 0
-        data.loc[data['rh_1_1_1'] > RH_max, 'le_physFilter'] = 0
+        filters['co2_flux'].loc[data['rh_1_1_1'] > RH_max] = 0
+        filters['le'].loc[data['rh_1_1_1'] > RH_max] = 0
+    
+    for col, filter in filters.items():
+        _save_filter(filters_db, col, f"{col}_physFilter", filter)
     ff_logger.info(f"meteorological_filter applied with the next config: \n {config}  \n")
     return data, filters_db
 
 
 def meteorological_rh_filter(
-        data_in, filters_db_in, cfg_meteo
+        data_in, filters_db_in, cfg_meteo, inplace=False
         # , file_freq='30T'):#,rain_forward_flag=3, p_rain_limit=.1,  filter_css=True):
 ):
     # #@unroll_filters_db
     
     file_freq = data_in.index.freq
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
     
+    filters = {}
     for col in ["co2_flux", 'le', 'nee']:
         
         if col not in data.columns:
             print(f"no {col}")
             continue
         
-        filter = get_column_filter(data, filters_db, col)
-        if len(filter) == 0:
-            filter = [1] * len(data.index)
-        
-        if f"{col}_rhFilter" not in filters_db[col]:
-            filters_db[col].append(f"{col}_rhFilter")
-        else:
-            print("filter already exist but will be overwritten")
-        
-        data[f"{col}_rhFilter"] = filter
+        filters[col] = _start_filter(data, filters_db, col)
     
     if 'RH_max' in cfg_meteo.keys() and 'rh_1_1_1' in data.columns:
         RH_max = cfg_meteo['RH_max']
-        data.loc[data['rh_1_1_1'] > RH_max, 'co2_flux_rhFilter'] = 0
-        if 'nee' in data.columns:
-            data.loc[data['rh_1_1_1'] > RH_max, 'nee_rhFilter'] = 0
-        data.loc[data['rh_1_1_1'] > RH_max, 'le_rhFilter'] = 0
+        for col in ['co2_flux', 'nee', 'le']:
+            if col in filters:
+                filters[col].loc[data['rh_1_1_1'] > RH_max] = 0
+    
+    for col, filter in filters.items():
+        _save_filter(filters_db, col, f"{col}_rhFilter", filter)
     ff_logger.info(f"meteorological_rh_filter applied with the next config: \n {cfg_meteo}  \n")
     return data, filters_db
 
 
 def meteorological_night_filter(
-        data_in, filters_db_in, cfg_meteo
+        data_in, filters_db_in, cfg_meteo, inplace=False
         # , file_freq='30T'):#,rain_forward_flag=3, p_rain_limit=.1,  filter_css=True):
 ):
     # #@unroll_filters_db
@@ -224,51 +252,40 @@ def meteorological_night_filter(
         return data_in, filters_db_in
     
     file_freq = data_in.index.freq
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
     col_of_interest = ["h", 'le', 'nee', 'co2_flux']
     
+    filters = {}
     for col in col_of_interest:
         if col not in data.columns:
             print(f"no {col} column")
             continue
-        filter = get_column_filter(data, filters_db, col)
-        if len(filter) == 0:
-            filter = [1] * len(data.index)
-        
-        if f"{col}_nightFilter" not in filters_db[col]:
-            filters_db[col].append(f"{col}_nightFilter")
-        else:
-            print("filter already exist but will be overwritten")
-        
-        data[f"{col}_nightFilter"] = filter
+        filters[col] = _start_filter(data, filters_db, col)
+    
+    is_night = data['swin_1_1_1'].to_numpy() < 10
     
     if "nee" in data.columns:
-        data_night_index = data.query(f"swin_1_1_1<10&nee<{cfg_meteo['night_nee_min']}").index
-        data.loc[data_night_index, f"nee_nightFilter"] = 0
+        filters['nee'].loc[is_night & (data['nee'].to_numpy() < cfg_meteo['night_nee_min'])] = 0
     
     if "co2_flux" in data.columns:
-        data_night_index = data.query("swin_1_1_1<10&co2_flux<0").index
-        data.loc[data_night_index, f"co2_flux_nightFilter"] = 0
+        filters['co2_flux'].loc[is_night & (data['co2_flux'].to_numpy() < 0)] = 0
     
-    data_night_index = data.query(
-        f"(h<{cfg_meteo['night_h_limits'][0]}|h>{cfg_meteo['night_h_limits'][1]})&swin_1_1_1<10"
-    ).index
-    data.loc[data_night_index, f"h_nightFilter"] = 0
+    h = data['h'].to_numpy()
+    filters['h'].loc[((h < cfg_meteo['night_h_limits'][0]) | (h > cfg_meteo['night_h_limits'][1])) & is_night] = 0
     
-    data_night_index = data.query(
-        f"(h<{cfg_meteo['night_le_limits'][0]}|h>{cfg_meteo['night_le_limits'][1]})&swin_1_1_1<10"
-    ).index
-    data.loc[data_night_index, f"le_nightFilter"] = 0
+    # TODO 2 le limits are checked against h column, kept as is to not change results
+    filters['le'].loc[((h < cfg_meteo['night_le_limits'][0]) | (h > cfg_meteo['night_le_limits'][1])) & is_night] = 0
     
     # if 'nee' in data.columns:
     #   data_night_index = data.query(f'nee>{config["day_nee_max"]}&swin_1_1_1>=10').index
     #   data.loc[data_night_index, f"nee_nightFilter"] = 0
+    for col, filter in filters.items():
+        _save_filter(filters_db, col, f"{col}_nightFilter", filter)
     ff_logger.info(f"meteorological_night_filter applied with the next config: \n {cfg_meteo}  \n")
     return data, filters_db
 
 
-def meteorological_day_filter(data_in, filters_db_in, cfg_meteo):  # , file_freq='30T'):
+def meteorological_day_filter(data_in, filters_db_in, cfg_meteo, inplace=False):  # , file_freq='30T'):
     # #@unroll_filters_db
     
     if "swin_1_1_1" not in data_in.columns:
@@ -280,34 +297,28 @@ def meteorological_day_filter(data_in, filters_db_in, cfg_meteo):  # , file_freq
         return data_in, filters_db_in
     
     file_freq = data_in.index.freq
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
     col_of_interest = ['nee']
     
+    filters = {}
     for col in col_of_interest:
         if col not in data.columns:
             print(f"no {col} column")
             continue
-        filter = get_column_filter(data, filters_db, col)
-        if len(filter) == 0:
-            filter = [1] * len(data.index)
-        
-        if f"{col}_dayFilter" not in filters_db[col]:
-            filters_db[col].append(f"{col}_dayFilter")
-        else:
-            print("filter already exist but will be overwritten")
-        
-        data[f"{col}_dayFilter"] = filter
+        filters[col] = _start_filter(data, filters_db, col)
     
     if 'nee' in data.columns:
-        data_day_index = data.query(f'nee>{cfg_meteo["day_nee_max"]}&swin_1_1_1>={cfg_meteo["day_swin_limit"]}').index
-        data.loc[data_day_index, f"nee_dayFilter"] = 0
+        is_day = data['swin_1_1_1'].to_numpy() >= cfg_meteo["day_swin_limit"]
+        filters['nee'].loc[(data['nee'].to_numpy() > cfg_meteo["day_nee_max"]) & is_day] = 0
+    
+    for col, filter in filters.items():
+        _save_filter(filters_db, col, f"{col}_dayFilter", filter)
     ff_logger.info(f"meteorological_day_filter applied with the next config: \n {cfg_meteo}  \n")
     return data, filters_db
 
 
 def meteorological_co2ss_filter(
-        data_in, filters_db_in, cfg_meteo
+        data_in, filters_db_in, cfg_meteo, inplace=False
         # , file_freq='30T'):#,rain_forward_flag=3, p_rain_limit=.1,  filter_css=True):
 ):
     # #@unroll_filters_db
@@ -315,8 +326,7 @@ def meteorological_co2ss_filter(
     if 'CO2SS_min' not in cfg_meteo.keys():
         return data_in, filters_db_in
     
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
     
     for col in ["co2_flux", 'nee']:
         
@@ -324,28 +334,20 @@ def meteorological_co2ss_filter(
             print(f"no {col} column")
             continue
         
-        filter = get_column_filter(data, filters_db, col)
-        if len(filter) == 0:
-            filter = [1] * len(data.index)
-        
-        if f"{col}_co2ssFilter" not in filters_db[col]:
-            filters_db[col].append(f"{col}_co2ssFilter")
-        else:
-            print("filter already exist but will be overwritten")
-        
-        data[f"{col}_co2ssFilter"] = filter
+        filter = _start_filter(data, filters_db, col)
         
         if 'co2_signal_strength' in data.columns:
-            data.loc[data['co2_signal_strength'] < cfg_meteo['CO2SS_min'], f'{col}_co2ssFilter'] = 0
+            filter.loc[data['co2_signal_strength'] < cfg_meteo['CO2SS_min']] = 0
         
         else:
             print("No co2_signal_strength found")
+        _save_filter(filters_db, col, f"{col}_co2ssFilter", filter)
     ff_logger.info(f"meteorological_co2ss_filter applied with the next config: \n {cfg_meteo}  \n")
     return data, filters_db
 
 
 def meteorological_ch4ss_filter(
-        data_in, filters_db_in, cfg_meteo
+        data_in, filters_db_in, cfg_meteo, inplace=False
         # , file_freq='30T'):#,rain_forward_flag=3, p_rain_limit=.1,  filter_css=True):
 ):
     # #@unroll_filters_db
@@ -354,71 +356,48 @@ def meteorological_ch4ss_filter(
     if 'CH4SS_min' not in cfg_meteo.keys():
         return data_in, filters_db_in
     
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
     
+    filters = {}
     for col in ["ch4_flux"]:
         
         if col not in data.columns:
             print(f"no {col} column")
             continue
         
-        filter = get_column_filter(data, filters_db, col)
-        if len(filter) == 0:
-            filter = [1] * len(data.index)
-        
-        if f"{col}_ch4ssFilter" not in filters_db[col]:
-            filters_db[col].append(f"{col}_ch4ssFilter")
-        else:
-            print("filter already exist but will be overwritten")
-        
-        data[f"{col}_ch4ssFilter"] = filter
+        filters[col] = _start_filter(data, filters_db, col)
     
     if 'ch4_signal_strength' in data.columns:
-        data.loc[data['ch4_signal_strength'] < cfg_meteo['CH4SS_min'], 'ch4_flux_ch4ssFilter'] = 0
+        filters['ch4_flux'].loc[data['ch4_signal_strength'] < cfg_meteo['CH4SS_min']] = 0
     else:
         print("No ch4_signal_strength found")
+    
+    for col, filter in filters.items():
+        _save_filter(filters_db, col, f"{col}_ch4ssFilter", filter)
     ff_logger.info(f"meteorological_coh4ss_filter applied with the next config: \n {cfg_meteo}  \n")
     return data, filters_db
 
 
 def meteorological_rain_filter(
-        data_in, filters_db_in, cfg_meteo
+        data_in, filters_db_in, cfg_meteo, inplace=False
         # , file_freq='30T'):#,rain_forward_flag=3, p_rain_limit=.1,  filter_css=True):
 ):
     # #@unroll_filters_db
     
     file_freq = data_in.index.freq
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
     
+    filters = {}
     for col in ["co2_flux", 'h', 'le', 'nee', "ch4_flux"]:
         if col not in data.columns:
             print(f"no {col}")
             continue
         
-        filter = get_column_filter(data, filters_db, col)
-        if len(filter) == 0:
-            filter = [1] * len(data.index)
-        
-        if f"{col}_rainFilter" not in filters_db[col]:
-            filters_db[col].append(f"{col}_rainFilter")
-        else:
-            print("filter already exist but will be overwritten")
-        
-        data[f"{col}_rainFilter"] = filter
+        filters[col] = _start_filter(data, filters_db, col)
     
     if 'p_rain_limit' in cfg_meteo.keys() and 'p_rain_1_1_1' in data.columns:
-        if 'co2_flux' in data.columns:
-            data.loc[data['p_rain_1_1_1'] > cfg_meteo['p_rain_limit'], 'co2_flux_rainFilter'] = 0
-        if 'h' in data.columns:
-            data.loc[data['p_rain_1_1_1'] > cfg_meteo['p_rain_limit'], 'h_rainFilter'] = 0
-        if 'le' in data.columns:
-            data.loc[data['p_rain_1_1_1'] > cfg_meteo['p_rain_limit'], 'le_rainFilter'] = 0
-        if 'nee' in data.columns:
-            data.loc[data['p_rain_1_1_1'] > cfg_meteo['p_rain_limit'], 'nee_rainFilter'] = 0
-        if 'ch4_flux' in data.columns:
-            data.loc[data['p_rain_1_1_1'] > cfg_meteo['p_rain_limit'], 'ch4_flux_rainFilter'] = 0
+        for filter in filters.values():
+            filter.loc[data['p_rain_1_1_1'] > cfg_meteo['p_rain_limit']] = 0
         
         if 'rain_forward_flag' in cfg_meteo:
             rain_forward_flag = cfg_meteo['rain_forward_flag']
@@ -427,107 +406,91 @@ def meteorological_rain_filter(
                 ind = ind.intersection(data.index)
                 if len(ind) == 0:
                     continue
-                if 'nee' in data.columns:
-                    data.loc[ind, 'nee_rainFilter'] = 0
-                if 'ch4_flux' in data.columns:
-                    data.loc[ind, 'ch4_flux_rainFilter'] = 0
-                if 'co2_flux' in data.columns:
-                    data.loc[ind, 'co2_flux_rainFilter'] = 0
-                if 'h' in data.columns:
-                    data.loc[ind, 'h_rainFilter'] = 0
-                if 'le' in data.columns:
-                    data.loc[ind, 'le_rainFilter'] = 0
+                for filter in filters.values():
+                    filter.loc[ind] = 0
     
+    for col, filter in filters.items():
+        _save_filter(filters_db, col, f"{col}_rainFilter", filter)
     ff_logger.info(f"meteorological_rain_filter applied with the next config: \n {cfg_meteo}  \n")
     return data, filters_db
 
 
-def quantile_filter(data_in, filters_db_in, config):
+def _quantile_job(values, is_good, limits):
+    """ Returns points outside of the quantiles of good values and the quantiles """
+    limit_down, limit_up = limits
+    good_values = pd.Series(values[is_good])
+    up_limit = good_values.quantile(limit_up)
+    down_limit = good_values.quantile(limit_down)
+    return (values > up_limit) | (values < down_limit), down_limit, up_limit
+
+
+def quantile_filter(data_in, filters_db_in, config, inplace=False, executor=None):
     # TODO 2 why [0, 1] quantile produces 0 and 1 row? nan?
     # #@unroll_filters_db
     
     if len(config) == 0:
         return data_in, filters_db_in
     
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
     
+    cols = []
     for col, limits in config.items():
-        limit_down, limit_up = limits
         if col not in data.columns:
             print(f"No column with name {col}, skipping...")
             continue
-        
-        filter = get_column_filter(data, filters_db, col)
-        if len(filter) == 0:
-            filter = [1] * len(data.index)
-        
-        if f"{col}_quantilefilter" not in filters_db[col]:
-            filters_db[col].append(f"{col}_quantilefilter")
-        else:
-            print("filter already exist but will be overwritten")
-        
-        data[f"{col}_quantilefilter"] = filter
-        up_limit = data.loc[data[f'{col}_quantilefilter'] == 1, col].quantile(limit_up)
-        down_limit = data.loc[data[f'{col}_quantilefilter'] == 1, col].quantile(limit_down)
-        f_inds = data.query(f"{col}_quantilefilter==1").index
+        cols.append(col)
+    
+    filters = {col: _start_filter(data, filters_db, col) for col in cols}
+    results = _map_jobs(executor, _quantile_job, [data[col].to_numpy() for col in cols],
+                        [filters[col].to_numpy() == 1 for col in cols], [config[col] for col in cols])
+    for col, (is_out, down_limit, up_limit) in zip(cols, results):
         print("Quantile filter cut values: ", down_limit, up_limit)
-        # data.loc[f_inds, f'{col}_quantilefilter'] = ((data.loc[f_inds, col] <= up_limit) & (data.loc[f_inds, col] >= down_limit)).astype(int)
-        data.loc[data[col] > up_limit, f'{col}_quantilefilter'] = 0
-        data.loc[data[col] < down_limit, f'{col}_quantilefilter'] = 0
-        
-        # print(col, (data.loc[f_inds, col] < down_limit).sum(), (data.loc[f_inds, col] > up_limit).sum(), len(data.loc[f_inds, col].index), ((data.loc[f_inds, col] < up_limit) & (data.loc[f_inds, col] > down_limit)).astype(int).sum())
-        # print(filter.sum(), data[f'{col}_quantilefilter'].sum(), filter.sum() - data[f'{col}_quantilefilter'].sum())
+        filters[col].loc[is_out] = 0
+        _save_filter(filters_db, col, f"{col}_quantilefilter", filters[col])
     ff_logger.info(f"quantile_filter applied with the next config: \n {config}  \n")
     return data, filters_db
 
 
-def mad_hampel_filter(data_in, filters_db_in, config):
+def _bf_mad_hampel_job(data: pd.DataFrame, col, z, window_size) -> pd.Series:
+    outdata = bf.apply_hampel_after_mad(data, [col], z=z, window_size=window_size)
+    return outdata[f'{col}_filtered'].astype(int)
+
+
+def mad_hampel_filter(data_in, filters_db_in, config, inplace=False, executor=None):
     # TODO 2 why vpd_1_1_1 madhampel is different in single line 5299 for Lga 2023
     #  0.9.4 colab vs 0.9.5 local? seems also occured previously E: send data
     if len(config) == 0:
         return data_in, filters_db_in
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
-    
-    for col, lconfig in config.items():
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
+    cols = []
+    for col in config:
         if col not in data.columns:
             print(f"No column with name {col}, skipping...")
             continue
-        
-        hampel_window = lconfig['hampel_window']
-        z = lconfig['z']
-        filter = get_column_filter(data, filters_db, col)
-        if len(filter) == 0:
-            filter = [1] * len(data.index)
-        
-        if f"{col}_madhampel" not in filters_db[col]:
-            filters_db[col].append(f"{col}_madhampel")
-        else:
-            print("filter already exist but will be overwritten")
-        
-        data[f"{col}_madhampel"] = filter
-        
-        # hampel_window = 20
-        print(f"Processing {col}")
-        outdata = bf.apply_hampel_after_mad(data.loc[data[f'{col}_madhampel'] == 1, :], [col], z=z,
-                                            window_size=hampel_window)
-        data.loc[data[f'{col}_madhampel'] == 1, f'{col}_madhampel'] = outdata[f'{col}_filtered'].astype(int)
-        data[f"{col}_madhampel"] = data[f"{col}_madhampel"].astype(int)
-    
+        cols.append(col)
+    
+    print(f"Processing {cols}")
+    filters = {col: _start_filter(data, filters_db, col) for col in cols}
+    cols_passed = _map_jobs(
+        executor, _bf_mad_hampel_job, [data.loc[filters[col] == 1, :] for col in cols], cols,
+        [config[col]['z'] for col in cols], [config[col]['hampel_window'] for col in cols]
+    )
+    for col, passed in zip(cols, cols_passed):
+        # by index as in data.loc[..., f'{col}_madhampel'] = outdata[f'{col}_filtered']
+        filters[col].loc[passed.index] = passed
+    
+    for col in config:
+        if col in filters:
+            _save_filter(filters_db, col, f"{col}_madhampel", filters[col])
     ff_logger.info(f"mad_hampel_filter applied with the next config: \n {config}  \n")
     return data, filters_db
 
 
-def manual_filter(data_in, filters_db_in, col_name, man_range, value, manual_config):
+def manual_filter(data_in, filters_db_in, col_name, man_range, value, manual_config, inplace=False):
     # TODO QE 2 function args were duplicated (compare to 0.9.5 vs 1.0.0), check if man_range arg works same way
     
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
-    filter = get_column_filter(data, filters_db, col_name)
-    if len(filter) == 0:
-        filter = [1] * len(data.index)
-    data[f"{col_name}_manualFilter"] = filter
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
+    filter = _start_filter(data, filters_db, col_name)
     # if range not in data.index:
     #   print('WARNING date range is not in index! Nothing is changed!')
     #   return data, filters_db
@@ -548,22 +511,18 @@ def manual_filter(data_in, filters_db_in, col_name, man_range, value, manual_con
             print(f"Actual manual stop: {dt_start}")
         
         range_ = pd.date_range(dt_start, dt_stop, freq=data.index.freq)
-        data.loc[range_, f"{col_name}_manualFilter"] = value
+        filter.loc[range_] = value
     except KeyError:
         print("ERROR! Check the date range!")
         return data, filters_db
     
-    if f"{col_name}_manualFilter" not in filters_db[col_name]:
-        filters_db[col_name].append(f"{col_name}_manualFilter")
-    else:
-        print("filter already exist but will be overwritten")
+    _save_filter(filters_db, col_name, f"{col_name}_manualFilter", filter)
     ff_logger.info(f"manual_filter applied with the next config: \n {manual_config}  \n")
     return data, filters_db
 
 
-def winter_filter(data_in, filters_db_in, cfg_meteo, date_ranges):
-    data = data_in.copy()
-    filters_db = filters_db_in.copy()
+def winter_filter(data_in, filters_db_in, cfg_meteo, date_ranges, inplace=False):
+    data, filters_db = _copy_inputs(data_in, filters_db_in, inplace)
     if ('winter_nee_limits' not in cfg_meteo.keys()) and ('winter_ch4_flux_limits' not in cfg_meteo.keys()):
         return data, filters_db
     
@@ -576,10 +535,7 @@ def winter_filter(data_in, filters_db_in, cfg_meteo, date_ranges):
                 print(f"No column with name {col}, skipping...")
                 continue
             
-            filter = get_column_filter(data, filters_db, col)
-            if len(filter) == 0:
-                filter = [1] * len(data.index)
-            data[f"{col}_winterFilter"] = filter
+            filter = _start_filter(data, filters_db, col)
             try:
                 for start, stop in date_ranges:
                     dt_start = pd.to_datetime(start, dayfirst=True)
@@ -606,18 +562,15 @@ def winter_filter(data_in, filters_db_in, cfg_meteo, date_ranges):
                     
                     range = pd.date_range(dt_start, dt_stop, freq=data.index.freq)
                     
-                    inds_down = data.loc[range].query(f"{col}<{cfg_meteo['winter_nee_limits'][0]}").index
-                    inds_up = data.loc[range].query(f"{col}>{cfg_meteo['winter_nee_limits'][1]}").index
-                    data.loc[inds_up, f"{col}_winterFilter"] = 0
-                    data.loc[inds_down, f"{col}_winterFilter"] = 0
+                    range_pos = _index_positions(data.index, range)
+                    values = data[col].to_numpy()[range_pos]
+                    is_out = (values < cfg_meteo['winter_nee_limits'][0]) | (values > cfg_meteo['winter_nee_limits'][1])
+                    filter.iloc[range_pos[is_out]] = 0
             except KeyError:
                 print("ERROR! Check the date range!")
                 return data, filters_db
             
-            if f"{col}_winterFilter" not in filters_db[col]:
-                filters_db[col].append(f"{col}_winterFilter")
-            else:
-                print("filter already exist but will be overwritten")
+            _save_filter(filters_db, col, f"{col}_winterFilter", filter)
     
     if 'winter_ch4_flux_limits' in cfg_meteo.keys():
         for col in ['ch4_flux']:
@@ -625,10 +578,7 @@ def winter_filter(data_in, filters_db_in, cfg_meteo, date_ranges):
                 print(f"No column with name {col}, skipping...")
                 continue
             
-            filter = get_column_filter(data, filters_db, col)
-            if len(filter) == 0:
-                filter = [1] * len(data.index)
-            data[f"{col}_winterFilter"] = filter
+            filter = _start_filter(data, filters_db, col)
             try:
                 for start, stop in date_ranges:
                     
@@ -656,18 +606,15 @@ def winter_filter(data_in, filters_db_in, cfg_meteo, date_ranges):
                     
                     range = pd.date_range(dt_start, dt_stop, freq=data.index.freq)
                     
-                    inds_down = data.loc[range].query(f"{col}<{cfg_meteo['winter_ch4_flux_limits'][0]}").index
-                    inds_up = data.loc[range].query(f"{col}>{cfg_meteo['winter_ch4_flux_limits'][1]}").index
-                    data.loc[inds_up, f"{col}_winterFilter"] = 0
-                    data.loc[inds_down, f"{col}_winterFilter"] = 0
+                    range_pos = _index_positions(data.index, range)
+                    values = data[col].to_numpy()[range_pos]
+                    is_out = (values < cfg_meteo['winter_ch4_flux_limits'][0]) | (values > cfg_meteo['winter_ch4_flux_limits'][1])
+                    filter.iloc[range_pos[is_out]] = 0
             except KeyError:
                 print("ERROR! Check the date range!")
                 return data, filters_db
             
-            if f"{col}_winterFilter" not in filters_db[col]:
-                filters_db[col].append(f"{col}_winterFilter")
-            else:
-                print("filter already exist but will be overwritten")
+            _save_filter(filters_db, col, f"{col}_winterFilter", filter)
     
     ff_logger.info(f"winter_filter applied with the next config: \n {cfg_meteo}  \n Date range: {date_ranges} \n")
     return data, filters_db
@@ -1,4 +1,4 @@
-from IPython import get_ipython
+import sys
 
 
 # DONE log remove if logger worked
@@ -15,7 +15,9 @@ class EnvDetect:
             self.COLAB = True
         
         self.LOCAL = not self.COLAB
-        self.IPYNB: bool = get_ipython()
+        # IPython kernel has it already imported, plain python runs (cli, batch) must not pay for the import
+        ipython = sys.modules.get('IPython')
+        self.IPYNB: bool = ipython.get_ipython() if ipython else None
 
 
 ENV = EnvDetect()
@@ -1,3 +1,7 @@
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
 import numpy as np
 import pandas as pd
 import numpy.typing as npt
@@ -70,3 +74,59 @@ def find_changed_el(arr: npt.NDArray, from_end=False):
     else:
         res = diff[-1] - 1 if len(diff) > 0 else -1
     return int(res)
+
+
+# csv.QUOTE_MINIMAL quotes fields with these
+CSV_QUOTED_CHARS = [',', '"', '\n', '\r']
+CSV_WRITE_ROWS = 20_000
+
+
+def format_csv_column(values: np.ndarray) -> np.ndarray | None:
+    """ 
+    Object array of strings written by to_csv for the column, float64 are formatted once per unique value.
+    None if to_csv output may be different: quoted fields or dtypes with special formatting.
+    """
+    if values.dtype == np.float64:
+        # repr is same as numpy astype(str) used by to_csv, but faster
+        uniques, inverse = np.unique(values, return_inverse=True)
+        res = np.array([repr(value) for value in uniques.tolist()], dtype=object)[inverse]
+        # unique does not separate 0.0 and -0.0
+        is_zero = values == 0
+        res[is_zero] = np.where(np.signbit(values[is_zero]), '-0.0', '0.0')
+        res[np.isnan(values)] = ''
+        return res
+    elif values.dtype.kind in 'fiub':
+        return values.astype(str).astype(object)
+    elif values.dtype.kind == 'O':
+        res = np.array(['' if pd.isna(value) else str(value) for value in values], dtype=object)
+        text = ''.join(res)
+        if any(char in text for char in CSV_QUOTED_CHARS):
+            return None
+        return res
+    return None
+
+
+def format_csv(df: pd.DataFrame) -> SimpleNamespace | None:
+    """ 
+    SimpleNamespace(header: list[str], cols: list of object arrays) same as df.to_csv(index=False) writes.
+    None if not supported, use to_csv.
+    """
+    header = [str(col) for col in df.columns]
+    cols = [format_csv_column(df.iloc[:, i].to_numpy()) if isinstance(dtype, np.dtype) else None
+            for i, dtype in enumerate(df.dtypes)]
+    # single field rows have quoted empty strings
+    if len(cols) < 2 or any(col is None for col in cols) or \
+            any(char in col for col in header for char in CSV_QUOTED_CHARS):
+        return None
+    return SimpleNamespace(header=header, cols=cols)
+
+
+def write_csv(fpath: Path, csv: SimpleNamespace, rows: npt.NDArray = None):
+    """ csv: format_csv result, rows: positions of rows to write, None for all """
+    cols = csv.cols if rows is None else [col[rows] for col in csv.cols]
+    with open(fpath, 'w', newline='', encoding='utf-8') as f:
+        f.write(','.join(csv.header) + os.linesep)
+        for start in range(0, len(cols[0]), CSV_WRITE_ROWS):
+            lines = zip(*[col[start: start + CSV_WRITE_ROWS] for col in cols])
+            f.write(os.linesep.join(map(','.join, lines)) + os.linesep)
+
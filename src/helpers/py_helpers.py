@@ -73,3 +73,9 @@ def is_protected_method(name):
     return name.startswith("_")
 
 
+def is_number(el) -> bool:
+    try:
+        float(el)
+        return True
+    except (TypeError, ValueError):
+        return False
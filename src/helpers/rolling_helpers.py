@@ -0,0 +1,51 @@
+"""
+Centered rolling std for 2D arrays (rows - time, columns - variables) with nan and inf skipping,
+computed with cumulative sums in a single pass for all the columns.
+Same windows and min_periods rules as pd.Series.rolling(window, center=True, min_periods, closed).
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+
+def _window_sizes(window: int, closed: str):
+    # pandas centered window of row i is [i - window // 2, i + (window - 1) // 2], closed='both' adds 1 row on the left
+    return window // 2 + (1 if closed == 'both' else 0), (window - 1) // 2
+
+
+def _window_sums(values: np.ndarray, left: int, right: int) -> np.ndarray:
+    """ Sums over [i - left, i + right] rows, out of range rows are zeros """
+    n = len(values)
+    cumsum = np.zeros((n + left + right + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=cumsum[left + 1:left + 1 + n])
+    cumsum[left + 1 + n:] = cumsum[left + n]
+    return cumsum[left + right + 1:] - cumsum[:n]
+
+
+def _prepare(values: npt.ArrayLike):
+    values = np.asarray(values, dtype=float)
+    is_1d = values.ndim == 1
+    values = values.reshape(len(values), -1)
+    # inf is skipped as by pandas rolling, and must not get into the cumulative sums
+    is_valid = np.isfinite(values)
+    filled = np.where(is_valid, values, 0.)
+    counts = is_valid.astype(float)
+    # shift by column mean: sums of smaller numbers lose less precision
+    offset = filled.sum(axis=0) / np.maximum(counts.sum(axis=0), 1)
+    filled -= offset
+    filled *= counts
+    return filled, counts, offset, is_1d
+
+
+def rolling_std(values: npt.ArrayLike, window: int, min_periods: int, closed='right') -> np.ndarray:
+    """ Sample std (ddof=1) """
+    centered, counts, offset, is_1d = _prepare(values)
+    left, right = _window_sizes(window, closed)
+    n_obs = _window_sums(counts, left, right)
+    sums = _window_sums(centered, left, right)
+    sq_sums = _window_sums(centered ** 2, left, right)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = (sq_sums - sums ** 2 / n_obs) / (n_obs - 1)
+    res = np.sqrt(np.clip(var, 0, None))
+    res[(n_obs < max(min_periods, 2))] = np.nan
+    return res[:, 0] if is_1d else res
@@ -0,0 +1,122 @@
+"""
+Validates many IAS files in parallel, same checks as on IAS import (check_ias_file):
+    python -m src.ias_batch_check ias_dir --out-dir ias_check_output --workers 4
+All csv, xls, xlsx files in ias_dir and its subfolders are checked.
+Per file report is out_dir/<relative file path>.json: errors count and all check messages with levels and file lines,
+per file status, errors and warnings counts are in out_dir/ias_check_summary.csv
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from src.data_io.ias_data_check import check_ias_file, IasCheckMode, set_lang, logger as ias_logger
+from src.ff_logger import init_logging, ff_logger
+
+SUMMARY_FNAME = 'ias_check_summary.csv'
+IAS_FILE_EXTS = ['.csv', '.xls', '.xlsx']
+
+
+class RecordsHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.INFO)
+        self.records = []
+
+    def emit(self, record: logging.LogRecord):
+        self.records += [{'level': record.levelname, 'message': record.getMessage(),
+                          'lines': getattr(record, 'lines', [])}]
+
+
+def find_ias_files(ias_dir: Path) -> list[Path]:
+    return sorted(fpath for fpath in Path(ias_dir).rglob('*') if fpath.suffix.lower() in IAS_FILE_EXTS)
+
+
+def check_file_job(fpath: Path, report_fpath: Path, mode: IasCheckMode, lang: str) -> SimpleNamespace:
+    """ Runs in a worker process, collects messages of ias_data_check logger only during this file check """
+    start = time.perf_counter()
+    set_lang(lang)
+    handler = RecordsHandler()
+    ias_logger.addHandler(handler)
+    ias_logger.propagate = False
+
+    status, errors, error = 'ok', np.nan, ''
+    try:
+        errors = int(check_ias_file(fpath, mode))
+        # some checks log an error, but do not count it (i.e. not enough columns)
+        has_error_logs = any(rec['level'] == 'ERROR' for rec in handler.records)
+        status = 'ok' if errors == 0 and not has_error_logs else 'invalid'
+    except Exception as e:
+        status, error = 'failed', f'{type(e).__name__}: {e}'
+    finally:
+        ias_logger.removeHandler(handler)
+
+    report_fpath.parent.mkdir(parents=True, exist_ok=True)
+    report = {'file': str(fpath), 'mode': mode.value, 'status': status, 'errors': None if status == 'failed' else errors,
+              'error': error, 'messages': handler.records}
+    report_fpath.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding='utf-8')
+
+    warnings = sum(rec['level'] == 'WARNING' for rec in handler.records)
+    return SimpleNamespace(file=str(fpath), status=status, errors=errors, warnings=warnings,
+                           wall_time=time.perf_counter() - start, error=error, report=str(report_fpath))
+
+
+def run_ias_batch_check(ias_dir: Path, out_dir: Path, max_workers: int = None, mode=IasCheckMode.IMPORT,
+                        lang='en') -> pd.DataFrame:
+    ias_dir, out_dir = Path(ias_dir), Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    fpaths = find_ias_files(ias_dir)
+    ff_logger.info(f'Checking {len(fpaths)} IAS files in {ias_dir}')
+
+    results = []
+    # workers are reused: check state is only the logger handler, which is removed after each file
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = {}
+        for fpath in fpaths:
+            report_fpath = out_dir / fpath.relative_to(ias_dir).with_name(fpath.name + '.json')
+            futures[executor.submit(check_file_job, fpath, report_fpath, mode, lang)] = (fpath, report_fpath)
+        for future in as_completed(futures):
+            fpath, report_fpath = futures[future]
+            try:
+                res = future.result()
+            except Exception as e:
+                # worker process died, file had no chance to report
+                res = SimpleNamespace(file=str(fpath), status='crashed', errors=np.nan, warnings=np.nan,
+                                      wall_time=np.nan, error=f'{type(e).__name__}: {e}', report=str(report_fpath))
+            ff_logger.info(f'File {res.file}: {res.status}, {res.errors} errors')
+            results += [vars(res)]
+
+    summary = pd.DataFrame(results, columns=['file', 'status', 'errors', 'warnings', 'wall_time', 'error', 'report'])
+    summary = summary.sort_values('file', ignore_index=True)
+    summary.to_csv(out_dir / SUMMARY_FNAME, index=False)
+    ff_logger.info(f'IAS check summary saved to {out_dir / SUMMARY_FNAME}: \n'
+                   f'{summary["status"].value_counts().to_string()}')
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('ias_dir', type=Path)
+    parser.add_argument('--out-dir', type=Path, default=Path('ias_check_output'))
+    parser.add_argument('--workers', type=int, default=None, help='default is the number of CPUs')
+    parser.add_argument('--strict', action='store_true', help='columns with only -9999 values are errors, not warnings')
+    parser.add_argument('--lang', default='en', choices=['en', 'ru'])
+    args = parser.parse_args()
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    init_logging(level=logging.INFO, fpath=args.out_dir / 'ias_check_log.log', to_stdout=True)
+    summary = run_ias_batch_check(args.ias_dir, args.out_dir, args.workers,
+                                  mode=IasCheckMode.STRICT if args.strict else IasCheckMode.IMPORT, lang=args.lang)
+    sys.exit(0 if (summary['status'] == 'ok').all() else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,24 +7,8 @@ from plotly import graph_objects as go, express as px
 from plotly.subplots import make_subplots
 
 from bglabutils import basic as bg
-
-
-def colapse_filters(data, filters_db_in):
-    out_filter = {}
-    for feature, filters in filters_db_in.items():
-        if len(filters) > 0:
-            out_filter[feature] = data[filters[0]].astype(int) if len(filters) == 1 else np.logical_and.reduce(
-                (data[filters].astype(int)), axis=1).astype(int)
-    return out_filter
-
-
-def get_column_filter(data, filters_db_in, column_name):
-    if column_name not in filters_db_in.keys():
-        return np.array([1] * len(data.index))
-    if len(filters_db_in[column_name]) > 0:
-        return colapse_filters(data, filters_db_in)[column_name]
-    else:
-        return np.array([1] * len(data.index))
+# filter helpers are kept importable from here for the notebooks
+from src.filter_store import colapse_filters, get_column_filter  # noqa: F401
 
 
 def basic_plot(data,
@@ -134,8 +118,14 @@ def plot_nice_year_hist_plotly(df, to_plot, time_col, filters_db):
     fig.show(config=fig_config)
 
 
+def _get_filter_mask(data, filters_db, col, filter_name) -> np.ndarray:
+    if isinstance(filters_db, FilterStore):
+        return filters_db.get_mask(col, filter_name)
+    return data[filter_name].to_numpy()
+
+
 def make_filtered_plot(data_pl, col, col2plot, ias_output_prefix, filters_db):
-    data = data_pl.copy()
+    data = data_pl
     layout = go.Layout(
         paper_bgcolor='rgba(0,0,0,0)',
         plot_bgcolor='rgba(0,0,0,0)'
@@ -146,24 +136,26 @@ def make_filtered_plot(data_pl, col, col2plot, ias_output_prefix, filters_db):
                      minor_tickcolor='Grey')
     fig.update_yaxes(showline=True, linewidth=2, linecolor='black', gridcolor='Grey')
     
-    data['full_filter'] = get_column_filter(data, filters_db, col)
-    data['full_filter'] = data['full_filter'].astype(int)
-    pl_data = data.query(f"full_filter==0")
+    full_filter = np.asarray(get_column_filter(data, filters_db, col)).astype(int)
+    values = data[col]
+    # rows not yet attributed to any filter
+    pl_rows = full_filter == 0
     color_ind = 0
     fig.add_trace(go.Scattergl(
-        x=data.query("full_filter==1").index, y=data.query("full_filter==1")[col],
+        x=data.index[full_filter == 1], y=values[full_filter == 1],
         mode='markers', name="Good data", marker_color=add_color_dot[color_ind]
     ))
     color_ind += 1
     
     if len(filters_db[col]) > 0:
         for filter_name in filters_db[col]:
+            filter = _get_filter_mask(data, filters_db, col, filter_name)
             fig.add_trace(go.Scattergl(
-                x=pl_data.query(f"{filter_name}==0").index, y=pl_data.query(f"{filter_name}==0")[col],
+                x=data.index[pl_rows & (filter == 0)], y=values[pl_rows & (filter == 0)],
                 mode='markers', name=filter_name, marker_color=add_color_dot[color_ind]
             ))
             color_ind += 1
-            pl_data = pl_data.query(f"{filter_name}==1")
+            pl_rows = pl_rows & (filter == 1)
     
     fig.update_layout(
         title=f'{col2plot}',
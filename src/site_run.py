@@ -0,0 +1,124 @@
+"""
+Headless run of FluxFilter.py steps for a single site: import -> filters -> exports -> REddyProc.
+No ipynb widgets and no plots unless asked (plotly is not even imported), all the outputs are written only to out_dir.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+from src.config.ff_config import FFConfig, FFGlobals
+from src.data_io.data_import import import_data
+from src.data_io.detect_import import try_auto_detect_input_files
+from src.data_io.fat_export import export_fat, FAT_OUTPUT_TEMPLATE
+from src.data_io.ias_io import export_ias
+from src.data_io.rep_level3_export import export_rep_level3, REP_LEVEL3_OUTPUT_TEMPLATE
+from src.data_io.results_export import apply_filters, export_output_all, export_output_summary
+from src.data_prepare import normalize_columns, check_data_types, prepare_meteo_columns, filter_co2_strg, calc_nee, \
+    split_pass_through, join_pass_through
+from src.ff_logger import ff_logger
+from src.filter_pipeline import FilterPipeline
+from src.helpers.env_helpers import setup_r_env
+from src.helpers.io_helpers import ensure_empty_dir
+
+REPO_DIR = Path(__file__).parents[1]
+DEFAULT_CONFIG_FPATH = REPO_DIR / 'misc/config_v1.0.4_default.yaml'
+CONFIG_VERSION = '1.0.4'
+
+
+def load_site_config(config_fpath: Path | None, input_dir: Path) -> FFConfig:
+    """ Default config if config_fpath is None; relative input files are relative to input_dir, not to cwd """
+    config = FFConfig.load_or_init(load_path=config_fpath or DEFAULT_CONFIG_FPATH, default_fpath=DEFAULT_CONFIG_FPATH,
+                                   init_debug=False, init_version=CONFIG_VERSION)
+    input_files = config.data_import.input_files
+    if type(input_files) is dict:
+        config.data_import.input_files = {input_dir / fpath: ftype for fpath, ftype in input_files.items()}
+    elif type(input_files) is list or (type(input_files) is str and input_files != 'auto'):
+        config.data_import.input_files = [input_dir / fpath for fpath in ([input_files] if type(input_files) is str
+                                                                         else input_files)]
+    return config
+
+
+def run_reddyproc(config: FFConfig, gl: FFGlobals):
+    """ REddyProc R package is expected to be already installed (FluxFilter.py installs it on Colab) """
+    setup_r_env()
+    from src.reddyproc.reddyproc_bridge import reddyproc_and_postprocess
+    from src.reddyproc.preprocess_rg import prepare_rg
+
+    config.reddyproc.site_id = config.metadata.site_name
+    config.reddyproc.input_file = str(gl.rep_level3_fpath)
+    config.reddyproc.output_dir = str(gl.out_dir / 'reddyproc')
+
+    prepare_rg(config.reddyproc)
+    ensure_empty_dir(config.reddyproc.output_dir)
+    gl.rep_out_info, config.reddyproc = reddyproc_and_postprocess(config.reddyproc, gl.repo_dir)
+
+
+def save_plots(plot_data: pd.DataFrame, filters_db, time_col: str, site_name: str, out_dir: Path):
+    """ Same plots as FluxFilter.py shows, saved as png to out_dir/local/plots """
+    from src.ipynb_routines import setup_plotly
+    from src.plots import make_filtered_plot, plot_nice_year_hist_plotly
+
+    setup_plotly(out_dir)
+    for col in ['nee', 'le', 'h']:
+        if col not in plot_data.columns:
+            continue
+        make_filtered_plot(plot_data, col, col, site_name, filters_db)
+        plot_nice_year_hist_plotly(plot_data, col, time_col, filters_db)
+
+
+def run_site(input_dir: Path, out_dir: Path, config_fpath: Path = None, with_reddyproc=True,
+             executor=None, plots=False) -> FFGlobals:
+    """
+    out_dir is expected to exist and to be empty (and logging to be set up), files are overwritten.
+    executor: concurrent.futures executor for the per column filters, see FilterPipeline.
+    plots: save filtered plots, imports plotly and IPython.
+    """
+    gl = FFGlobals(out_dir=Path(out_dir), input_dir=Path(input_dir), repo_dir=REPO_DIR)
+    config = load_site_config(config_fpath, gl.input_dir)
+
+    res = try_auto_detect_input_files(config, gl)
+    (config.data_import.input_files, config.data_import.import_mode,
+     config.metadata.site_name, config.data_export.ias.out_fname_ver_suffix, config.calc.has_meteo) = res
+    data, time_col, meteo_cols, data_freq, config.calc.has_meteo = import_data(config)
+    gl.points_per_day = int(pd.Timedelta('24h') / data_freq)
+
+    data = normalize_columns(data, config.calc.has_meteo)
+    if check_data_types(data, meteo_cols):
+        raise ValueError('Data have some errors! Please check log file!')
+    data = prepare_meteo_columns(data, config.calc.has_meteo)
+    data, pass_through = split_pass_through(data, time_col, config.filters)
+    df_ias_export = data.copy()
+
+    if config.calc.calc_nee and 'co2_strg' in data.columns:
+        tmp_data, _ = filter_co2_strg(data, config.filters.quantile)
+        data = calc_nee(data, tmp_data, config.calc.calc_with_strg)
+        del tmp_data
+
+    pipeline = FilterPipeline.from_config(config.filters, has_meteo=config.calc.has_meteo, executor=executor)
+    plot_data, filters_db = pipeline(data)
+    if plots:
+        save_plots(plot_data, filters_db, time_col, config.metadata.site_name, gl.out_dir)
+
+    gl.rep_level3_fpath = gl.out_dir / f"REddyProc_{config.metadata.site_name}_{int(plot_data[time_col].dt.year.median())}.txt"
+    export_rep_level3(gl.rep_level3_fpath, apply_filters(plot_data, filters_db), time_col,
+                      REP_LEVEL3_OUTPUT_TEMPLATE, config, gl.points_per_day)
+
+    if config.calc.has_meteo:
+        swin_vals = data['swin_1_1_1'] if 'swin_1_1_1' in data.columns else None
+        export_ias(gl.out_dir, config.metadata.site_name, config.data_export.ias.out_fname_ver_suffix,
+                   config.data_export.ias.split_intervals, join_pass_through(df_ias_export, pass_through),
+                   time_col=time_col, swin_vals=swin_vals)
+        # export_fat drops missing columns from the template
+        export_fat(apply_filters(plot_data, filters_db), FAT_OUTPUT_TEMPLATE.copy(), time_col, gl, config)
+
+    export_output_all(gl.out_dir / 'output_all.csv', join_pass_through(plot_data, pass_through), filters_db, time_col)
+    export_output_summary(gl.out_dir / 'output_summary.csv', plot_data, filters_db, time_col, gl.points_per_day,
+                          config.calc.has_meteo)
+
+    if with_reddyproc:
+        run_reddyproc(config, gl)
+
+    FFConfig.save(config, gl.out_dir / f'config_{config.metadata.site_name}.yaml', add_comments=True)
+    ff_logger.info(f'Site {config.metadata.site_name} is processed, outputs are in {gl.out_dir}')
+    return gl
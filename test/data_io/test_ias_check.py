@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.config.ff_config import IASImportConfig
+from src.data_io import ias_data_check, ias_io
+from src.data_io.ias_data_check import set_lang
+
+
+def write_ias(fpath, year=2023, seed=0):
+    index = pd.date_range(f'{year}-01-01', f'{year}-12-31 23:30', freq='30min')
+    rng = np.random.default_rng(seed)
+    n = len(index)
+    df = pd.DataFrame({'TIMESTAMP_START': index.strftime('%Y%m%d%H%M').astype(int),
+                       'TIMESTAMP_END': (index + pd.Timedelta('30min')).strftime('%Y%m%d%H%M').astype(int),
+                       'DTime': (index.dayofyear + index.hour / 24 + index.minute / 1440).round(5),
+                       'FC_1_1_1': rng.normal(0, 5, n).round(3), 'TA_1_1_1': rng.normal(10, 5, n).round(2),
+                       'FC_SSITC_TEST_1_1_1': rng.choice([0, 1, 2], n)})
+    df.loc[[5, 7], 'FC_1_1_1'] = -9999
+    df.to_csv(fpath, index=False)
+    return df
+
+
+def test_import_ias_single_read(tmp_path, monkeypatch):
+    set_lang('ru')
+    fpath = tmp_path / 'ias_2023.csv'
+    src = write_ias(fpath)
+    cfg = IASImportConfig(repair_time=True, missing_data_codes=[-9999], datetime_col='TIMESTAMP_START',
+                          try_datetime_formats='%Y%m%d%H%M', skip_validation=False)
+    
+    loads = []
+    for module in [ias_io, ias_data_check]:
+        load = module.load_table_logged
+        monkeypatch.setattr(module, 'load_table_logged', lambda *args, load=load, **kwargs: loads.append(1) or load(*args, **kwargs))
+    df = ias_io.import_ias(fpath, 'datetime', cfg, skip_validation=False, debug=False)
+    assert len(loads) == 1
+    assert df['datetime'].equals(pd.Series(pd.to_datetime(src['TIMESTAMP_START'], format='%Y%m%d%H%M').values,
+                                           index=df.index, name='datetime'))
+    assert df['co2_flux'].isna().sum() == 2 and df.index.freq == '30min'
+    
+    src.loc[100, 'TIMESTAMP_START'] = src.loc[99, 'TIMESTAMP_START']
+    src.to_csv(fpath, index=False)
+    with pytest.raises(Exception, match='cannot be used yet'):
+        ias_io.import_ias(fpath, 'datetime', cfg, skip_validation=False, debug=False)
+
+
+def test_check_ias_data(tmp_path, caplog):
+    set_lang('en')
+    data = write_ias(tmp_path / 'ias_2023.csv')
+    data['EMPTY_1_1_1'] = np.nan
+    data['H_1_1_1'] = -9999
+    data.loc[3, 'TA_1_1_1'] = np.inf
+    data['FC_1_1_1'] = data['FC_1_1_1'].astype(object)
+    data.loc[10, 'FC_1_1_1'] = 'bad'
+    data.loc[[100, 101], 'TIMESTAMP_START'] = data.loc[99, 'TIMESTAMP_START']
+    
+    with caplog.at_level('INFO', logger='src.data_io.ias_data_check'):
+        errors, timestamps = ias_data_check.check_ias_data(data, ias_data_check.IasCheckMode.IMPORT)
+    # empty, inf on raw and numeric values, text, duplicate and skipped final time check
+    assert errors == 1 + 2 + 1 + 2
+    assert timestamps['TIMESTAMP_START'].iloc[100] == pd.Timestamp('2023-01-03 01:30')
+    messages = [rec.getMessage() for rec in caplog.records]
+    assert 'The column EMPTY_1_1_1 is empty.' in messages
+    assert 'The column H_1_1_1 has only -9999 values.' in messages
+    assert messages.count('INF val in TA_1_1_1 at the position [3]') == 2
+    assert 'Non numerical values in FC_1_1_1 at lines [12]' in messages
+    assert 'Duplicated timestamps! check lines:[102 103]' in messages
+    assert 'FC_1_1_1' in data and 'TIMESTAMP_START_datetime' not in data
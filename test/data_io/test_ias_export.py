@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from src.config.config_types import IasExportIntervals
+from src.data_io.ias_io import export_ias
+
+
+def test_export_ias_months(tmp_path):
+    index = pd.date_range('2023-01-15', '2023-04-10', freq='30min')
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'time': index, 'co2_flux': rng.normal(0, 5, len(index)).round(3),
+                       'qc_co2_flux': rng.integers(0, 3, len(index)), 'le': rng.normal(50, 20, len(index))}, index=index)
+    df.loc[df.index[::10], 'co2_flux'] = np.nan
+    export_ias(tmp_path, 'site', 'v1', IasExportIntervals.MONTH, df.copy(), 'time', None)
+
+    fnames = sorted(fpath.name for fpath in tmp_path.glob('*.csv'))
+    assert fnames == [f'site_{month:02d}.2023_v1.csv' for month in [1, 2, 3, 4]]
+    files = {fname: pd.read_csv(tmp_path / fname) for fname in fnames}
+    for fname, ias in files.items():
+        assert ias.columns.to_list()[:4] == ['TIMESTAMP_START', 'TIMESTAMP_END', 'DTime', 'FC_1_1_1']
+        assert (ias['TIMESTAMP_START'] // 10 ** 6 % 100 == int(fname[5:7])).all()
+
+    # months are extended to full months, no rows lost or repeated
+    ias = pd.concat(files.values(), ignore_index=True)
+    times = pd.to_datetime(ias['TIMESTAMP_START'].astype(str), format='%Y%m%d%H%M')
+    assert (times.to_numpy() == pd.date_range('2023-01-01', '2023-04-30 23:00', freq='30min')).all()
+    fc = ias.set_index(times)['FC_1_1_1']
+    assert (fc[df.index[::10]] == -9999).all() and (fc[:'2023-01-14'] == -9999).all()
+    assert np.allclose(fc[df.index[1::10]], df['co2_flux'].iloc[1::10])
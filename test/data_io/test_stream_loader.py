@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_io.stream_loader import stream_time_series, date_time_chunk_parser
+from src.data_io.time_series_loader import cleanup_df
+from src.data_io.utils.table_loader import load_table_from_file
+from src.data_io.utils.time_series_utils import date_time_parser, repair_time
+
+
+def write_fo(fpath, index, seed, drop_cols=()):
+    """ eddypro full output like: section row, header, units row """
+    rng = np.random.default_rng(seed)
+    n = len(index)
+    df = pd.DataFrame({'filename': [f'f{i}.ghg' for i in range(n)], 'date': index.strftime('%Y-%m-%d'),
+                       'time': index.strftime('%H:%M'), 'DOY': index.dayofyear, 'H': rng.normal(0, 100, n).round(3),
+                       'qc_H': rng.choice([0, 1, 2], n), 'LE': rng.normal(50, 20, n).round(3),
+                       'co2_flux': rng.normal(0, 5, n).round(4)})
+    df.loc[rng.choice(n, 10), 'LE'] = -9999
+    df.loc[n // 2:, 'co2_flux'] = -9999
+    units = ['[#]', '[yyyy-mm-dd]', '[HH:MM]', '[ddd.ddd]', '[W+1m-2]', '[#]', '[W+1m-2]', '[µmol+1s-1m-2]']
+    units = [u for col, u in zip(df.columns, units) if col not in drop_cols]
+    df = df.drop(columns=list(drop_cols))
+    with open(fpath, 'w') as f:
+        f.write('file_info,,,,corrected_fluxes_and_quality_flags' + ',' * (len(df.columns) - 5) + '\n')
+        f.write(','.join(df.columns) + '\n' + ','.join(units) + '\n')
+        df.to_csv(f, index=False, header=False)
+
+
+def load_full(fpaths, time_col):
+    dfs = []
+    for fpath in fpaths:
+        df = cleanup_df(load_table_from_file(fpath, header_row=1, skiprows=[2]), [-9999])
+        df[time_col] = date_time_parser(df, 'time', ['%H:%M', '%H:%M:%S'], 'date', ['%Y-%m-%d', '%d.%m.%Y'])
+        dfs += [df]
+    return repair_time(pd.concat(dfs, ignore_index=True), time_col, fill_gaps=True)
+
+
+@pytest.mark.parametrize('gaps', [False, True])
+def test_stream_time_series(tmp_path, gaps):
+    index = pd.date_range('2023-01-01', periods=48 * 30, freq='30min')
+    fpaths = [tmp_path / 'fo_1.csv', tmp_path / 'fo_2.csv']
+    drop = [100, 101, 900] if gaps else []
+    write_fo(fpaths[0], index[:700], seed=0)
+    write_fo(fpaths[1], index[700:].delete([i - 700 for i in drop if i >= 700]), seed=1)
+    if gaps:
+        fpaths[0].write_text('\n'.join(l for i, l in enumerate(fpaths[0].read_text().split('\n')) if i - 3 not in drop))
+
+    expected = load_full(fpaths, 'datetime')
+    parse_time = date_time_chunk_parser('time', ['%H:%M', '%H:%M:%S'], 'date', ['%Y-%m-%d', '%d.%m.%Y'])
+    df = stream_time_series(fpaths, 'datetime', ['date', 'time'], parse_time, True, [-9999], chunk_rows=128)
+
+    pd.testing.assert_frame_equal(df, expected)
+    assert df.index.freq == expected.index.freq == '30min'
+    assert (df['qc_H'].dtype == float) == gaps
+
+
+def test_stream_time_series_missing_column(tmp_path):
+    index = pd.date_range('2023-01-01', periods=48 * 10, freq='30min')
+    fpaths = [tmp_path / 'fo_1.csv', tmp_path / 'fo_2.csv']
+    write_fo(fpaths[0], index[:200], seed=0)
+    write_fo(fpaths[1], index[200:], seed=1, drop_cols=['qc_H'])
+
+    expected = load_full(fpaths, 'datetime')
+    parse_time = date_time_chunk_parser('time', ['%H:%M', '%H:%M:%S'], 'date', ['%Y-%m-%d', '%d.%m.%Y'])
+    df = stream_time_series(fpaths, 'datetime', ['date', 'time'], parse_time, True, [-9999], chunk_rows=64)
+
+    pd.testing.assert_frame_equal(df, expected)
+    assert df['qc_H'].dtype == float and df['qc_H'].iloc[200:].isna().all()
@@ -0,0 +1,89 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from src.data_io.utils.table_cache import TableCache
+
+
+def write_table(fpath, n=100):
+    index = pd.date_range('2023-01-01', periods=n, freq='30min')
+    pd.DataFrame({'time': index, 'co2_flux': np.arange(n) * 0.5, 'date_STR': index.strftime('%d.%m.%Y')}
+                 ).to_csv(fpath, index=False)
+
+
+def load_table(fpath):
+    df = pd.read_csv(fpath)
+    df['time'] = pd.to_datetime(df['time'])
+    df.index = pd.DatetimeIndex(df['time'], freq='30min')
+    return df
+
+
+def test_table_cache(tmp_path):
+    fpath = tmp_path / 'data.csv'
+    write_table(fpath)
+    cache = TableCache(tmp_path / 'cache')
+    calls = []
+
+    def load():
+        calls.append(1)
+        return load_table(fpath)
+
+    expected = cache.cached([fpath], {'time_col': 'time'}, load)
+    df = cache.cached([fpath], {'time_col': 'time'}, load)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(df, expected)
+    assert df.index.freq == expected.index.freq
+
+    cache.cached([fpath], {'time_col': 'other'}, load)
+    assert len(calls) == 2
+    # same contents, new mtime: still cached
+    os.utime(fpath)
+    cache.cached([fpath], {'time_col': 'time'}, load)
+    assert len(calls) == 2
+    write_table(fpath, n=101)
+    assert len(cache.cached([fpath], {'time_col': 'time'}, load)) == 101
+    assert len(calls) == 3
+
+    TableCache(None).cached([fpath], {'time_col': 'time'}, load)
+    assert len(calls) == 4
+
+
+def test_table_cache_evict(tmp_path):
+    cache = TableCache(tmp_path / 'cache', max_bytes=None, max_age_days=1)
+    fpaths = []
+    for n in [10, 20, 30]:
+        fpath = tmp_path / f'data_{n}.csv'
+        write_table(fpath, n)
+        fpaths += [fpath]
+        cache.cached([fpath], {}, lambda: load_table(fpath))
+    cache_fpaths = [cache.fpath(cache.key([fpath], {})) for fpath in fpaths]
+    old_time = time.time() - 2 * 24 * 60 * 60
+    os.utime(cache_fpaths[0], (old_time, old_time))
+    cache.evict()
+    assert [fpath.exists() for fpath in cache_fpaths] == [False, True, True]
+
+    cache.max_bytes = cache_fpaths[2].stat().st_size
+    cache.load(cache.key([fpaths[2]], {}))
+    cache.evict()
+    assert [fpath.exists() for fpath in cache_fpaths] == [False, False, True]
+
+
+def test_preload_time_series_params(monkeypatch):
+    from src.config.config_types import InputFileType
+    from src.config.ff_config import FFConfig, ImportConfig, MergedDateTimeFileConfig
+    from src.data_io import time_series_loader
+
+    params = []
+    monkeypatch.setattr(time_series_loader.table_cache, 'cached', lambda fpaths, p, load_func: params.append(p))
+    for codes in [[-9999], [-9999, -999]]:
+        biomet = MergedDateTimeFileConfig.model_construct(missing_data_codes=codes)
+        config = FFConfig.model_construct(data_import=ImportConfig.model_construct(eddypro_biomet=biomet))
+        time_series_loader.preload_time_series('biomet.csv', InputFileType.EDDYPRO_BIOMET, config)
+        time_series_loader.preload_time_series('data.csv', InputFileType.CSF, config)
+    # biomet options change the biomet key only
+    assert params[0] != params[2] and params[1] == params[3]
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from src.config.config_types import InputFileType
+from src.data_io.detect_import import detect_file_header, detect_known_files
+from src.data_io.time_series_loader import cleanup_df
+from src.data_io.utils.table_cache import init_table_cache
+from src.data_io.utils.table_loader import load_table_from_file, sniff_csv, map_files
+
+
+def write_csf(fpath, n=200, seed=0):
+    """ TOA5 like: file info row, header, units and aggregation rows, quoted NAN """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2023-01-01 00:30', periods=n, freq='30min')
+    fc = rng.normal(0, 5, n).round(4).astype(str)
+    fc[[3, 10]] = 'NAN'
+    le = rng.normal(50, 20, n).round(3)
+    le[[5, 6]] = -9999
+    rows = ['"TOA5","site","CR3000"', '"TIMESTAMP","RECORD","FC","LE","FC_QC","FTPRNT_EQUATION","EMPTY"',
+            '"TS","RN","umol/m^2/s","W/m^2","adimensional","",""', '"","","Avg","Avg","Smp","Smp","Smp"']
+    rows += [f'"{t:%Y-%m-%d %H:%M:%S}",{i},{"NAN" if f == "NAN" else f},{l},{i % 3},"Kljun",'
+             for i, (t, f, l) in enumerate(zip(index, fc, le))]
+    fpath.write_text('\n'.join(rows) + '\n')
+
+
+def test_load_csv_arrow(tmp_path):
+    fpath = tmp_path / 'site.csv'
+    write_csf(fpath)
+    kwargs = {'header_row': 1, 'skiprows': [2, 3]}
+    expected = cleanup_df(load_table_from_file(fpath, **kwargs), [-9999])
+    expected['FC'] = pd.to_numeric(expected['FC'], errors='coerce')
+
+    df = load_table_from_file(fpath, **kwargs, float_cols=['fc', 'le'], missing_data_codes=[-9999])
+    assert df['FC'].dtype == df['LE'].dtype == np.float64
+    assert df['TIMESTAMP'].dtype == object and df['FTPRNT_EQUATION'].dtype == object
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+    # unsupported layout: pandas reader
+    df = load_table_from_file(fpath, header_row=1, skiprows=[3], float_cols=['FC'])
+    assert df['FC'].dtype == object and df['FC'].iloc[0] == 'umol/m^2/s'
+
+
+def test_sniff_csv(tmp_path):
+    fpath = tmp_path / 'site.csv'
+    write_csf(fpath)
+    sniff = sniff_csv(fpath)
+    assert sniff.encoding == 'utf-8' and sniff.delimiter == ','
+    assert sniff.rows[1][:3] == ['TIMESTAMP', 'RECORD', 'FC'] and sniff.table_start == 1
+    assert sniff_csv(fpath) is sniff
+
+    header = detect_file_header(fpath)
+    assert (header.ftype, header.header_row, header.units_rows) == (InputFileType.CSF, 1, [2, 3])
+
+    # extra short rows before the table, non utf-8 text
+    ragged_fpath = tmp_path / 'ragged.csv'
+    ragged_fpath.write_bytes(b'site info\nstation\xe9,1\na,b,c\n1,2,3\n4,5,6\n')
+    sniff = sniff_csv(ragged_fpath)
+    assert sniff.encoding is None and sniff.table_start == 2
+    df = load_table_from_file(ragged_fpath)
+    assert df.columns.to_list() == ['a', 'b', 'c'] and len(df) == 2
+
+    # blank lines are counted in table_start, as pandas skiprows does
+    ragged_fpath.write_bytes(b'site info\n\nstation\xe9,1\n\na,b,c\n1,2,3\n4,5,6\n')
+    assert sniff_csv(ragged_fpath).table_start == 4
+    df = load_table_from_file(ragged_fpath)
+    assert df.columns.to_list() == ['a', 'b', 'c'] and len(df) == 2
+
+    ragged_fpath.write_bytes(b'station\xe9\na,b,c\n1,2,3\n1,2\n')
+    assert sniff_csv(ragged_fpath).table_start is None
+    with pytest.raises(Exception, match='Cannot guess start of csv table'):
+        load_table_from_file(ragged_fpath)
+
+
+def test_load_xls_cached(tmp_path, monkeypatch):
+    fpath = tmp_path / 'site.xlsx'
+    index = pd.date_range('2023-01-01', periods=50, freq='30min')
+    expected = pd.DataFrame({'TIMESTAMP_START': index.strftime('%Y%m%d%H%M').astype(int), 'FC_1_1_1': np.arange(50) / 3})
+    expected.to_excel(fpath, index=False)
+
+    init_table_cache(tmp_path / 'cache')
+    try:
+        # short detection reads are not cached
+        pd.testing.assert_frame_equal(load_table_from_file(fpath, nrows=4, header_row=None),
+                                      pd.read_excel(fpath, nrows=4, header=None))
+        assert list((tmp_path / 'cache').glob('*.parquet')) == []
+        pd.testing.assert_frame_equal(load_table_from_file(fpath), expected)
+        monkeypatch.setattr(pd, 'read_excel', None)
+        pd.testing.assert_frame_equal(load_table_from_file(fpath), expected)
+    finally:
+        init_table_cache(None)
+
+
+def test_map_files(tmp_path):
+    fpaths = [tmp_path / f'site_{i}.csv' for i in range(6)]
+    for seed, fpath in enumerate(fpaths):
+        write_csf(fpath, n=50 + seed * 300, seed=seed)
+    
+    # larger files are finished later, but results are in the fpaths order
+    expected = [len(load_table_from_file(fpath, header_row=1, skiprows=[2, 3])) for fpath in fpaths]
+    assert map_files(lambda fpath: len(load_table_from_file(fpath, header_row=1, skiprows=[2, 3])),
+                     fpaths[::-1], 'Loaded', max_workers=4) == expected[::-1]
+    assert list(detect_known_files(from_list=fpaths[::-1]).items()) == [(fpath, InputFileType.CSF) for fpath in fpaths[::-1]]
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_io.utils.time_features import time_features, doy_fraction, hour_fraction
+
+
+def test_time_features():
+    times = pd.Series(pd.date_range('2023-12-30 21:00', '2025-01-02 03:00', freq='30min'))
+    times.iloc[[5, 100]] = times.iloc[[5, 100]] + pd.Timedelta(seconds=17)
+    tf = time_features(times)
+    assert time_features(times) is tf
+    with pytest.raises(ValueError):
+        tf.year[0] = 1
+
+    assert (tf.timestamp == times.dt.strftime('%Y%m%d%H%M').astype(np.int64)).all()
+    for name, expected in {'year': times.dt.year, 'month': times.dt.month, 'day': times.dt.day,
+                           'doy': times.dt.dayofyear, 'hour': times.dt.hour, 'second': times.dt.second}.items():
+        np.testing.assert_array_equal(getattr(tf, name), expected)
+    expected_doy = np.round(times.dt.dayofyear + times.dt.hour / 24. + times.dt.minute / 24. / 60., decimals=3)
+    np.testing.assert_array_equal(doy_fraction(times), expected_doy)
+    np.testing.assert_array_equal(hour_fraction(times), times.dt.hour + times.dt.minute / 60)
+
+    # local time of tz aware, NA at NaT
+    local_times = pd.Series(pd.date_range('2024-03-30', periods=200, freq='30min', tz='Europe/Moscow'))
+    np.testing.assert_array_equal(time_features(local_times).hour, local_times.dt.hour)
+    times.iloc[3] = pd.NaT
+    tf = time_features(times)
+    assert tf.year.dtype == 'Int64' and tf.year.isna().sum() == 1 and tf.year[4] == 2023
+    with pytest.raises(ValueError):
+        tf.year[0] = 1
+    # FAT year selection skips NaT
+    is_year = pd.array(tf.year == 2023).to_numpy(dtype=bool, na_value=False)
+    np.testing.assert_array_equal(is_year, (times.dt.year == 2023).to_numpy())
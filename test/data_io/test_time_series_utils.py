@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_io.utils.time_series_utils import parse_datetime, date_time_parser, repair_time, infer_freq
+
+
+def test_parse_datetime():
+    index = pd.date_range('2021-12-01', periods=48 * 90, freq='30min')
+    col = pd.Series(index.strftime('%d.%m.%Y %H:%M'), name='TIMESTAMP')
+    col[5] = np.nan
+    expected = pd.to_datetime(col, format='%d.%m.%Y %H:%M')
+
+    parsed, fmt = parse_datetime(col, ['%Y-%m-%d %H:%M', '%d.%m.%Y %H:%M'])
+    assert fmt == '%d.%m.%Y %H:%M'
+    pd.testing.assert_series_equal(parsed, expected)
+
+    # only a single row beyond the sample mismatches
+    col[1001] = '2022-01-01 00:00'
+    with pytest.raises(Exception, match='None of date or time formats worked'):
+        parse_datetime(col, ['%Y-%m-%d %H:%M', '%d.%m.%Y %H:%M'])
+    with pytest.raises(Exception, match='Multiple date or time formats worked'):
+        parse_datetime(pd.Series(index[:20].strftime('%d.%m.%Y')), ['%d.%m.%Y', '%m.%d.%Y'])
+
+
+def test_date_time_parser():
+    index = pd.date_range('2022-03-01 00:30', periods=48 * 20, freq='30min')
+    df = pd.DataFrame({'date': index.strftime('%Y-%m-%d'), 'time': index.strftime('%H:%M')})
+    expected = pd.to_datetime(df['date'] + ' ' + df['time'], format='%Y-%m-%d %H:%M')
+
+    res = date_time_parser(df, 'time', ['%H:%M', '%H:%M:%S'], 'date', ['%Y-%m-%d', '%d.%m.%Y'])
+    pd.testing.assert_series_equal(res, expected)
+
+
+def test_repair_time():
+    index = pd.date_range('2023-01-01', periods=100, freq='30min')
+    df = pd.DataFrame({'time': index, 'co2_flux': np.arange(100) * 0.5, 'qc': np.arange(100) % 3})
+    df = df.drop([20, 21, 22]).reset_index(drop=True)
+    # duplicate, irregular value, missing time and swapped last rows
+    df.loc[40, 'time'] = df.loc[39, 'time']
+    df.loc[50, 'time'] += pd.Timedelta('7min')
+    df.loc[60, 'time'] = pd.NaT
+    df.loc[[95, 96], :] = df.loc[[96, 95], :].values
+    df = df.astype({'co2_flux': float, 'qc': int})
+
+    filled = repair_time(df, 'time', fill_gaps=True)
+    pd.testing.assert_index_equal(filled.index, index)
+    assert filled.index.freq == '30min' and (filled['time'] == filled.index).all()
+    assert filled['co2_flux'].isna().sum() == 3 + 3 and filled['qc'].dtype == float
+    assert filled.loc[index[99], 'co2_flux'] == 49.5
+
+    repaired = repair_time(df, 'time', fill_gaps=False)
+    assert len(repaired) == 100 - 6 and repaired['qc'].dtype == int
+    pd.testing.assert_frame_equal(repaired, filled.dropna().astype({'qc': int}), check_freq=False)
+
+    df.loc[70, 'time'] += pd.Timedelta('7min')
+    with pytest.raises(Exception, match='irregular values'):
+        repair_time(df, 'time', fill_gaps=True)
+
+
+def test_infer_freq():
+    index = pd.date_range('2023-01-01', periods=200, freq='30min')
+    col = pd.Series(index).drop(range(20, 40)).reset_index(drop=True)
+    col[0] += pd.Timedelta('10min')
+    col[150] += pd.Timedelta('5min')
+    col[100] = pd.NaT
+
+    info = infer_freq(col)
+    assert info.freq == pd.Timedelta('30min')
+    assert info.irregular_pos.tolist() == [0, 150]
+    assert 0.9 < info.confidence < 1
+
+    with pytest.raises(Exception, match='cannot detect frequency'):
+        infer_freq(pd.Series([index[0]] * 20))
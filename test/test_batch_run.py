@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip('bglabutils')
+
+from src.batch_run import run_batch, SUMMARY_FNAME
+
+
+def test_batch_run_summary(tmp_path):
+    sites_dir = tmp_path / 'sites'
+    for site in ['site_b', 'site_a']:
+        (sites_dir / site).mkdir(parents=True)
+    (sites_dir / 'site_b' / 'unknown.csv').write_text('a,b\n1,2\n')
+    out_dir = tmp_path / 'out'
+
+    summary = run_batch(sites_dir, out_dir, max_workers=2, with_reddyproc=False)
+    assert summary['site'].to_list() == ['site_a', 'site_b']
+    assert (summary['status'] == 'failed').all()
+    assert summary['error'].str.startswith('AutoImportException').all()
+    assert (summary['wall_time'] > 0).all()
+    assert (out_dir / SUMMARY_FNAME).exists()
+    for site in ['site_a', 'site_b']:
+        assert 'failed' in (out_dir / site / 'log.log').read_text()
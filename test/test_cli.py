@@ -0,0 +1,22 @@
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('bglabutils')
+
+from src.cli import main
+
+
+def test_cli_failure_exit_code(tmp_path):
+    out_dir = tmp_path / 'out'
+    assert main([str(tmp_path / 'missing_config.yaml'), '--input-dir', str(tmp_path), '--out-dir', str(out_dir),
+                 '--quiet']) == 1
+    assert 'FluxFilter run failed' in (out_dir / 'log.log').read_text()
+
+
+def test_cli_no_interactive_imports():
+    code = ('import sys, src.cli; '
+            'print(sorted({m.split(".")[0] for m in sys.modules} & {"plotly", "matplotlib", "IPython", "ipywidgets"}))')
+    res = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert res.stdout.strip() == '[]'
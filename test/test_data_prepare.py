@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.config.ff_config import FiltersConfig
+from src.data_io.fat_export import FAT_OUTPUT_TEMPLATE, FAT_SOURCE_COLS, export_fat
+from src.data_io.ias_cols import COLS_IAS_EXPORT_MAP
+from src.data_io.rep_level3_export import REP_LEVEL3_OUTPUT_TEMPLATE, REP_LEVEL3_SOURCE_COLS, export_rep_level3
+from src.data_io.results_export import SUMMARY_SOURCE_COLS, export_output_all, export_output_summary
+from src.data_prepare import split_pass_through, join_pass_through
+from src.filter_pipeline import FilterPipeline
+from src.filter_store import FilterStore
+from src.filters import FILTERS_SOURCE_COLS
+
+
+def test_pass_through(tmp_path):
+    n = 300
+    index = pd.date_range('2023-01-01', periods=n, freq='30min')
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'time': index, 'swc_1_1_1': rng.uniform(0, 1, n), 'co2_flux': rng.normal(0, 20, n),
+                         'qc_co2_flux': rng.choice([0, 1, 2], n), 'g_1_1_1': rng.normal(0, 10, n),
+                         'le': rng.normal(0, 100, n), 'ta_1_2_1': rng.normal(0, 10, n),
+                         'rh_1_1_1': rng.uniform(20, 110, n)}, index=index)
+    data.index.freq = '30min'
+    cfg = FiltersConfig(qc={'co2_flux': 1}, meteo={'RH_max': 98}, min_max={'co2_flux': [-30, 30], 'g_1_1_1': [-5, 5]})
+
+    used_data, pass_through = split_pass_through(data, 'time', cfg)
+    assert pass_through.df.columns.to_list() == ['swc_1_1_1']
+    pd.testing.assert_frame_equal(join_pass_through(used_data, pass_through), data)
+
+    pipeline = FilterPipeline.from_config(cfg, has_meteo=False)
+    expected_data, expected_db = pipeline(data)
+    plot_data, filters_db = pipeline(used_data)
+    plot_data['nee'] = plot_data['co2_flux']
+    expected_data['nee'] = expected_data['co2_flux']
+    export_output_all(tmp_path / 'expected.csv', expected_data, expected_db, 'time')
+    export_output_all(tmp_path / 'output_all.csv', join_pass_through(plot_data, pass_through), filters_db, 'time')
+    assert (tmp_path / 'output_all.csv').read_bytes() == (tmp_path / 'expected.csv').read_bytes()
+
+
+@pytest.mark.parametrize('has_meteo', [True, False])
+def test_pass_through_export_sources(tmp_path, has_meteo):
+    n = 48 * 10
+    index = pd.date_range('2023-01-01', periods=n, freq='30min')
+    rng = np.random.default_rng(0)
+    cols = ['co2_flux', 'co2_strg', 'nee', 'h', 'le', 'ch4_flux', 'u_star', 'air_temperature', 'rh', 'vpd',
+            'ta_1_1_1', 'rh_1_1_1', 'vpd_1_1_1', 'swin_1_1_1', 'swout_1_1_1', 'ppfd_1_1_1', 'rg_1_1_1', 'p_1_1_1',
+            'p_rain_1_1_1', 'ts_1_1_1', 'co2_signal_strength', 'ch4_signal_strength', 'swc_1_1_1', 'lwin_1_1_1', 'tau']
+    data = pd.DataFrame({col: rng.normal(10, 5, n) for col in cols}, index=index)
+    data['time'] = index
+    data.index.freq = '30min'
+
+    used_data, pass_through = split_pass_through(data, 'time', FiltersConfig())
+    assert set(pass_through.df.columns) == {'rg_1_1_1', 'swc_1_1_1', 'lwin_1_1_1', 'tau'}
+    source_cols = FILTERS_SOURCE_COLS + FAT_SOURCE_COLS + REP_LEVEL3_SOURCE_COLS + SUMMARY_SOURCE_COLS
+    assert set(source_cols) <= set(used_data.columns)
+    # IAS export gets the pass through columns back
+    ias_cols = [col for col in data.columns if col in COLS_IAS_EXPORT_MAP]
+    assert set(ias_cols) <= set(join_pass_through(used_data, pass_through).columns)
+
+    # exports read only the pipeline columns
+    config = SimpleNamespace(calc=SimpleNamespace(has_meteo=has_meteo), metadata=SimpleNamespace(site_name='s'))
+    for name, df in [('expected', data), ('used', used_data)]:
+        out_dir = tmp_path / name
+        out_dir.mkdir()
+        export_rep_level3(out_dir / 'rep.txt', df.copy(), 'time', REP_LEVEL3_OUTPUT_TEMPLATE, config, 48)
+        export_fat(df.copy(), FAT_OUTPUT_TEMPLATE.copy(), 'time', SimpleNamespace(out_dir=out_dir, points_per_day=48),
+                   config)
+        export_output_summary(out_dir / 'summary.csv', df, FilterStore(df.index, df.columns), 'time', 48, has_meteo)
+    for fname in ['rep.txt', 'FAT_s_2023.csv', 'summary.csv']:
+        assert (tmp_path / 'used' / fname).read_bytes() == (tmp_path / 'expected' / fname).read_bytes()
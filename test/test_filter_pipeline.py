@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from src.config.ff_config import FiltersConfig
+from src.filter_pipeline import FilterPipeline
+from src.filter_store import FilterStore
+from src.filters import min_max_filter, qc_filter, meteorological_rh_filter
+
+
+def test_filter_pipeline():
+    n = 300
+    index = pd.date_range('2023-01-01', periods=n, freq='30min')
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'co2_flux': rng.normal(0, 20, n), 'qc_co2_flux': rng.choice([0, 1, 2], n),
+                         'le': rng.normal(0, 100, n), 'rh_1_1_1': rng.uniform(20, 110, n)}, index=index)
+    data.index.freq = '30min'
+    cfg = FiltersConfig(qc={'co2_flux': 1}, meteo={'RH_max': 98}, min_max={'co2_flux': [-30, 30]})
+
+    pipeline = FilterPipeline.from_config(cfg, has_meteo=False)
+    out_data, filters_db = pipeline(data)
+    # empty quantile, window, madhampel are skipped
+    assert list(pipeline.timings.keys()) == ['qc', 'co2ss', 'ch4ss', 'rh', 'min_max']
+    assert out_data is not data
+
+    expected_data, expected_db = qc_filter(data, FilterStore(data.index, data.columns), cfg.qc)
+    expected_data, expected_db = meteorological_rh_filter(expected_data, expected_db, cfg.meteo)
+    expected_data, expected_db = min_max_filter(expected_data, expected_db, cfg.min_max)
+    pd.testing.assert_frame_equal(out_data, expected_data)
+    pd.testing.assert_frame_equal(filters_db.to_frame(), expected_db.to_frame())
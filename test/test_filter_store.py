@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.filter_store import FilterStore
+
+
+def make_store(n=21):
+    index = pd.date_range('2023-01-01', periods=n, freq='30min')
+    return FilterStore(index, ['co2_flux', 'h'])
+
+
+def test_filter_store_masks():
+    store = make_store()
+    n = store.n_rows
+    assert store['co2_flux'] == ()
+    assert np.array_equal(store.combined('co2_flux'), np.ones(n))
+    assert np.array_equal(store.combined('unknown_col'), np.ones(n))
+
+    qc = np.ones(n, dtype=int)
+    qc[[0, 5, 20]] = 0
+    minmax = np.ones(n, dtype=int)
+    minmax[[5, 7]] = 0
+    assert not store.set_mask('co2_flux', 'co2_flux_qcfilter', qc)
+    assert not store.set_mask('h', 'h_qcfilter', minmax)
+    assert not store.set_mask('co2_flux', 'co2_flux_minmaxfilter', minmax)
+
+    assert store['co2_flux'] == ('co2_flux_qcfilter', 'co2_flux_minmaxfilter')
+    assert np.array_equal(store.get_mask('co2_flux', 'co2_flux_qcfilter'), qc)
+    assert np.array_equal(store.combined('co2_flux'), qc & minmax)
+    assert store.nbytes == 3 * int(np.ceil(n / 8))
+
+    # overwrite keeps the filter position
+    assert store.set_mask('co2_flux', 'co2_flux_qcfilter', np.ones(n))
+    assert store['co2_flux'] == ('co2_flux_qcfilter', 'co2_flux_minmaxfilter')
+    assert np.array_equal(store.combined('co2_flux'), minmax)
+
+    with pytest.raises(ValueError):
+        store.set_mask('h', 'h_bad', np.ones(n - 1))
+
+
+def test_filter_store_frame_io():
+    store = make_store()
+    n = store.n_rows
+    rng = np.random.default_rng(0)
+    cols = {'co2_flux_qcfilter': 'co2_flux', 'h_qcfilter': 'h', 'co2_flux_physFilter': 'co2_flux'}
+    masks = {name: rng.integers(0, 2, n) for name in cols}
+    for name, mask in masks.items():
+        store.set_mask(cols[name], name, mask)
+
+    df = store.to_frame()
+    assert df.columns.to_list() == list(masks.keys())
+    assert df.index.equals(store.index)
+    for name, mask in masks.items():
+        assert np.array_equal(df[name], mask)
+    assert store.to_frame(['h']).columns.to_list() == ['h_qcfilter']
+
+    restored = FilterStore.from_frame(df, {'co2_flux': ['co2_flux_qcfilter', 'co2_flux_physFilter'],
+                                           'h': ['h_qcfilter']})
+    assert np.array_equal(restored.combined('co2_flux'), store.combined('co2_flux'))
+
+    store_copy = store.copy()
+    store_copy.set_mask('h', 'h_qcfilter', np.zeros(n))
+    assert np.array_equal(store.get_mask('h', 'h_qcfilter'), masks['h_qcfilter'])
+
+
+def test_filter_store_combined_cache():
+    store = make_store()
+    n = store.n_rows
+    masks = [np.ones(n, dtype=int) for _ in range(4)]
+    for i, mask in enumerate(masks):
+        mask[i] = 0
+
+    # filter chain: each filter starts from combined mask and works on a copy of the store
+    for i, mask in enumerate(masks):
+        start = store.combined('co2_flux')
+        store = store.copy()
+        store.set_mask('co2_flux', f'co2_flux_filter{i}', start & mask)
+    assert store.cache_info().misses == 1
+    assert store.cache_info().hits == len(masks) - 2
+
+    expected = np.logical_and.reduce(masks).astype(int)
+    assert np.array_equal(store.combined('co2_flux'), expected)
+    assert store.cache_info().hits == len(masks) - 1
+
+    # overwrite drops cached mask
+    store.set_mask('co2_flux', 'co2_flux_filter3', np.ones(n))
+    assert np.array_equal(store.combined('co2_flux'), np.logical_and.reduce(masks[:3]).astype(int))
+    assert store.cache_info().misses == 2
@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.filter_store import FilterStore
+from src.filters import min_max_filter, qc_filter, meteorological_rain_filter, std_window_filter, mad_hampel_filter, \
+    quantile_filter, meteorological_filter, meteorological_rh_filter
+
+
+def make_data(n=200, seed=0):
+    index = pd.date_range('2023-01-01', periods=n, freq='30min')
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'co2_flux': rng.normal(0, 20, n), 'qc_co2_flux': rng.choice([0, 1, 2], n),
+        'h': rng.normal(0, 300, n), 'qc_h': rng.choice([0, 1, 2], n),
+        'rh_1_1_1': rng.uniform(20, 110, n), 'p_rain_1_1_1': rng.choice([0, 0, 0.5], n),
+    }, index=index)
+    data.index.freq = '30min'
+    return data
+
+
+def run_chain(data, filters_db, inplace):
+    data, filters_db = qc_filter(data, filters_db, {'co2_flux': 1, 'h': 1}, inplace=inplace)
+    data, filters_db = meteorological_rain_filter(data, filters_db, {'p_rain_limit': 0.1, 'rain_forward_flag': 2},
+                                                  inplace=inplace)
+    data, filters_db = min_max_filter(data, filters_db, {'co2_flux': [-30, 30], 'rh_1_1_1': [0, 100]},
+                                      inplace=inplace)
+    return data, filters_db
+
+
+def test_filters_inplace():
+    data = make_data()
+    copy_data, copy_db = run_chain(data, FilterStore(data.index, data.columns), inplace=False)
+    assert data['rh_1_1_1'].max() > 100
+
+    inplace_db_in = FilterStore(data.index, data.columns)
+    inplace_data, inplace_db = run_chain(data, inplace_db_in, inplace=True)
+    assert inplace_data is data and inplace_db is inplace_db_in
+    pd.testing.assert_frame_equal(copy_data, inplace_data)
+    pd.testing.assert_frame_equal(copy_db.to_frame(), inplace_db.to_frame())
+
+
+def test_meteorological_filters_edges():
+    data = make_data()
+    data['le'] = data['h']
+    data['p_rain_1_1_1'] = 0.
+    data.iloc[-1, data.columns.get_loc('p_rain_1_1_1')] = 0.5
+    config = {'p_rain_limit': 0.1, 'rain_forward_flag': 3, 'RH_max': 98}
+    _, filters_db = meteorological_filter(data, FilterStore(data.index, data.columns), config)
+    assert filters_db.get_mask('h', 'h_physFilter')[-1] == 0 and len(filters_db.get_mask('h', 'h_physFilter')) == len(data)
+
+    # no le column
+    _, filters_db = meteorological_rh_filter(data.drop(columns='le'), FilterStore(data.index, data.columns), config)
+    assert np.array_equal(filters_db.get_mask('co2_flux', 'co2_flux_rhFilter'), (data['rh_1_1_1'] <= 98).astype(int))
+
+
+def test_std_window_filter_no_columns():
+    index = pd.date_range('2023-01-01', periods=48 * 3, freq='30min')
+    data = pd.DataFrame({'h': np.arange(len(index), dtype=float)}, index=index)
+    data.index.freq = '30min'
+    for config in [{}, {'le': {'sigmas': 2, 'window': 10, 'min_periods': 4}}]:
+        data_out, filters_db = std_window_filter(data, FilterStore(data.index, data.columns), config)
+        assert data_out.equals(data)
+        assert filters_db['h'] == ()
+
+
+def test_std_window_filter_as_calc_rolling():
+    bg = pytest.importorskip('bglabutils.basic')
+
+    n = 48 * 40
+    index = pd.date_range('2023-01-01', periods=n, freq='30min')
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame({'h': rng.standard_t(3, n) * 50, 'le': rng.standard_t(3, n) * 50}, index=index)
+    data.index.freq = '30min'
+    config = {'h': {'sigmas': 2, 'window': 10, 'min_periods': 4}, 'le': {'sigmas': 3, 'window': 10, 'min_periods': 4}}
+    _, filters_db = std_window_filter(data, FilterStore(data.index, data.columns), config)
+
+    for col, lconfig in config.items():
+        window = lconfig['window'] * 48
+        rolling_mean = bg.calc_rolling(data[col], rolling_window=lconfig['window'], step=48,
+                                       min_periods=lconfig['min_periods'])
+        rolling_sigma = (data[col] - rolling_mean).rolling(window=window, center=True, closed='both',
+                                                           min_periods=window // 2).std()
+        is_out = ((rolling_mean + rolling_sigma * lconfig['sigmas'] < data[col])
+                  | (rolling_mean - rolling_sigma * lconfig['sigmas'] > data[col]))
+        assert np.array_equal(filters_db.get_mask(col, f'{col}_stdwindowfilter'), (~is_out).astype(int))
+
+
+def make_spiky_data(n=48 * 30, seed=2):
+    index = pd.date_range('2023-01-01', periods=n, freq='30min')
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({col: np.sin(np.arange(n) / 48 * 2 * np.pi) * 10 + rng.normal(0, 1, n)
+                         for col in ['h', 'le', 'ta_1_1_1']}, index=index)
+    for col in data.columns:
+        data.loc[data.sample(30, random_state=seed).index, col] += rng.choice([-20, 20], 30)
+    data.loc[data.index[50:80], 'le'] = np.nan
+    data['qc_h'] = rng.choice([0, 1, 2], n)
+    data.index.freq = '30min'
+    return data
+
+
+def test_mad_hampel_filter_as_bglabutils():
+    bf = pytest.importorskip('bglabutils.filters')
+
+    data = make_spiky_data()
+    data, filters_db = qc_filter(data, FilterStore(data.index, data.columns), {'h': 1})
+    _, filters_db = mad_hampel_filter(data, filters_db, {'h': {'z': 5.5, 'hampel_window': 10}})
+
+    before = filters_db.get_mask('h', 'h_qcfilter')
+    expected = before.copy()
+    outdata = bf.apply_hampel_after_mad(data.loc[before == 1, :], ['h'], z=5.5, window_size=10)
+    expected[before == 1] = outdata['h_filtered'].astype(int)
+    assert np.array_equal(filters_db.get_mask('h', 'h_madhampel'), expected)
+
+
+@pytest.mark.parametrize('executor_cls', [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_filters_executor(executor_cls):
+    data = make_spiky_data()
+    data['rh_1_1_1'] = data['ta_1_1_1'] * 10
+    data.index.freq = '30min'
+    filter_calls = [
+        (min_max_filter, {'h': [-20, 20], 'rh_1_1_1': [0, 100]}),
+        (quantile_filter, {'h': [0.01, 0.99], 'le': [0.05, 0.95]}),
+        (std_window_filter, {'h': {'sigmas': 2, 'window': 10, 'min_periods': 4},
+                             'le': {'sigmas': 3, 'window': 10, 'min_periods': 4}}),
+        (mad_hampel_filter, {'h': {'z': 5.5, 'hampel_window': 10}, 'ta_1_1_1': {'z': 4, 'hampel_window': 7}}),
+    ]
+    data, filters_db = qc_filter(data, FilterStore(data.index, data.columns), {'h': 1})
+    expected_data, expected_db = data, filters_db
+    for func, config in filter_calls:
+        expected_data, expected_db = func(expected_data, expected_db, config)
+
+    with executor_cls(max_workers=2) as executor:
+        for func, config in filter_calls:
+            data, filters_db = func(data, filters_db, config, executor=executor)
+    pd.testing.assert_frame_equal(data, expected_data)
+    pd.testing.assert_frame_equal(filters_db.to_frame(), expected_db.to_frame())
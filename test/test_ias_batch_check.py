@@ -0,0 +1,27 @@
+import json
+
+from src.ias_batch_check import run_ias_batch_check, SUMMARY_FNAME
+from test.data_io.test_ias_check import write_ias
+
+
+def test_ias_batch_check(tmp_path):
+    ias_dir = tmp_path / 'ias'
+    (ias_dir / '2024').mkdir(parents=True)
+    write_ias(ias_dir / 'site_2023.csv', 2023)
+    broken = write_ias(ias_dir / '2024' / 'site_2024.csv', 2024)
+    broken.loc[[100, 101], 'TIMESTAMP_START'] = broken.loc[99, 'TIMESTAMP_START']
+    broken.to_csv(ias_dir / '2024' / 'site_2024.csv', index=False)
+    (ias_dir / 'notes.csv').write_text('a\n1\n')
+    out_dir = tmp_path / 'out'
+
+    summary = run_ias_batch_check(ias_dir, out_dir, max_workers=2)
+    assert [fpath.replace('\\', '/').split('/ias/')[1] for fpath in summary['file']] == \
+           ['2024/site_2024.csv', 'notes.csv', 'site_2023.csv']
+    assert summary['status'].to_list() == ['invalid', 'invalid', 'ok']
+    assert summary['errors'].to_list()[::2] == [2, 0]
+    assert (out_dir / SUMMARY_FNAME).exists()
+
+    report = json.loads((out_dir / '2024' / 'site_2024.csv.json').read_text(encoding='utf-8'))
+    assert report['errors'] == 2
+    duplicates = [rec for rec in report['messages'] if rec['message'].startswith('Duplicated timestamps')]
+    assert duplicates[0]['level'] == 'ERROR' and duplicates[0]['lines'] == [102, 103]
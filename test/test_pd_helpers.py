@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from src.helpers.pd_helpers import format_csv, write_csv
+
+
+def test_write_csv(tmp_path):
+    n = 1000
+    rng = np.random.default_rng(0)
+    floats = rng.normal(0, 10, n).round(3) * 10.0 ** rng.integers(-20, 20, n)
+    floats[:8] = [np.nan, np.inf, -np.inf, 0.0, -0.0, 1e16, 1e-5, -9999]
+    df = pd.DataFrame({'TIMESTAMP_START': np.arange(n) + 202301010000, 'FC_1_1_1': floats,
+                       'LE': rng.choice([1.5, np.nan, -0.0], n), 'T32': rng.normal(size=n).astype(np.float32),
+                       'QC': rng.integers(0, 3, n), 'flag': rng.random(n) > 0.5,
+                       'name': rng.choice(['a', 'b b', None, 1.25], n)})
+    csv = format_csv(df)
+    rows = np.flatnonzero(rng.random(n) > 0.5)
+    write_csv(tmp_path / 'all.csv', csv)
+    write_csv(tmp_path / 'rows.csv', csv, rows)
+
+    df.to_csv(tmp_path / 'expected_all.csv', index=False)
+    df.iloc[rows].to_csv(tmp_path / 'expected_rows.csv', index=False)
+    assert (tmp_path / 'all.csv').read_bytes() == (tmp_path / 'expected_all.csv').read_bytes()
+    assert (tmp_path / 'rows.csv').read_bytes() == (tmp_path / 'expected_rows.csv').read_bytes()
+
+    # to_csv quoting and formatting is not repeated
+    assert format_csv(df.assign(name='a,b')) is None
+    assert format_csv(df.assign(time=pd.Timestamp('2023-01-01'))) is None
+    assert format_csv(df[['LE']]) is None
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.helpers.rolling_helpers import rolling_std
+
+
+def make_values(n=2000, n_cols=3, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(5, 3, (n, n_cols))
+    values[rng.random(values.shape) < 0.3] = np.nan
+    values[100:400, 1] = np.nan
+    values[:, 2] = np.nan
+    return values
+
+
+@pytest.mark.parametrize('window, min_periods, closed', [(48, 24, 'both'), (10, 4, 'right'), (7, 7, 'both')])
+def test_rolling_as_pandas(window, min_periods, closed):
+    values = make_values()
+    rolling = pd.DataFrame(values).rolling(window, center=True, min_periods=min_periods, closed=closed)
+    np.testing.assert_allclose(rolling_std(values, window, min_periods, closed), rolling.std(), atol=1e-10)
+    np.testing.assert_allclose(rolling_std(values[:, 0], window, min_periods, closed), rolling.std()[0], atol=1e-10)
+
+
+def test_rolling_std_inf():
+    values = make_values()
+    values[[10, 500, 1500], 0] = [np.inf, -np.inf, np.inf]
+    res = rolling_std(values, 48, 24, 'both')
+    expected = pd.DataFrame(values).rolling(48, center=True, min_periods=24, closed='both').std()
+    np.testing.assert_allclose(res, expected, atol=1e-10)
+    assert np.isfinite(res[1600:1900, 0]).all()
@@ -0,0 +1,171 @@
+"""
+Filters chain benchmark on generated data, each mode runs in a separate process to get own peak RSS.
+Run from the repo root:
+    python tools/bench_filters.py --years 5 --extra-cols 300
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+repo_dir = Path(__file__).parents[1]
+sys.path.insert(0, str(repo_dir))
+
+
+def peak_rss_mb() -> float:
+    # linux: kB, macOS: bytes
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 2 ** 20 if sys.platform == 'darwin' else maxrss / 2 ** 10
+
+
+def reset_peak_rss() -> bool:
+    """ Linux only: resets VmHWM, so peak of each stage is measured separately """
+    try:
+        Path('/proc/self/clear_refs').write_text('5')
+        return True
+    except OSError:
+        return False
+
+
+def stage_peak_rss_mb() -> float:
+    """ Peak RSS since reset_peak_rss, process peak if it is not supported """
+    try:
+        status = Path('/proc/self/status').read_text()
+    except OSError:
+        return peak_rss_mb()
+    return int(status.split('VmHWM:')[1].split()[0]) / 2 ** 10
+
+
+def current_rss_mb() -> float:
+    try:
+        status = Path('/proc/self/status').read_text()
+    except OSError:
+        return peak_rss_mb()
+    return int(status.split('VmRSS:')[1].split()[0]) / 2 ** 10
+
+
+def make_data(years, extra_cols, seed=0) -> pd.DataFrame:
+    """ 30 min flux and meteo like data with realistic column names and a lot of pass-through columns """
+    index = pd.date_range('2019-01-01', f'{2019 + years}-01-01', freq='30min', inclusive='left')
+    n = len(index)
+    rng = np.random.default_rng(seed)
+    day_phase = np.sin(2 * np.pi * (index.hour * 60 + index.minute) / 1440)
+    swin = np.clip(800 * day_phase, 0, None) + rng.normal(0, 5, n)
+
+    data = pd.DataFrame(index=index)
+    data['datetime'] = index
+    data['swin_1_1_1'] = swin
+    data['ppfd_1_1_1'] = swin * 2.1
+    data['ta_1_1_1'] = 10 + 10 * day_phase + rng.normal(0, 2, n)
+    data['rh_1_1_1'] = rng.uniform(20, 105, n)
+    data['vpd_1_1_1'] = rng.uniform(0, 30, n)
+    data['p_rain_1_1_1'] = rng.choice([0, 0, 0, 0, 0.5], n)
+    data['u_star'] = rng.uniform(0, 1, n)
+    for col, scale in [('co2_flux', 5), ('nee', 5), ('h', 100), ('le', 100), ('ch4_flux', 0.1), ('co2_strg', 1)]:
+        data[col] = -scale * day_phase + rng.normal(0, scale / 3, n)
+        data[f'qc_{col}'] = rng.choice([0, 1, 2], n)
+    data['co2_signal_strength'] = rng.uniform(60, 100, n)
+    data['ch4_signal_strength'] = rng.uniform(10, 100, n)
+    extra = pd.DataFrame(rng.normal(size=(n, extra_cols)), index=index,
+                         columns=[f'extra_{i}' for i in range(extra_cols)])
+    data = pd.concat([data, extra], axis=1)
+    data.index.freq = '30min'
+    return data
+
+
+def chain_stages(cfg) -> list[tuple]:
+    """ (name, filter, config args) in the FluxFilter.py order """
+    from src.filters import qc_filter, meteorological_co2ss_filter, meteorological_ch4ss_filter, \
+        meteorological_rh_filter, meteorological_rain_filter, meteorological_night_filter, \
+        meteorological_day_filter, winter_filter, min_max_filter, quantile_filter, std_window_filter, \
+        mad_hampel_filter
+
+    return [
+        ('qc', qc_filter, [cfg.qc]),
+        ('co2ss', meteorological_co2ss_filter, [cfg.meteo]),
+        ('ch4ss', meteorological_ch4ss_filter, [cfg.meteo]),
+        ('rh', meteorological_rh_filter, [cfg.meteo]),
+        ('rain', meteorological_rain_filter, [cfg.meteo]),
+        ('night', meteorological_night_filter, [cfg.meteo]),
+        ('day', meteorological_day_filter, [cfg.meteo]),
+        ('winter', winter_filter, [cfg.meteo, cfg.winter_date_ranges]),
+        ('min_max', min_max_filter, [cfg.min_max]),
+        ('quantile', quantile_filter, [cfg.quantile]),
+        ('window', std_window_filter, [cfg.window]),
+        ('madhampel', mad_hampel_filter, [cfg.madhampel]),
+    ]
+
+
+def run_chain(data, filters_db, cfg, inplace) -> tuple[pd.DataFrame, object, dict]:
+    """ Also returns {stage: (wall time s, peak RSS increase over the stage start MB)} """
+    stages = {}
+    for name, filter_func, args in chain_stages(cfg):
+        has_reset = reset_peak_rss()
+        rss_start = current_rss_mb() if has_reset else peak_rss_mb()
+        start = time.perf_counter()
+        data, filters_db = filter_func(data, filters_db, *args, inplace=inplace)
+        stages[name] = time.perf_counter() - start, stage_peak_rss_mb() - rss_start
+    return data, filters_db, stages
+
+
+def load_filters_config():
+    from src.config.ff_config import FFConfig
+
+    default_fpath = repo_dir / 'misc/config_v1.0.4_default.yaml'
+    config = FFConfig.load_or_init(load_path=default_fpath, default_fpath=default_fpath,
+                                   init_debug=False, init_version='1.0.4')
+    return config.filters
+
+
+def bench_mode(mode, years, extra_cols, queue):
+    from src.filter_store import FilterStore
+
+    cfg = load_filters_config()
+    data = make_data(years, extra_cols)
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    # plot_data = data.copy() in the notebook is the only checkpoint in the inplace mode
+    plot_data = data.copy()
+    filters_db = FilterStore(plot_data.index, plot_data.columns)
+    plot_data, filters_db, stages = run_chain(plot_data, filters_db, cfg, inplace=(mode == 'inplace'))
+    duration = time.perf_counter() - start
+
+    queue.put((mode, rss_before, peak_rss_mb(), duration, filters_db.to_frame().sum().sum(), stages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--extra-cols', type=int, default=300)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    results = {}
+    for mode in ['copy', 'inplace']:
+        proc = ctx.Process(target=bench_mode, args=(mode, args.years, args.extra_cols, queue))
+        proc.start()
+        mode, rss_before, rss_peak, duration, n_good, stages = queue.get()
+        proc.join()
+        results[mode] = rss_before, rss_peak, duration, n_good, stages
+        print(f'{mode:8} data loaded: {rss_before:8.1f} MB  peak: {rss_peak:8.1f} MB  '
+              f'chain peak increase: {rss_peak - rss_before:8.1f} MB  time: {duration:6.2f} s')
+
+    assert results['copy'][3] == results['inplace'][3], 'Filters are different in copy and inplace modes'
+    print(f"Peak RSS difference (copy - inplace): {results['copy'][1] - results['inplace'][1]:.1f} MB")
+
+    print(f"\n{'stage':10} {'copy s':>8} {'inplace s':>10} {'copy MB':>9} {'inplace MB':>11}  (peak RSS increase)")
+    for name in results['copy'][4]:
+        (copy_s, copy_mb), (inplace_s, inplace_mb) = results['copy'][4][name], results['inplace'][4][name]
+        print(f'{name:10} {copy_s:8.2f} {inplace_s:10.2f} {copy_mb:9.1f} {inplace_mb:11.1f}')
+
+
+if __name__ == '__main__':
+    main()
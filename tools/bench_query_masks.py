@@ -0,0 +1,112 @@
+"""
+Compares previous DataFrame.query based masking with current numpy masks of the filters:
+results must be identical, prints the speedup.
+Run from the repo root:
+    python tools/bench_query_masks.py --years 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_filters import make_data, load_filters_config
+from src.filter_store import FilterStore
+from src.filters import min_max_filter, meteorological_night_filter, meteorological_day_filter, winter_filter
+
+
+def query_min_max(data, config):
+    data = data.copy()
+    filters = {}
+    for col, limits in config.items():
+        if col not in data.columns:
+            continue
+        filter = pd.Series(1, index=data.index)
+        if col not in ['rh_1_1_1', 'swin_1_1_1', 'ppfd_1_1_1', 'swin_1_1_1']:
+            filter.loc[data.query(f"{col}<{limits[0]}|{col}>{limits[1]}").index] = 0
+        elif col == 'rh_1_1_1':
+            data[col] = data[col].clip(upper=limits[1])
+            filter.loc[data.query(f"{col}<{limits[0]}|{col}>{limits[1]}").index] = 0
+        else:
+            data[col] = data[col].clip(lower=limits[0])
+            if col not in ['swin_1_1_1']:
+                filter.loc[data.query(f"{col}<{limits[0]}|{col}>{limits[1]}").index] = 0
+            else:
+                filter.loc[data.query(f"{col}>{limits[1]}").index] = 0
+        filters[f"{col}_minmaxfilter"] = filter
+    return filters
+
+
+def query_night(data, cfg):
+    filters = {f"{col}_nightFilter": pd.Series(1, index=data.index) for col in ["h", 'le', 'nee', 'co2_flux']}
+    filters['nee_nightFilter'].loc[data.query(f"swin_1_1_1<10&nee<{cfg['night_nee_min']}").index] = 0
+    filters['co2_flux_nightFilter'].loc[data.query("swin_1_1_1<10&co2_flux<0").index] = 0
+    filters['h_nightFilter'].loc[data.query(
+        f"(h<{cfg['night_h_limits'][0]}|h>{cfg['night_h_limits'][1]})&swin_1_1_1<10").index] = 0
+    filters['le_nightFilter'].loc[data.query(
+        f"(h<{cfg['night_le_limits'][0]}|h>{cfg['night_le_limits'][1]})&swin_1_1_1<10").index] = 0
+    return filters
+
+
+def query_day(data, cfg):
+    filter = pd.Series(1, index=data.index)
+    filter.loc[data.query(f'nee>{cfg["day_nee_max"]}&swin_1_1_1>={cfg["day_swin_limit"]}').index] = 0
+    return {'nee_dayFilter': filter}
+
+
+def query_winter(data, cfg, date_ranges):
+    filters = {}
+    for col, limits in [('nee', cfg['winter_nee_limits']), ('co2_flux', cfg['winter_nee_limits']),
+                        ('ch4_flux', cfg['winter_ch4_flux_limits'])]:
+        filter = pd.Series(1, index=data.index)
+        for start, stop in date_ranges:
+            range = pd.date_range(pd.to_datetime(start, dayfirst=True), pd.to_datetime(stop, dayfirst=True),
+                                  freq=data.index.freq)
+            filter.loc[data.loc[range].query(f"{col}<{limits[0]}").index] = 0
+            filter.loc[data.loc[range].query(f"{col}>{limits[1]}").index] = 0
+        filters[f"{col}_winterFilter"] = filter
+    return filters
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        res = func()
+    return res, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cfg = load_filters_config()
+    data = make_data(args.years, extra_cols=0)
+    # winter ranges of the default config are in 2023
+    date_ranges = cfg.winter_date_ranges
+
+    def run_new(func, *func_args):
+        _, filters_db = func(data, FilterStore(data.index, data.columns), *func_args)
+        return filters_db.to_frame()
+
+    cases = {
+        'min_max': (lambda: query_min_max(data, cfg.min_max), lambda: run_new(min_max_filter, cfg.min_max)),
+        'night': (lambda: query_night(data, cfg.meteo), lambda: run_new(meteorological_night_filter, cfg.meteo)),
+        'day': (lambda: query_day(data, cfg.meteo), lambda: run_new(meteorological_day_filter, cfg.meteo)),
+        'winter': (lambda: query_winter(data, cfg.meteo, date_ranges),
+                   lambda: run_new(winter_filter, cfg.meteo, date_ranges)),
+    }
+
+    print(f'{len(data)} rows')
+    for name, (query_func, new_func) in cases.items():
+        query_res, query_time = timed(query_func, args.repeat)
+        new_res, new_time = timed(new_func, args.repeat)
+        for filter_name, filter in query_res.items():
+            assert np.array_equal(filter.to_numpy(), new_res[filter_name].to_numpy()), filter_name
+        print(f'{name:8} query: {query_time:7.3f} s  numpy: {new_time:7.3f} s  speedup: {query_time / new_time:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()